@@ -1,9 +1,16 @@
+import os
+import sys
 from composabl import Teacher
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from utils.obs_history import ObsHistory
+
 
 class NavigationTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.reward_history = []
         self.last_reward = 0
 
@@ -18,7 +25,7 @@ class NavigationTeacher(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         else:
             self.obs_history.append(transformed_obs)
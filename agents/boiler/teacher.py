@@ -1,11 +1,20 @@
-import numpy as np
+import os
+import sys
 from composabl import Teacher
 from sensors import sensors
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from utils.obs_history import ObsHistory
+from utils.stats import RunningMean
+
 
 class LevelTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
+        self.value_mean = RunningMean()
+        self.setpoint_mean = RunningMean()
         self.reward_history = []
         self.last_reward = 0
 
@@ -19,13 +28,16 @@ class LevelTeacher(Teacher):
         return [s.name for s in sensors]
 
     def compute_reward(self, transformed_obs, action, sim_reward):
+        # means over every observation of the run, updated instead of recomputed every step
+        value = self.value_mean.update(transformed_obs['y1'])
+        setpoint = self.setpoint_mean.update(transformed_obs['y1ref'])
         if self.obs_history is None:
-            self.obs_history = [list(transformed_obs.values())]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
-            self.obs_history.append(list(transformed_obs.values()))
+            self.obs_history.append(transformed_obs)
 
-        error = abs(np.mean(np.array(self.obs_history)[:, 0]) - np.mean(np.array(self.obs_history)[:, 3]))
+        error = abs(value - setpoint)
 
         if error != 0:
             reward = 1 / error
@@ -47,6 +59,9 @@ class LevelTeacher(Teacher):
 class PressureTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
+        self.value_mean = RunningMean()
+        self.setpoint_mean = RunningMean()
         self.reward_history = []
         self.last_reward = 0
 
@@ -60,13 +75,16 @@ class PressureTeacher(Teacher):
         return [s.name for s in sensors]
 
     def compute_reward(self, transformed_obs, action, sim_reward):
+        # means over every observation of the run, updated instead of recomputed every step
+        value = self.value_mean.update(transformed_obs['y2'])
+        setpoint = self.setpoint_mean.update(transformed_obs['y2ref'])
         if self.obs_history is None:
-            self.obs_history = [list(transformed_obs.values())]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
-            self.obs_history.append(list(transformed_obs.values()))
+            self.obs_history.append(transformed_obs)
 
-        error = abs(np.mean(np.array(self.obs_history)[:, 1]) - np.mean(np.array(self.obs_history)[:, 4]))
+        error = abs(value - setpoint)
 
         if error != 0:
             reward = 1 / error
@@ -88,6 +106,9 @@ class PressureTeacher(Teacher):
 class TemperatureTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
+        self.value_mean = RunningMean()
+        self.setpoint_mean = RunningMean()
         self.reward_history = []
         self.last_reward = 0
 
@@ -101,13 +122,16 @@ class TemperatureTeacher(Teacher):
         return [s.name for s in sensors]
 
     def compute_reward(self, transformed_obs, action, sim_reward):
+        # means over every observation of the run, updated instead of recomputed every step
+        value = self.value_mean.update(transformed_obs['y3'])
+        setpoint = self.setpoint_mean.update(transformed_obs['y3ref'])
         if self.obs_history is None:
-            self.obs_history = [list(transformed_obs.values())]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
-            self.obs_history.append(list(transformed_obs.values()))
+            self.obs_history.append(transformed_obs)
 
-        error = abs(np.mean(np.array(self.obs_history)[:, 2]) - np.mean(np.array(self.obs_history)[:, 5]))
+        error = abs(value - setpoint)
 
         if error != 0:
             reward = 1 / error
@@ -1,11 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
 from math import exp
 import numpy as np
-from scipy.integrate import odeint
+from scipy import sparse
+from scipy.integrate import odeint, solve_ivp
+from typing import Optional
 
 π = math.pi
 
+INTEGRATORS = ("odeint", "rk4", "implicit_euler", "lsoda", "radau", "bdf", "surrogate")
+STIFF_METHODS = {"lsoda": "LSODA", "radau": "Radau", "bdf": "BDF"}
+
 @dataclass
 class CSTRModel:
 
@@ -30,8 +35,20 @@ class CSTRModel:
     Cafin: float = 10 #kmol/m3
     Tf: float = 298.2 #K
 
+    #integration
+    integrator: str = "odeint" #odeint | rk4 | implicit_euler | lsoda | radau | bdf | surrogate
+    substeps: int = 10 #fixed steps per control interval (rk4, implicit_euler)
+    solvers: Optional[dict] = field(default=None, repr=False, compare=False) #stiff solvers of the env, see stiff_solver
+
     def __post_init__(self):
 
+        if self.integrator != "odeint":
+            Ca, T = integrate(self.Ca, self.T, self.Tc, 0.5, self.integrator, self.substeps, self, self.solvers)
+            self.Ca = float(Ca)
+            self.T = float(T)
+            self.Tc += self.ΔTc
+            return
+
         #self.ΔT =  (self.F/self.V *(self.Tf-self.T)) - ((self.ΔH/self.phoCp)*(self.k0 * exp(-self.E/(self.R*self.T))*self.Ca)) - ((self.UA /(self.phoCp*self.V)) *(self.T-self.Tc))
         #self.T += self.ΔT
 
@@ -74,6 +91,10 @@ class CSTRModel:
         self.T = y[1]
         self.Tc += self.ΔTc
 
+    def jacobian(self):
+        """Analytic 2x2 Jacobian d(dCa/dt, dT/dt)/d(Ca, T) at the current state."""
+        return np.array(jacobian(self.Ca, self.T, self.Tc, self)).reshape(2, 2)
+
     def run_sim(self):
 
         def model(z, t, u):
@@ -112,11 +133,187 @@ class CSTRModel:
         self.Ca = x[1]
         self.T = y[1]
         self.Tc += self.ΔTc
-        
-        
-            
-            
 
-        
-        
 
+def derivatives(Ca, T, Tc, m=CSTRModel):
+    """Right-hand side of the CSTR ODE, evaluated elementwise over arrays."""
+    rate = m.k0 * np.exp(-m.E / (m.R * T)) * Ca
+    dCa = (m.F/m.V * (m.Cafin - Ca)) - rate
+    dT = (m.F/m.V * (m.Tf - T)) - ((m.ΔH/m.phoCp) * rate) - ((m.UA / (m.phoCp*m.V)) * (T - Tc))
+    return dCa, dT
+
+
+def jacobian(Ca, T, Tc, m=CSTRModel):
+    """
+    Analytic Jacobian of `derivatives` with respect to (Ca, T).
+
+    Returns:
+        (dCa/dCa, dCa/dT, dT/dCa, dT/dT), each with the shape of the inputs
+    """
+    k = m.k0 * np.exp(-m.E / (m.R * T))
+    dk = k * m.E / (m.R * T**2)
+    j11 = -m.F/m.V - k
+    j12 = -dk * Ca
+    j21 = -(m.ΔH/m.phoCp) * k
+    j22 = -m.F/m.V - (m.ΔH/m.phoCp) * dk * Ca - m.UA / (m.phoCp*m.V)
+    return j11, j12, j21, j22
+
+
+def rk4(Ca, T, Tc, dt: float, substeps: int = 10, m=CSTRModel):
+    """Classic fixed-step Runge-Kutta 4 with `substeps` steps over `dt`."""
+    h = dt / substeps
+    for _ in range(substeps):
+        k1a, k1t = derivatives(Ca, T, Tc, m)
+        k2a, k2t = derivatives(Ca + h/2 * k1a, T + h/2 * k1t, Tc, m)
+        k3a, k3t = derivatives(Ca + h/2 * k2a, T + h/2 * k2t, Tc, m)
+        k4a, k4t = derivatives(Ca + h * k3a, T + h * k3t, Tc, m)
+        Ca = Ca + h/6 * (k1a + 2*k2a + 2*k3a + k4a)
+        T = T + h/6 * (k1t + 2*k2t + 2*k3t + k4t)
+    return Ca, T
+
+
+def implicit_euler(Ca, T, Tc, dt: float, substeps: int = 10, m=CSTRModel, newton_iters: int = 4):
+    """
+    Fixed-step backward Euler with `substeps` steps over `dt`.
+
+    Each step solves z' = z + h*f(z') with a few Newton iterations using the
+    analytic 2x2 Jacobian, so it stays stable in the stiff runaway region.
+    """
+    h = dt / substeps
+    for _ in range(substeps):
+        Ca0, T0 = Ca, T
+        for _ in range(newton_iters):
+            fa, ft = derivatives(Ca, T, Tc, m)
+            ga = Ca - Ca0 - h * fa
+            gt = T - T0 - h * ft
+            j11, j12, j21, j22 = jacobian(Ca, T, Tc, m)
+            a, b, c, d = 1 - h*j11, -h*j12, -h*j21, 1 - h*j22
+            det = a*d - b*c
+            Ca = Ca - (d*ga - b*gt) / det
+            T = T - (a*gt - c*ga) / det
+    return Ca, T
+
+
+class StiffSolver:
+    """
+    solve_ivp wrapper for the stiff region near thermal runaway (T >= 400 K).
+
+    The analytic Jacobian is handed to the solver, and every call starts from
+    the last accepted internal step size instead of letting the solver search
+    for it again. For a batch the Jacobian is block diagonal and is handed to
+    Radau/BDF as a sparse matrix.
+
+    The step size is the only state kept between calls, so an env keeps its
+    own solvers (see `stiff_solver`) and concurrent envs never share one.
+    """
+
+    def __init__(self, method: str = "LSODA", rtol: float = 1e-6, atol: float = 1e-8):
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+        self.first_step = None
+
+    def step(self, Ca, T, Tc, dt: float = 0.5, m=CSTRModel):
+        Ca = np.asarray(Ca, dtype=float)
+        T = np.asarray(T, dtype=float)
+        n = Ca.size
+        Tc = np.broadcast_to(np.asarray(Tc, dtype=float), Ca.shape).ravel()
+        sparse_jac = n > 1 and self.method != "LSODA"
+
+        def rhs(t, z):
+            dCa, dT = derivatives(z[:n], z[n:], Tc, m)
+            return np.concatenate([dCa, dT])
+
+        def jac(t, z):
+            j11, j12, j21, j22 = jacobian(z[:n], z[n:], Tc, m)
+            if not sparse_jac:
+                return np.block([[np.diag(j11), np.diag(j12)], [np.diag(j21), np.diag(j22)]])
+            return sparse.bmat([[sparse.diags(j11), sparse.diags(j12)],
+                                [sparse.diags(j21), sparse.diags(j22)]], format="csc")
+
+        sol = solve_ivp(
+            rhs, (0, dt), np.concatenate([Ca.ravel(), T.ravel()]),
+            method=self.method, jac=jac, rtol=self.rtol, atol=self.atol,
+            first_step=self.first_step,
+        )
+        if not sol.success:
+            raise RuntimeError(f"{self.method} failed: {sol.message}")
+
+        # warm start the next call with the last accepted step size
+        if len(sol.t) > 1:
+            self.first_step = min(sol.t[-1] - sol.t[-2], dt)
+
+        z = sol.y[:, -1]
+        return z[:n].reshape(Ca.shape), z[n:].reshape(T.shape)
+
+
+def stiff_solver(integrator: str, solvers: Optional[dict] = None) -> StiffSolver:
+    """
+    The StiffSolver for `integrator` in `solvers`, a dict owned by one env that
+    keeps its solvers warm across steps. Without one, a new solver that starts
+    cold.
+    """
+    if solvers is None:
+        return StiffSolver(STIFF_METHODS[integrator])
+    if integrator not in solvers:
+        solvers[integrator] = StiffSolver(STIFF_METHODS[integrator])
+    return solvers[integrator]
+
+
+def integrate(Ca, T, Tc, dt: float = 0.5, integrator: str = "rk4", substeps: int = 10, m=CSTRModel,
+              solvers: Optional[dict] = None):
+    """
+    Advance the reactor state by `dt` with coolant temperature Tc held constant.
+
+    Works on scalars or arrays of any shape, all reactors being solved together.
+    The stiff methods reuse the solvers in `solvers`, see `stiff_solver`.
+
+    Returns:
+        (Ca, T) after `dt`
+    """
+    if integrator == "rk4":
+        return rk4(Ca, T, Tc, dt, substeps, m)
+    elif integrator == "implicit_euler":
+        return implicit_euler(Ca, T, Tc, dt, substeps, m)
+    elif integrator == "odeint":
+        Ca = np.asarray(Ca, dtype=float)
+        T = np.asarray(T, dtype=float)
+        Tc = np.broadcast_to(np.asarray(Tc, dtype=float), Ca.shape).ravel()
+        n = Ca.size
+
+        def model(z, t):
+            dCa, dT = derivatives(z[:n], z[n:], Tc, m)
+            return np.concatenate([dCa, dT])
+
+        z = odeint(model, np.concatenate([Ca.ravel(), T.ravel()]), [0, dt])
+        return z[1][:n].reshape(Ca.shape), z[1][n:].reshape(T.shape)
+    elif integrator in STIFF_METHODS:
+        return stiff_solver(integrator, solvers).step(Ca, T, Tc, dt, m)
+    elif integrator == "surrogate":
+        # learned approximation, falls back to odeint outside its trust region
+        from . import surrogate
+        return surrogate.default_model().step(Ca, T, Tc, dt)
+
+    raise ValueError(f"Unknown integrator {integrator}, supported: {INTEGRATORS}")
+
+
+def simulate_batch(T, Ca, Tc, dt: float = 0.5, integrator: str = "odeint", substeps: int = 10,
+                   solvers: Optional[dict] = None):
+    """
+    Advance N independent reactors by one control interval.
+
+    With the default odeint backend the two states of every reactor are stacked
+    into a single vector [Ca_0..Ca_N, T_0..T_N] so the whole batch is solved with
+    one odeint call. The fixed-step backends (rk4, implicit_euler) operate on
+    the arrays directly. The coolant temperature is held at Tc over the
+    interval, which matches the update applied by CSTRModel.
+
+    Returns:
+        (T, Ca): arrays of shape (N,) with the new reactor states
+    """
+    Ca, T = integrate(
+        np.asarray(Ca, dtype=float), np.asarray(T, dtype=float), np.asarray(Tc, dtype=float),
+        dt, integrator, substeps, solvers=solvers
+    )
+
+    return T, Ca
@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+import numpy as np
+
+HORIZON = 90  # steps per episode
+
+# Steady states the setpoint profiles move between
+Ca_ss1, T_ss1 = 8.5698, 311.2612  # low conversion
+Ca_ss2, T_ss2 = 2, 373.1311  # high conversion
+
+# Programmed transition between both steady states
+P1 = 22  # time to start the transition
+P2 = 74  # time to finish the transition
+
+
+def piecewise(times, values, offset: int = 0, horizon: int = HORIZON) -> np.ndarray:
+    '''
+    Sample a piecewise linear schedule at every step of an episode.
+
+    Entry k of the returned array holds the value at time `k + offset`, values
+    outside the schedule are held at the first/last point.
+    '''
+    k = np.arange(horizon + 1) + offset
+    return np.interp(k, times, values)
+
+
+def parse_schedule(schedule):
+    '''
+    Parse a user-defined schedule into (times, values).
+
+    Accepts a dict {time: value} or a string "time:value, time:value, ..."
+    which can be passed through a Scenario, e.g. "0:8.57, 30:5, 60:2".
+    '''
+    if isinstance(schedule, str):
+        points = [p.split(":") for p in schedule.replace(" ", "").split(",") if p]
+        schedule = {float(t): float(v) for t, v in points}
+
+    if not schedule:
+        raise ValueError("A schedule needs at least one time:value point")
+
+    times = sorted(schedule.keys())
+    return np.array(times, dtype=float), np.array([schedule[t] for t in times], dtype=float)
+
+
+def tref_from_cref(Cref):
+    '''Temperature setpoint matching a concentration setpoint on the steady state line.'''
+    return T_ss1 + (np.asarray(Cref) - Ca_ss1) * (T_ss2 - T_ss1) / (Ca_ss2 - Ca_ss1)
+
+
+def _signal_tables(signal: str):
+    if signal == "transition":
+        return (
+            piecewise([0, P1, P2, HORIZON], [8.57, 8.57, Ca_ss2, Ca_ss2], offset=P1),
+            piecewise([0, P1, P2, HORIZON], [T_ss1, T_ss1, T_ss2, T_ss2], offset=P1),
+        )
+    elif signal == "complete":
+        return (
+            piecewise([0, P1, P2, HORIZON], [8.57, 8.57, Ca_ss2, Ca_ss2]),
+            piecewise([0, P1, P2, HORIZON], [T_ss1, T_ss1, T_ss2, T_ss2]),
+        )
+    elif signal == "ss1":
+        return np.full(HORIZON + 1, Ca_ss2), np.full(HORIZON + 1, T_ss2)
+
+    # ss2 and unknown signals hold the initial setpoint
+    return np.full(HORIZON + 1, Ca_ss1), np.full(HORIZON + 1, T_ss1)
+
+
+def _readonly(tables):
+    for table in tables:
+        table.setflags(write=False)
+    return tables
+
+
+# Tables for the programmed signals, built once at import
+REFERENCES = {signal: _readonly(_signal_tables(signal)) for signal in ["transition", "ss1", "ss2", "complete"]}
+
+
+@lru_cache(maxsize=64)
+def _schedule_tables(Cref_schedule, Tref_schedule):
+    Cref = piecewise(*parse_schedule(Cref_schedule))
+    if Tref_schedule is None:
+        Tref = tref_from_cref(Cref)
+    else:
+        Tref = piecewise(*parse_schedule(Tref_schedule))
+    return _readonly((Cref, Tref))
+
+
+def reference_tables(Cref_signal: str, Cref_schedule=None, Tref_schedule=None):
+    '''
+    Return the precomputed (Cref, Tref) arrays of length HORIZON + 1 for an
+    episode, so the setpoint at step `cnt` is a plain index lookup.
+
+    A user-defined `Cref_schedule` takes precedence over `Cref_signal`. When no
+    `Tref_schedule` is given the temperature setpoint follows the steady state
+    line between both operating points.
+    '''
+    if Cref_schedule is None:
+        if Cref_signal in REFERENCES:
+            return REFERENCES[Cref_signal]
+        return _signal_tables(Cref_signal)
+
+    if isinstance(Cref_schedule, dict) or isinstance(Tref_schedule, dict):
+        return _schedule_tables.__wrapped__(Cref_schedule, Tref_schedule)
+
+    return _schedule_tables(Cref_schedule, Tref_schedule)
@@ -0,0 +1,150 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RunningStats:
+    '''
+    O(1) accumulator for the sum, mean, RMS, variance and min/max of a stream
+    of values, without keeping the values themselves.
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def push(self, x: float):
+        self.count += 1
+        self.sum += x
+        self.sum_sq += x**2
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def mean_sq(self) -> float:
+        return self.sum_sq / self.count if self.count else 0.0
+
+    @property
+    def rms(self) -> float:
+        return math.sqrt(self.mean_sq)
+
+    @property
+    def var(self) -> float:
+        return max(self.mean_sq - self.mean**2, 0.0)
+
+    def rms_batch(self, x):
+        '''
+        RMS after each of the future values `x` (shape (K, H)) would be pushed,
+        for K independent continuations. The accumulator is not modified.
+        '''
+        x = np.asarray(x, dtype=float)
+        n = self.count + np.arange(1, x.shape[-1] + 1)
+        return np.sqrt((self.sum_sq + np.cumsum(x**2, axis=-1)) / n)
+
+    def get_state(self):
+        return (self.count, self.sum, self.sum_sq, self.min, self.max)
+
+    def set_state(self, state):
+        self.count, self.sum, self.sum_sq, self.min, self.max = state
+
+
+class WindowedStats(RunningStats):
+    '''
+    Same statistics as RunningStats restricted to the last `window` values.
+
+    Sums are updated incrementally as values leave the window and re-summed
+    once per window to keep rounding drift bounded. Min/max use monotonic
+    queues, so every push is amortized O(1).
+    '''
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self.values = np.zeros(window)
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.pushed = 0
+        self._min_q = deque()
+        self._max_q = deque()
+
+    def push(self, x: float):
+        slot = self.pushed % self.window
+
+        if self.count == self.window:
+            old = self.values[slot]
+            self.sum -= old
+            self.sum_sq -= old**2
+        else:
+            self.count += 1
+
+        self.values[slot] = x
+        self.sum += x
+        self.sum_sq += x**2
+
+        # resync the sums once per window
+        if slot == self.window - 1 and self.count == self.window:
+            self.sum = float(self.values.sum())
+            self.sum_sq = float(np.dot(self.values, self.values))
+
+        # monotonic queues of (index, value) for min/max
+        while self._min_q and self._min_q[-1][1] >= x:
+            self._min_q.pop()
+        self._min_q.append((self.pushed, x))
+        while self._max_q and self._max_q[-1][1] <= x:
+            self._max_q.pop()
+        self._max_q.append((self.pushed, x))
+
+        self.pushed += 1
+        oldest = self.pushed - self.count
+        if self._min_q[0][0] < oldest:
+            self._min_q.popleft()
+        if self._max_q[0][0] < oldest:
+            self._max_q.popleft()
+
+        self.min = self._min_q[0][1]
+        self.max = self._max_q[0][1]
+
+    def _history(self):
+        # values currently in the window, oldest first
+        if self.count < self.window:
+            return self.values[:self.count]
+        return np.roll(self.values, -(self.pushed % self.window))
+
+    def rms_batch(self, x):
+        x = np.asarray(x, dtype=float)
+        k, h = x.shape
+        history = np.broadcast_to(self._history()**2, (k, self.count))
+        csum = np.cumsum(np.concatenate([np.zeros((k, 1)), history, x**2], axis=1), axis=1)
+
+        end = self.count + np.arange(1, h + 1)
+        start = np.maximum(end - self.window, 0)
+        return np.sqrt((csum[:, end] - csum[:, start]) / (end - start))
+
+    def get_state(self):
+        return (
+            self.count, self.sum, self.sum_sq, self.min, self.max,
+            self.pushed, self.values.copy(), tuple(self._min_q), tuple(self._max_q),
+        )
+
+    def set_state(self, state):
+        (self.count, self.sum, self.sum_sq, self.min, self.max,
+         self.pushed, values, min_q, max_q) = state
+        self.values = values.copy()
+        self._min_q = deque(min_q)
+        self._max_q = deque(max_q)
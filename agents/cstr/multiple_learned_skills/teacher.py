@@ -1,24 +1,32 @@
 import os
+import sys
 from composabl import Teacher
-import numpy as np
 import math
 import matplotlib.pyplot as plt
-import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from utils.history import history_recorder
+from utils.live_plot import plot_live
+from utils.obs_history import BoundedList, ObsHistory
+from utils.stats import RunningMean
 
 PATH = os.path.dirname(os.path.realpath(__file__))
 PATH_HISTORY = f"{PATH}/history"
+HISTORY_COLUMNS = ['time', 'Ca', 'Cref', 'reward', 'rms']
 
 class BaseCSTR(Teacher):
     def __init__(self):
         self.obs_history = None
-        self.reward_history = []
+        self.obs_retention = 1000
+        self.reward_history = BoundedList(self.obs_retention)
         self.last_reward = 0
-        self.error_history = []
-        self.rms_history = []
+        self.error_mean = RunningMean()
+        self.rms_history = BoundedList(self.obs_retention)
         self.last_reward = 0
         self.count = 0
         self.title = 'CSTR Live Control'
-        self.history_path = f"{PATH_HISTORY}/history.pkl"
+        self.history_path = f"{PATH_HISTORY}/history"
         self.metrics = 'none' #standard, fast, none
 
         # Create history folder if it doesn't exist
@@ -26,13 +34,9 @@ class BaseCSTR(Teacher):
             os.mkdir(PATH_HISTORY)
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(self.history_path)
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(self.history_path, HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
 
     def transform_obs(self, obs, action):
         return obs
@@ -45,15 +49,14 @@ class BaseCSTR(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
 
         # minimize error
@@ -67,9 +70,13 @@ class BaseCSTR(Teacher):
 
         # history metrics
         if self.metrics != 'none':
-            df_temp = pd.DataFrame(columns=['time','Ca','Cref','reward','rms'],data=[[self.count,transformed_obs['Ca'], transformed_obs['Cref'], reward, rms]])
-            self.df = pd.concat([self.df, df_temp])
-            self.df.to_pickle(self.history_path)
+            self.history.append(
+                time=self.count,
+                Ca=transformed_obs['Ca'],
+                Cref=transformed_obs['Cref'],
+                reward=reward,
+                rms=rms,
+            )
 
         return reward
 
@@ -82,11 +89,7 @@ class BaseCSTR(Teacher):
             success = False
         else:
             if self.metrics == 'standard':
-                try:
-                    self.plot_obs()
-                    self.plot_metrics()
-                except Exception as e:
-                    print('Error: ', e)
+                plot_live(self, "plot_obs", "plot_metrics")
 
         return success
 
@@ -101,20 +104,20 @@ class BaseCSTR(Teacher):
         plt.clf()
         plt.subplot(3,1,1)
         plt.plot(self.reward_history, 'r.-')
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['reward'],s=0.5, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('reward'),s=0.5, alpha=0.2)
         plt.ylabel('Reward')
         plt.legend(['reward'],loc='best')
         plt.title('Metrics')
 
         plt.subplot(3,1,2)
         plt.plot(self.rms_history, 'r.-')
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['rms'],s=0.5, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('rms'),s=0.5, alpha=0.2)
         plt.ylabel('RMS error')
         plt.legend(['RMS'],loc='best')
 
         plt.subplot(3,1,3)
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['Ca'],s=0.6, alpha=0.2)
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['Cref'],s=0.6, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('Ca'),s=0.6, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('Cref'),s=0.6, alpha=0.2)
         plt.ylabel('Ca')
         plt.legend(['Ca'],loc='best')
         plt.xlabel('iteration')
@@ -126,21 +129,21 @@ class BaseCSTR(Teacher):
         plt.figure(2,figsize=(7,5))
         plt.clf()
         plt.subplot(3,1,1)
-        plt.plot([ x["Tc"] for x in self.obs_history],'k.-',lw=2)
+        plt.plot(self.obs_history.column("Tc"),'k.-',lw=2)
         plt.ylabel('Cooling Tc (K)')
         plt.legend(['Jacket Temperature'],loc='best')
         plt.title(self.title)
 
 
         plt.subplot(3,1,2)
-        plt.plot([ x["Ca"] for x in self.obs_history],'b.-',lw=3)
-        plt.plot([ x["Cref"] for x in self.obs_history],'k--',lw=2,label=r'$C_{sp}$')
+        plt.plot(self.obs_history.column("Ca"),'b.-',lw=3)
+        plt.plot(self.obs_history.column("Cref"),'k--',lw=2,label=r'$C_{sp}$')
         plt.ylabel('Ca (mol/L)')
         plt.legend(['Reactor Concentration','Concentration Setpoint'],loc='best')
 
         plt.subplot(3,1,3)
-        plt.plot([ x["Tref"] for x in self.obs_history],'k--',lw=2,label=r'$T_{sp}$')
-        plt.plot([ x["T"] for x in self.obs_history],'b.-',lw=3,label=r'$T_{meas}$')
+        plt.plot(self.obs_history.column("Tref"),'k--',lw=2,label=r'$T_{sp}$')
+        plt.plot(self.obs_history.column("T"),'b.-',lw=3,label=r'$T_{meas}$')
         plt.ylabel('T (K)')
         plt.xlabel('Time (min)')
         plt.legend(['Temperature Setpoint','Reactor Temperature'],loc='best')
@@ -153,28 +156,23 @@ class SS1Teacher(BaseCSTR):
     def __init__(self):
         super().__init__()
         self.title = 'CSTR Live Control - SS1 skill'
-        self.history_path = f"{PATH_HISTORY}/ss1_history.pkl"
+        self.history_path = f"{PATH_HISTORY}/ss1_history"
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(self.history_path)
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(self.history_path, HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
 
         # minimize error
@@ -185,9 +183,13 @@ class SS1Teacher(BaseCSTR):
 
         # history metrics
         if self.metrics != 'none':
-            df_temp = pd.DataFrame(columns=['time','Ca','Cref','reward','rms'],data=[[self.count,transformed_obs['Ca'], transformed_obs['Cref'], reward, rms]])
-            self.df = pd.concat([self.df, df_temp])
-            self.df.to_pickle(self.history_path)
+            self.history.append(
+                time=self.count,
+                Ca=transformed_obs['Ca'],
+                Cref=transformed_obs['Cref'],
+                reward=reward,
+                rms=rms,
+            )
 
         return reward
 
@@ -202,28 +204,23 @@ class SS2Teacher(BaseCSTR):
     def __init__(self):
         super().__init__()
         self.title = 'CSTR Live Control - SS2 skill'
-        self.history_path = f"{PATH_HISTORY}/ss2_history.pkl"
+        self.history_path = f"{PATH_HISTORY}/ss2_history"
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(self.history_path)
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(self.history_path, HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
         # minimize error
         reward = 1 / rms
@@ -233,9 +230,13 @@ class SS2Teacher(BaseCSTR):
 
         # history metrics
         if self.metrics != 'none':
-            df_temp = pd.DataFrame(columns=['time','Ca','Cref','reward','rms'],data=[[self.count,transformed_obs['Ca'], transformed_obs['Cref'], reward, rms]])
-            self.df = pd.concat([self.df, df_temp])
-            self.df.to_pickle(self.history_path)
+            self.history.append(
+                time=self.count,
+                Ca=transformed_obs['Ca'],
+                Cref=transformed_obs['Cref'],
+                reward=reward,
+                rms=rms,
+            )
 
         return reward
 
@@ -249,28 +250,25 @@ class TransitionTeacher(BaseCSTR):
     def __init__(self):
         super().__init__()
         self.title = 'CSTR Live Control - Transition skill'
-        self.history_path = f"{PATH_HISTORY}/transition_history.pkl"
+        self.history_path = f"{PATH_HISTORY}/transition_history"
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(self.history_path)
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(self.history_path, HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
 
 class CSTRTeacher(BaseCSTR):
     def __init__(self):
         self.obs_history = None
-        self.reward_history = []
+        self.obs_retention = 1000
+        self.reward_history = BoundedList(self.obs_retention)
         self.last_reward = 0
-        self.error_history = []
-        self.rms_history = []
+        self.error_mean = RunningMean()
+        self.rms_history = BoundedList(self.obs_retention)
         self.last_reward = 0
         self.count = 0
         self.title = 'CSTR Live Control - Selector skill'
-        self.history_path = f"{PATH_HISTORY}/selector_history.pkl"
+        self.history_path = f"{PATH_HISTORY}/selector_history"
         self.plot = False
         self.metrics = 'none' #standard, fast, none
 
@@ -281,10 +279,6 @@ class CSTRTeacher(BaseCSTR):
             plt.ion()
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(self.history_path)
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(self.history_path, HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
@@ -1,16 +1,24 @@
+import os
+import sys
 from composabl import Teacher
-import numpy as np
 import math
 import matplotlib.pyplot as plt
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from utils.live_plot import plot_live
+from utils.obs_history import BoundedList, ObsHistory
+from utils.stats import RunningMean
+
 class BaseCSTR(Teacher):
     def __init__(self):
         self.obs_history = None
-        self.reward_history = []
+        self.obs_retention = 1000
+        self.reward_history = BoundedList(self.obs_retention)
         self.last_reward = 0
-        self.error_history = []
-        self.rms_history = []
+        self.error_mean = RunningMean()
+        self.rms_history = BoundedList(self.obs_retention)
         self.last_reward = 0
         self.count = 0
         self.title = 'CSTR Live Control'
@@ -37,15 +45,14 @@ class BaseCSTR(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
         # minimize rms error
         #reward = 1 / rms
@@ -74,11 +81,7 @@ class BaseCSTR(Teacher):
         else:
             success = len(self.obs_history) > 100
             if self.metrics == 'standard':
-                try:
-                    self.plot_obs()
-                    self.plot_metrics()
-                except Exception as e:
-                    print('Error: ', e)
+                plot_live(self, "plot_obs", "plot_metrics")
 
         return success
 
@@ -118,21 +121,21 @@ class BaseCSTR(Teacher):
         plt.figure(2,figsize=(7,5))
         plt.clf()
         plt.subplot(3,1,1)
-        plt.plot([ x["Tc"] for x in self.obs_history],'k.-',lw=2)
+        plt.plot(self.obs_history.column("Tc"),'k.-',lw=2)
         plt.ylabel('Cooling Tc (K)')
         plt.legend(['Jacket Temperature'],loc='best')
         plt.title(self.title)
 
 
         plt.subplot(3,1,2)
-        plt.plot([ x["Ca"] for x in self.obs_history],'b.-',lw=3)
-        plt.plot([ x["Cref"] for x in self.obs_history],'k--',lw=2,label=r'$C_{sp}$')
+        plt.plot(self.obs_history.column("Ca"),'b.-',lw=3)
+        plt.plot(self.obs_history.column("Cref"),'k--',lw=2,label=r'$C_{sp}$')
         plt.ylabel('Ca (mol/L)')
         plt.legend(['Reactor Concentration','Concentration Setpoint'],loc='best')
 
         plt.subplot(3,1,3)
-        plt.plot([ x["Tref"] for x in self.obs_history],'k--',lw=2,label=r'$T_{sp}$')
-        plt.plot([ x["T"] for x in self.obs_history],'b.-',lw=3,label=r'$T_{meas}$')
+        plt.plot(self.obs_history.column("Tref"),'k--',lw=2,label=r'$T_{sp}$')
+        plt.plot(self.obs_history.column("T"),'b.-',lw=3,label=r'$T_{meas}$')
         plt.ylabel('T (K)')
         plt.xlabel('Time (min)')
         plt.legend(['Temperature Setpoint','Reactor Temperature'],loc='best')
@@ -158,15 +161,14 @@ class SS1Teacher(BaseCSTR):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
         # minimize rms error
         reward = 1 / rms
@@ -205,15 +207,14 @@ class SS2Teacher(BaseCSTR):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
 
 
         error = (float(transformed_obs['Ca']) - float(transformed_obs['Cref']))**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.rms_history.append(rms)
         # minimize rms error
         reward = 1 / rms
@@ -252,10 +253,11 @@ class TransitionTeacher(BaseCSTR):
 class CSTRTeacher(BaseCSTR):
     def __init__(self):
         self.obs_history = None
-        self.reward_history = []
+        self.obs_retention = 1000
+        self.reward_history = BoundedList(self.obs_retention)
         self.last_reward = 0
-        self.error_history = []
-        self.rms_history = []
+        self.error_mean = RunningMean()
+        self.rms_history = BoundedList(self.obs_retention)
         self.last_reward = 0
         self.count = 0
         self.title = 'CSTR Live Control - Selector skill'
@@ -1,3 +1,5 @@
+import os
+import sys
 import math
 import numpy as np 
 
@@ -5,24 +7,30 @@ from composabl_core.agent import Teacher
 from mpc_model import mpc
 
 import matplotlib.pyplot as plt
-import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from utils.history import history_recorder
+from utils.live_plot import plot_live
+from utils.obs_history import BoundedList, ObsHistory
+from utils.stats import RunningMean
+
+HISTORY_COLUMNS = ['time', 'Ca', 'Cref', 'reward', 'rms']
 
 class CSTRTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
-        self.reward_history = []
-        self.error_history = []
+        self.obs_retention = 1000
+        self.reward_history = BoundedList(self.obs_retention)
+        self.error_mean = RunningMean()
         self.last_reward = 0
         self.count = 0
         self.metrics = 'none' #standard, fast, none
         
         # create metrics db
-        try:
-            self.df = pd.read_pickle('./cstr/skill_group_drl_mpc/history.pkl')
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except:
-            self.df = pd.DataFrame()
+        self.history = history_recorder('./cstr/skill_group_drl_mpc/history', HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
         
 
     def transform_obs(self, obs, action):
@@ -60,7 +68,7 @@ class CSTRTeacher(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         else:
             self.obs_history.append(transformed_obs)
@@ -68,15 +76,18 @@ class CSTRTeacher(Teacher):
         reward = math.e ** (-abs(transformed_obs['Cref'] - transformed_obs['Ca']))
 
         error = (transformed_obs['Cref'] - transformed_obs['Ca'])**2
-        self.error_history.append(error)
-        rms = math.sqrt(np.mean(self.error_history))
+        rms = math.sqrt(self.error_mean.update(error))
         self.last_reward = reward
         self.count += 1
 
         # history metrics
-        df_temp = pd.DataFrame(columns=['time','Ca','Cref','reward','rms'],data=[[self.count,transformed_obs['Ca'], transformed_obs['Cref'], reward, rms]])
-        self.df = pd.concat([self.df, df_temp])
-        self.df.to_pickle("./cstr/skill_group_drl_mpc/history.pkl")  
+        self.history.append(
+            time=self.count,
+            Ca=transformed_obs['Ca'],
+            Cref=transformed_obs['Cref'],
+            reward=reward,
+            rms=rms,
+        )
         return reward
 
     def compute_action_mask(self, transformed_obs, action):
@@ -87,11 +98,7 @@ class CSTRTeacher(Teacher):
             return False
         else:
             if self.metrics == 'standard':
-                try:
-                    self.plot_obs()
-                    self.plot_metrics()
-                except Exception as e:
-                    print('Error: ', e)
+                plot_live(self, "plot_obs", "plot_metrics")
 
             return len(self.obs_history) > 100
 
@@ -103,20 +110,20 @@ class CSTRTeacher(Teacher):
         plt.clf()
         plt.subplot(3,1,1)
         plt.plot(self.reward_history, 'r.-')
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['reward'],s=0.5, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('reward'),s=0.5, alpha=0.2)
         plt.ylabel('Reward')
         plt.legend(['reward'],loc='best')
         plt.title('Metrics')
         
         plt.subplot(3,1,2)
         plt.plot(self.rms_history, 'r.-')
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['rms'],s=0.5, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('rms'),s=0.5, alpha=0.2)
         plt.ylabel('RMS error')
         plt.legend(['RMS'],loc='best')
 
         plt.subplot(3,1,3)
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['Ca'],s=0.6, alpha=0.2)
-        plt.scatter(self.df.reset_index()['time'],self.df.reset_index()['Cref'],s=0.6, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('Ca'),s=0.6, alpha=0.2)
+        plt.scatter(self.history.column('time'),self.history.column('Cref'),s=0.6, alpha=0.2)
         plt.ylabel('Ca')
         plt.legend(['Ca'],loc='best')
         plt.xlabel('iteration')
@@ -128,21 +135,21 @@ class CSTRTeacher(Teacher):
         plt.figure(2,figsize=(7,5))
         plt.clf()
         plt.subplot(3,1,1)
-        plt.plot([ x["Tc"] for x in self.obs_history],'k.-',lw=2)
+        plt.plot(self.obs_history.column("Tc"),'k.-',lw=2)
         plt.ylabel('Cooling Tc (K)')
         plt.legend(['Jacket Temperature'],loc='best')
         plt.title('CSTR Live Control')
         
 
         plt.subplot(3,1,2)
-        plt.plot([ x["Ca"] for x in self.obs_history],'b.-',lw=3)
-        plt.plot([ x["Cref"] for x in self.obs_history],'k--',lw=2,label=r'$C_{sp}$')
+        plt.plot(self.obs_history.column("Ca"),'b.-',lw=3)
+        plt.plot(self.obs_history.column("Cref"),'k--',lw=2,label=r'$C_{sp}$')
         plt.ylabel('Ca (mol/L)')
         plt.legend(['Reactor Concentration','Concentration Setpoint'],loc='best')
 
         plt.subplot(3,1,3)
-        plt.plot([ x["Tref"] for x in self.obs_history],'k--',lw=2,label=r'$T_{sp}$')
-        plt.plot([ x["T"] for x in self.obs_history],'b.-',lw=3,label=r'$T_{meas}$')
+        plt.plot(self.obs_history.column("Tref"),'k--',lw=2,label=r'$T_{sp}$')
+        plt.plot(self.obs_history.column("T"),'b.-',lw=3,label=r'$T_{meas}$')
         plt.ylabel('T (K)')
         plt.xlabel('Time (min)')
         plt.legend(['Temperature Setpoint','Reactor Temperature'],loc='best')
@@ -1,10 +1,19 @@
-import numpy as np
+import os
+import sys
 from composabl import Teacher
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from utils.obs_history import ObsHistory
+from utils.stats import RunningMean
+
 
 class TemperatureControlTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
+        self.temperature_mean = RunningMean()
+        self.setpoint_mean = RunningMean()
         self.reward_history = []
         self.last_reward = 0
 
@@ -18,14 +27,14 @@ class TemperatureControlTeacher(Teacher):
         return ["y1", "y1ref", "u1", "rms"]
 
     def compute_reward(self, transformed_obs, action, sim_reward):
+        # means over every observation of the run, updated instead of recomputed every step
+        temperature = self.temperature_mean.update(transformed_obs['y1'])
+        temperature_setpoint = self.setpoint_mean.update(transformed_obs['y1ref'])
         if self.obs_history is None:
-            self.obs_history = [list(transformed_obs.values())]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         else:
-            self.obs_history.append(list(transformed_obs.values()))
-
-        temperature = np.mean(np.array(self.obs_history)[:, 0])
-        temperature_setpoint = np.mean(np.array(self.obs_history)[:, 1])
+            self.obs_history.append(transformed_obs)
 
         error = abs(temperature - temperature_setpoint)
         reward = 1 / (error)
@@ -1,28 +1,32 @@
 import os
-import pandas as pd
+import sys
 from composabl import Teacher
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from utils.history import history_recorder
+from utils.live_plot import plot_live
+from utils.obs_history import ObsHistory
+
 PATH = os.path.dirname(os.path.realpath(__file__))
 PATH_HISTORY = f"{PATH}/history"
+HISTORY_COLUMNS = ['inventory', 'balance', 'num_ordered', 'order_cutoff', 'reward', 'time']
 
 class BalanceTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.reward_history = []
         self.last_reward = 0
         self.cnt = 0
         self.plot = False
 
         # create metrics db
-        try:
-            self.df = pd.read_pickle(f"{PATH_HISTORY}/db.pkl")
-
-            #if self.metrics == 'fast':
-            #    self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(f"{PATH_HISTORY}/db", HISTORY_COLUMNS)
+        #if self.metrics == 'fast':
+        #    self.plot_metrics()
 
     def transform_obs(self, obs, action):
         return obs
@@ -43,7 +47,7 @@ class BalanceTeacher(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         else:
             self.obs_history.append(transformed_obs)
@@ -53,10 +57,14 @@ class BalanceTeacher(Teacher):
         reward = transformed_obs["balance"]/1e7
 
         # history metrics
-        df_temp = pd.DataFrame(columns=['inventory','balance','num_ordered','order_cutoff','reward','time'],
-        data=[[transformed_obs['inventory'],transformed_obs['balance'],transformed_obs['num_ordered'],action[0],reward,self.cnt]])
-        self.df = pd.concat([self.df, df_temp])
-        self.df.to_pickle(f"{PATH_HISTORY}/db.pkl")
+        self.history.append(
+            inventory=transformed_obs['inventory'],
+            balance=transformed_obs['balance'],
+            num_ordered=transformed_obs['num_ordered'],
+            order_cutoff=action[0],
+            reward=reward,
+            time=self.cnt,
+        )
         return reward
 
     def compute_action_mask(self, transformed_obs, action):
@@ -65,7 +73,7 @@ class BalanceTeacher(Teacher):
     def compute_success_criteria(self, transformed_obs, action):
         if self.obs_history != None:
             if self.plot:
-                self.plot_obs()
+                plot_live(self, "plot_obs")
 
         return False
 
@@ -75,17 +83,17 @@ class BalanceTeacher(Teacher):
     def plot_obs(self):
         plt.clf()
         plt.subplot(3,1,1)
-        plt.plot([x['inventory'] for x in self.obs_history])
+        plt.plot(self.obs_history.column('inventory'))
         plt.xlabel("Simulation time (days)")
         plt.ylabel("Inventory level")
 
         plt.subplot(3,1,2)
-        plt.plot([x['balance'] for x in self.obs_history])
+        plt.plot(self.obs_history.column('balance'))
         plt.xlabel("Simulation time (days)")
         plt.ylabel("Balance History ($)")
 
         plt.subplot(3,1,3)
-        plt.plot([x['num_ordered'] for x in self.obs_history] )
+        plt.plot(self.obs_history.column('num_ordered') )
         plt.xlabel("Simulation time (days)")
         plt.ylabel("Order History")
 
@@ -1,11 +1,18 @@
+import os
+import sys
 import math
 
 from composabl_core.agent import Teacher
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from utils.obs_history import ObsHistory
+
 
 class StabilizeTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.reward_history = []
         self.width = 600
         self.scale = 30
@@ -14,7 +21,7 @@ class StabilizeTeacher(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         self.obs_history.append(transformed_obs)
         return 1
@@ -58,13 +65,14 @@ class StabilizeTeacher(Teacher):
 class MoveToCenterTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.width = 600
         self.scale = 30
         self.error_tolerance = 0.01
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         VIEWPORT_W = 600
         SCALE = 30.0
@@ -115,13 +123,14 @@ class MoveToCenterTeacher(Teacher):
 class LandTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.width = 600
         self.scale = 30
         self.error_tolerance = 0.01
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         VIEWPORT_W = 600
         SCALE = 30.0
@@ -172,13 +181,14 @@ class LandTeacher(Teacher):
 class SelectorTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.width = 600
         self.scale = 30
         self.error_tolerance = 0.01
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0
         reward = 0
         # landed
@@ -1,18 +1,26 @@
 import os
+import sys
 from composabl import Teacher
 import numpy as np
 import math
 import matplotlib.pyplot as plt
-import pandas as pd
 from sensors import sensors
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from utils.history import history_recorder
+from utils.live_plot import plot_live
+from utils.obs_history import ObsHistory
+
 PATH = os.path.dirname(os.path.realpath(__file__))
 PATH_HISTORY = f"{PATH}/history"
+HISTORY_COLUMNS = ['time', 'completed_cookies', 'completed_cupcakes', 'completed_cake', 'reward']
 
 
 class BaseTeacher(Teacher):
     def __init__(self):
         self.obs_history = None
+        self.obs_retention = 1000
         self.reward_history = []
         self.last_reward = 0
         self.error_history = []
@@ -23,13 +31,9 @@ class BaseTeacher(Teacher):
         self.metrics = 'none' # standard, fast, none
 
         # Read metrics db
-        try:
-            self.df = pd.read_pickle(f"{PATH_HISTORY}/db.pkl")
-
-            if self.metrics == 'fast':
-                self.plot_metrics()
-        except Exception:
-            self.df = pd.DataFrame()
+        self.history = history_recorder(f"{PATH_HISTORY}/db", HISTORY_COLUMNS)
+        if self.metrics == 'fast':
+            self.plot_metrics()
 
     def transform_obs(self, obs, action):
         return obs
@@ -42,7 +46,7 @@ class BaseTeacher(Teacher):
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
@@ -71,12 +75,13 @@ class BaseTeacher(Teacher):
 
         # history metrics
         if self.metrics != 'none':
-            df_temp = pd.DataFrame(columns=['time', "completed_cookies", "completed_cupcakes","completed_cake" ,'reward'], 
-                                   data=[[self.count,float(transformed_obs["completed_cookies"]), float(transformed_obs["completed_cupcakes"]),
-                                          float(transformed_obs["completed_cake"]),
-                                           reward]])
-            self.df = pd.concat([self.df, df_temp])
-            self.df.to_pickle(f"{PATH_HISTORY}/db.pkl")
+            self.history.append(
+                time=self.count,
+                completed_cookies=float(transformed_obs["completed_cookies"]),
+                completed_cupcakes=float(transformed_obs["completed_cupcakes"]),
+                completed_cake=float(transformed_obs["completed_cake"]),
+                reward=reward,
+            )
 
         return reward
 
@@ -90,11 +95,7 @@ class BaseTeacher(Teacher):
         else:
             success = False
             if self.metrics == 'standard':
-                try:
-                    self.plot_obs()
-                    self.plot_metrics()
-                except Exception as e:
-                    print('Error: ', e)
+                plot_live(self, "plot_obs", "plot_metrics")
 
         return success
 
@@ -106,15 +107,15 @@ class BaseTeacher(Teacher):
         plt.clf()
         plt.subplot(2, 1, 1)
         plt.plot(self.reward_history, 'r.-')
-        plt.scatter(self.df.reset_index()['time'], self.df.reset_index()['reward'], s=0.5, alpha=0.2)
+        plt.scatter(self.history.column('time'), self.history.column('reward'), s=0.5, alpha=0.2)
         plt.ylabel('Reward')
         plt.legend(['reward'],loc='best')
         plt.title('Metrics')
 
         plt.subplot(2, 1, 2)
-        plt.plot(self.df.reset_index()['time'],self.df.reset_index()["completed_cookies"])
-        plt.plot(self.df.reset_index()['time'],self.df.reset_index()["completed_cupcakes"])
-        plt.plot(self.df.reset_index()['time'],self.df.reset_index()["completed_cake"])
+        plt.plot(self.history.column('time'),self.history.column('completed_cookies'))
+        plt.plot(self.history.column('time'),self.history.column('completed_cupcakes'))
+        plt.plot(self.history.column('time'),self.history.column('completed_cake'))
         plt.ylabel('Completed')
         plt.legend(['cookies','cupcakes','cake'],loc='best')
         plt.xlabel('iteration')
@@ -126,9 +127,9 @@ class BaseTeacher(Teacher):
         plt.figure(2,figsize=(7,5))
         plt.clf()
         plt.subplot(6,1,1)
-        plt.plot([ x["completed_cookies"] for x in self.obs_history],'k.-',lw=2)
-        plt.plot([ x["completed_cupcakes"] for x in self.obs_history],'b.-',lw=2)
-        plt.plot([ x["completed_cake"] for x in self.obs_history],'r.-',lw=2)
+        plt.plot(self.obs_history.column("completed_cookies"),'k.-',lw=2)
+        plt.plot(self.obs_history.column("completed_cupcakes"),'b.-',lw=2)
+        plt.plot(self.obs_history.column("completed_cake"),'r.-',lw=2)
         plt.ylabel('Completed')
         plt.legend(['cookies','cupcakes','cake'],loc='best')
         plt.title('Live Control')
@@ -163,10 +164,10 @@ class BaseTeacher(Teacher):
         plt.legend(['Action'],loc='best')
 
         plt.subplot(6,1,6)
-        plt.plot([ x["baker_1_time_remaining"] for x in self.obs_history],'k.-',lw=2)
-        plt.plot([ x["baker_2_time_remaining"] for x in self.obs_history],'b.-',lw=2)
-        plt.plot([ x["baker_3_time_remaining"] for x in self.obs_history],'r.-',lw=2)
-        plt.plot([ x["baker_4_time_remaining"] for x in self.obs_history],'g.-',lw=2)
+        plt.plot(self.obs_history.column("baker_1_time_remaining"),'k.-',lw=2)
+        plt.plot(self.obs_history.column("baker_2_time_remaining"),'b.-',lw=2)
+        plt.plot(self.obs_history.column("baker_3_time_remaining"),'r.-',lw=2)
+        plt.plot(self.obs_history.column("baker_4_time_remaining"),'g.-',lw=2)
         plt.ylabel('Completed')
         plt.legend(['baker1','baker2','baker3', 'baker4'],loc='best')
 
@@ -182,7 +183,7 @@ class BaseTeacher(Teacher):
 class CookiesTeacher(BaseTeacher):
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
@@ -193,18 +194,19 @@ class CookiesTeacher(BaseTeacher):
         self.count += 1
 
         # history metrics
-        df_temp = pd.DataFrame(columns=['time', "completed_cookies", "completed_cupcakes","completed_cake" ,'reward'], 
-                               data=[[self.count,float(transformed_obs["completed_cookies"]), float(transformed_obs["completed_cupcakes"]),
-                                      float(transformed_obs["completed_cake"]),
-                                       reward]])
-        self.df = pd.concat([self.df, df_temp])
-        self.df.to_pickle(f"{PATH_HISTORY}/db.pkl")
+        self.history.append(
+            time=self.count,
+            completed_cookies=float(transformed_obs["completed_cookies"]),
+            completed_cupcakes=float(transformed_obs["completed_cupcakes"]),
+            completed_cake=float(transformed_obs["completed_cake"]),
+            reward=reward,
+        )
 
         return reward
 
     def compute_reward(self, transformed_obs, action, sim_reward):
         if self.obs_history is None:
-            self.obs_history = [transformed_obs]
+            self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
             return 0.0
         else:
             self.obs_history.append(transformed_obs)
@@ -215,11 +217,12 @@ class CookiesTeacher(BaseTeacher):
         self.count += 1
 
         # history metrics
-        df_temp = pd.DataFrame(columns=['time', "completed_cookies", "completed_cupcakes","completed_cake" ,'reward'], 
-                               data=[[self.count,float(transformed_obs["completed_cookies"]), float(transformed_obs["completed_cupcakes"]),
-                                      float(transformed_obs["completed_cake"]),
-                                       reward]])
-        self.df = pd.concat([self.df, df_temp])
-        self.df.to_pickle(f"{PATH_HISTORY}/db.pkl")
+        self.history.append(
+            time=self.count,
+            completed_cookies=float(transformed_obs["completed_cookies"]),
+            completed_cupcakes=float(transformed_obs["completed_cupcakes"]),
+            completed_cake=float(transformed_obs["completed_cake"]),
+            reward=reward,
+        )
 
         return reward
\ No newline at end of file
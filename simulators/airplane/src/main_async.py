@@ -0,0 +1,11 @@
+import os
+import sys
+
+# the shared server modules, copied next to this file in the sim image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from serve_async import start
+
+
+if __name__ == "__main__":
+    start()
@@ -3,7 +3,6 @@ import math
 import random
 import numpy as np
 
-import control
 from scipy import signal
 
 from composabl_core.agent.scenario import Scenario
@@ -0,0 +1,182 @@
+"""
+asyncio adapter for the simulator ServerImpl, used by `main_async.py`.
+
+Env work (Make, Reset, Step, GetRender, ...) runs on a bounded thread pool so
+a slow step never blocks the event loop. Control calls (ObservationSpaceInfo,
+ActionSpaceInfo, ObservationEncoding, GetScenario, GetRenderMode, Health) are
+answered inline and stay responsive under load. At most `max_concurrency` env calls are admitted
+at once, and each one must finish within `deadline` seconds, queueing included.
+
+A thread cannot be cancelled, so a call past its deadline keeps running in the
+background while its client gets a TimeoutError. The env is then in a state no
+client has seen, and every env call other than Reset, Make and Close is refused
+until one of them has run, after the abandoned call.
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import composabl_core.utils.logger as logger_util
+import gymnasium as gym
+from composabl_core.grpc.server.server_composabl import ServerComposabl
+
+logger = logger_util.get_logger(__name__)
+
+
+# calls that leave the env in a state the client knows, after a timeout
+RECOVERY_CALLS = ("Reset", "Make", "Close")
+
+
+class AsyncServerImpl(ServerComposabl):
+    '''
+    Wraps `server_impl`, a single-env ServerImpl, for an asyncio server.
+    Subclasses are built with `with_async`.
+    '''
+    server_impl = None
+    max_workers = 4
+    max_concurrency = 16
+    deadline = None
+
+    def __init__(self):
+        self.impl = self.server_impl()
+        self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sim-env")
+        # the env is not thread safe, env calls run one at a time in arrival order of the lock
+        self.env_lock = threading.Lock()
+        self.limit = None
+        # the call that timed out and left the env in an unknown state, until a recovery call
+        self.stale = None
+
+        self.started = time.monotonic()
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+
+    def _check(self, name: str):
+        if self.stale is not None and name not in RECOVERY_CALLS:
+            raise RuntimeError(
+                f"{name} refused, an earlier {self.stale} timed out and the env state is unknown, call Reset"
+            )
+
+    def _call(self, name: str, *args, **kwargs):
+        with self.env_lock:
+            # checked again under the lock, for calls queued behind the one that timed out
+            self._check(name)
+            result = getattr(self.impl, name)(*args, **kwargs)
+            if name in RECOVERY_CALLS:
+                self.stale = None
+            return result
+
+    async def _dispatch(self, name: str, *args, **kwargs):
+        if self.limit is None:
+            # created lazily, the semaphore binds to the running loop
+            self.limit = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, name, *args, **kwargs)
+
+        async with self.limit:
+            self.in_flight += 1
+            try:
+                return await loop.run_in_executor(self.executor, call)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def run(self, name: str, *args, **kwargs):
+        '''Run `impl.<name>` on the executor within the concurrency limit and deadline.'''
+        self._check(name)
+        try:
+            return await asyncio.wait_for(self._dispatch(name, *args, **kwargs), self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            # the call may still be running in its thread, or about to
+            self.stale = name
+            raise TimeoutError(f"{name} exceeded its deadline of {self.deadline}s, call Reset before stepping again")
+
+    # Env work, off the event loop
+
+    async def Make(self, env_id: str, env_init: dict, **kwargs):
+        return await self.run("Make", env_id, env_init, **kwargs)
+
+    async def ActionSpaceSample(self, **kwargs) -> Any:
+        return await self.run("ActionSpaceSample", **kwargs)
+
+    async def Reset(self, **kwargs):
+        return await self.run("Reset", **kwargs)
+
+    async def Step(self, action, **kwargs):
+        return await self.run("Step", action, **kwargs)
+
+    async def StepSequence(self, actions, **kwargs):
+        return await self.run("StepSequence", actions, **kwargs)
+
+    async def Close(self, **kwargs):
+        return await self.run("Close", **kwargs)
+
+    async def SetScenario(self, scenario, **kwargs):
+        return await self.run("SetScenario", scenario, **kwargs)
+
+    async def SetRewardFunc(self, reward_func, **kwargs):
+        return await self.run("SetRewardFunc", reward_func, **kwargs)
+
+    async def GetRender(self, **kwargs):
+        return await self.run("GetRender", **kwargs)
+
+    async def GetRenderFrame(self, **kwargs):
+        return await self.run("GetRenderFrame", **kwargs)
+
+    async def SetRenderMode(self, render_mode, **kwargs):
+        return await self.run("SetRenderMode", render_mode, **kwargs)
+
+    async def SetRenderStream(self, *args, **kwargs):
+        return await self.run("SetRenderStream", *args, **kwargs)
+
+    async def SetPolicy(self, policy, **kwargs):
+        return await self.run("SetPolicy", policy, **kwargs)
+
+    async def Rollout(self, episodes: int = 1, max_steps: Optional[int] = None, scenario=None, **kwargs):
+        return await self.run("Rollout", episodes, max_steps, scenario, **kwargs)
+
+    # Control calls, answered inline
+
+    def ObservationSpaceInfo(self, **kwargs) -> gym.Space:
+        return self.impl.ObservationSpaceInfo(**kwargs)
+
+    def ActionSpaceInfo(self, **kwargs) -> gym.Space:
+        return self.impl.ActionSpaceInfo(**kwargs)
+
+    def GetScenario(self, **kwargs):
+        return self.impl.GetScenario(**kwargs)
+
+    def GetRenderMode(self, **kwargs):
+        return self.impl.GetRenderMode(**kwargs)
+
+    def ObservationEncoding(self, **kwargs):
+        return self.impl.ObservationEncoding(**kwargs)
+
+    def Health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok" if self.stale is None else "needs_reset",
+            "uptime": time.monotonic() - self.started,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+def with_async(server_impl, max_workers: int = 4, max_concurrency: int = 16, deadline: Optional[float] = None):
+    '''Build an AsyncServerImpl class serving `server_impl` from a bounded executor.'''
+    return type(
+        f"Async{server_impl.__name__}",
+        (AsyncServerImpl,),
+        {
+            "server_impl": server_impl,
+            "max_workers": max_workers,
+            "max_concurrency": max_concurrency,
+            "deadline": deadline,
+        },
+    )
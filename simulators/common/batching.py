@@ -0,0 +1,115 @@
+"""
+Batched StepMany / ResetMany / StepSequence calls for the simulator servers.
+
+The fallback implementations loop over the single-env `Step` and `Reset` of
+the ServerComposabl interface and stack the results into one message, so every
+sim gets them for free. Sims that vectorize natively can override them.
+
+The composabl gRPC protocol has no batched RPCs, so these calls are served in
+process and over the shared memory transport only. `with_batching` gives a
+plain ServerImpl `StepSequence`. `StepMany` and `ResetMany` move several
+hosted envs, so they need the session server of `with_sessions`, which
+`--shm-sessions` puts behind every shm connection.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from composabl_core.grpc.server.server_composabl import ServerComposabl
+
+
+def stack(values):
+    '''
+    Stack per-env observations, dict observations are stacked per key. Packed
+    observations are joined into one contiguous (K * size) float32 buffer.
+    '''
+    first = values[0]
+    if isinstance(first, bytes):
+        return b"".join(values)
+    if isinstance(first, dict):
+        return {key: stack([v[key] for v in values]) for key in first}
+    if isinstance(first, tuple):
+        return tuple(stack([v[i] for v in values]) for i in range(len(first)))
+    return np.stack([np.asarray(v) for v in values])
+
+
+def stack_steps(results) -> Dict[str, Any]:
+    obs, rewards, terminated, truncated, infos = zip(*results)
+    return {
+        "observations": stack(obs),
+        "rewards": np.asarray(rewards, dtype=float),
+        "terminated": np.asarray(terminated, dtype=bool),
+        "truncated": np.asarray(truncated, dtype=bool),
+        "infos": list(infos),
+    }
+
+
+def stack_resets(results) -> Dict[str, Any]:
+    obs, infos = zip(*results)
+    return {"observations": stack(obs), "infos": list(infos)}
+
+
+def step_sequence(step, actions: List[Any], stop_on_done: bool = True) -> Dict[str, Any]:
+    '''
+    Apply `actions` one after the other with `step`. With `stop_on_done` the
+    sequence ends at the first terminated or truncated step, so fewer than K
+    results can come back.
+    '''
+    results = []
+    for action in actions:
+        results.append(step(action))
+        if stop_on_done and (results[-1][2] or results[-1][3]):
+            break
+
+    if not results:
+        raise ValueError("StepSequence needs at least one action")
+    return stack_steps(results)
+
+
+class BatchedMixin:
+    '''
+    The batched calls of a single-env ServerImpl. `StepSequence` applies a
+    buffer of K actions to its env, `StepMany` and `ResetMany` refuse, there is
+    only one env to move.
+    '''
+
+    def StepSequence(self, actions: List[Any], stop_on_done: bool = True) -> Dict[str, Any]:
+        return step_sequence(self.Step, actions, stop_on_done)
+
+    def StepMany(self, actions: List[Any], session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        raise RuntimeError("StepMany moves several hosted envs, it needs a session server (--shm-sessions)")
+
+    def ResetMany(self, session_ids: List[str]) -> Dict[str, Any]:
+        raise RuntimeError("ResetMany resets several hosted envs, it needs a session server (--shm-sessions)")
+
+
+def with_batching(server_impl):
+    '''Build a `server_impl` subclass with the batched calls of BatchedMixin.'''
+    return type(f"Batched{server_impl.__name__}", (BatchedMixin, server_impl), {})
+
+
+class BatchedServerComposabl(ServerComposabl):
+    '''
+    Batched calls on top of the ServerComposabl interface.
+
+    `StepMany`/`ResetMany` move K hosted envs (one per session id) by one step,
+    `StepSequence` applies a buffer of K actions to one env. All of them return
+    stacked arrays: observations (K, ...), rewards (K,), terminated (K,) and
+    truncated (K,), plus the list of infos.
+    '''
+
+    def StepMany(self, actions: List[Any], session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        if session_ids is None:
+            raise ValueError("StepMany needs one session id per action")
+        if len(actions) != len(session_ids):
+            raise ValueError(f"Got {len(actions)} actions for {len(session_ids)} sessions")
+
+        return stack_steps([
+            self.Step(action, session_id=session_id)
+            for action, session_id in zip(actions, session_ids)
+        ])
+
+    def ResetMany(self, session_ids: List[str]) -> Dict[str, Any]:
+        return stack_resets([self.Reset(session_id=session_id) for session_id in session_ids])
+
+    def StepSequence(self, actions: List[Any], session_id: Optional[str] = None, stop_on_done: bool = True) -> Dict[str, Any]:
+        return step_sequence(lambda action: self.Step(action, session_id=session_id), actions, stop_on_done)
@@ -0,0 +1,158 @@
+"""
+Packed float32 observation encoding, negotiated at Make.
+
+A client asks for it with `env_init["obs_encoding"] = "packed"`. Observations
+are then returned as raw bytes: every field of the observation space in a
+fixed order, in one contiguous float32 buffer. An agent decodes them without
+a copy with `np.frombuffer(buf, dtype=np.float32)`, or with
+`PackedEncoding(observation_space).unflatten(...)` from `utils/encoding.py` to
+get the structured observation back. `schema_id` identifies the layout, so
+both sides can check they agree on it.
+
+The composabl client and runtime have no decoder and hand the bytes on as
+they are, so agents trained on them must not ask for it. It is for clients of
+their own, e.g. over the shared memory transport.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+import gymnasium as gym
+import numpy as np
+
+PACKED = "packed"
+
+
+def fields(space: gym.Space, keys: Tuple = ()) -> List[Tuple[Tuple, str, Tuple[int, ...]]]:
+    '''(keys, space type, shape) of every leaf of `space`, in encoding order.'''
+    if isinstance(space, gym.spaces.Dict):
+        return [f for key, sub in space.spaces.items() for f in fields(sub, keys + (key,))]
+    if isinstance(space, gym.spaces.Tuple):
+        return [f for i, sub in enumerate(space.spaces) for f in fields(sub, keys + (i,))]
+    if isinstance(space, gym.spaces.Discrete):
+        return [(keys, "Discrete", ())]
+    if isinstance(space, (gym.spaces.Box, gym.spaces.MultiDiscrete, gym.spaces.MultiBinary)):
+        return [(keys, type(space).__name__, tuple(int(n) for n in space.shape))]
+    raise NotImplementedError(f"No packed encoding for {type(space).__name__} spaces")
+
+
+def path(keys: Tuple) -> str:
+    return "/" + "/".join(str(k) for k in keys)
+
+
+class PackedEncoding:
+    '''Flat float32 layout of an observation space.'''
+
+    def __init__(self, space: gym.Space):
+        self.space = space
+        self.fields = fields(space)
+
+        self.slices = []
+        offset = 0
+        for _, _, shape in self.fields:
+            size = int(np.prod(shape, dtype=int))
+            self.slices.append(slice(offset, offset + size))
+            offset += size
+        self.size = offset
+        self.nbytes = 4 * offset
+
+        schema = json.dumps([[path(k), t, list(s)] for k, t, s in self.fields])
+        self.schema_id = hashlib.sha1(schema.encode()).hexdigest()[:16]
+        self.buffer = np.zeros(self.size, dtype=np.float32)
+
+    def schema(self) -> Dict[str, Any]:
+        return {
+            "obs_encoding": PACKED,
+            "schema_id": self.schema_id,
+            "dtype": "float32",
+            "size": self.size,
+            "fields": [{"path": path(k), "type": t, "shape": list(s)} for k, t, s in self.fields],
+        }
+
+    def leaves(self, obs):
+        '''Values of the fields of `obs`, in encoding order.'''
+        for keys, _, _ in self.fields:
+            value = obs
+            for key in keys:
+                value = value[key]
+            yield value
+
+    def encode(self, obs) -> bytes:
+        if len(self.fields) == 1:
+            return np.asarray(obs, dtype=np.float32).reshape(-1).tobytes()
+
+        buffer = self.buffer
+        for (keys, _, shape), s in zip(self.fields, self.slices):
+            value = obs
+            for key in keys:
+                value = value[key]
+            if shape:
+                buffer[s] = np.ravel(value)
+            else:
+                buffer[s.start] = value
+        return buffer.tobytes()
+
+    @staticmethod
+    def decode(buf) -> np.ndarray:
+        '''Zero-copy float32 view of one packed observation, or of K stacked ones.'''
+        return np.frombuffer(buf, dtype=np.float32)
+
+    def unflatten(self, flat):
+        '''Structured observation of the space from a decoded buffer, leaves are views.'''
+        flat = self.decode(flat) if isinstance(flat, (bytes, bytearray, memoryview)) else flat
+        leaves = iter(
+            flat[s].reshape(shape) if shape else flat[s.start]
+            for s, (_, _, shape) in zip(self.slices, self.fields)
+        )
+        return self._rebuild(self.space, leaves)
+
+    def _rebuild(self, space, leaves):
+        if isinstance(space, gym.spaces.Dict):
+            return {key: self._rebuild(sub, leaves) for key, sub in space.spaces.items()}
+        if isinstance(space, gym.spaces.Tuple):
+            return tuple(self._rebuild(sub, leaves) for sub in space.spaces)
+        return next(leaves)
+
+
+class PackedObsMixin:
+    '''
+    Mixin for a ServerImpl so Reset/Step return packed observations once a
+    client negotiated them at Make. Without negotiation every call behaves as
+    before. Classes are built with `with_packed_obs`.
+    '''
+    encoding = None
+
+    def Make(self, env_id: str, env_init: dict):
+        env_init = dict(env_init or {})
+        requested = env_init.pop("obs_encoding", None)
+        if requested not in (None, PACKED):
+            raise ValueError(f"Unknown obs_encoding {requested}, supported: {PACKED}")
+
+        spec = super().Make(env_id, env_init)
+
+        self.encoding = None
+        if requested == PACKED:
+            self.encoding = PackedEncoding(self.ObservationSpaceInfo())
+            if isinstance(spec, dict):
+                spec = {**spec, **self.encoding.schema()}
+        return spec
+
+    def ObservationEncoding(self):
+        return self.encoding.schema() if self.encoding else None
+
+    def Reset(self):
+        obs, info = super().Reset()
+        if self.encoding:
+            obs = self.encoding.encode(obs)
+        return obs, info
+
+    def Step(self, action):
+        obs, reward, terminated, truncated, info = super().Step(action)
+        if self.encoding:
+            obs = self.encoding.encode(obs)
+        return obs, reward, terminated, truncated, info
+
+
+def with_packed_obs(server_impl):
+    '''Build a `server_impl` subclass that negotiates packed observations at Make.'''
+    return type(f"Packed{server_impl.__name__}", (PackedObsMixin, server_impl), {})
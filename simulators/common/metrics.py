@@ -0,0 +1,306 @@
+"""
+Opt-in server metrics: per-RPC latency histograms, steps/sec, active sessions
+and the split of wall time between `env.step`, the rest of the server and
+the time spent outside the server (network, serialization, the agent).
+
+Enabled in main.py by `--metrics-port` (text endpoint) and/or
+`--metrics-interval` (a summary log line every N seconds), which wrap
+ServerImpl with `with_metrics`. When both are 0 nothing is wrapped, so the
+disabled path has no overhead at all.
+
+Every call of the ServerImpl is metered, the in-process ones such as
+`Rollout` and `StepSequence` included. Calls made from within another one,
+like the `Step`s of a `StepSequence`, get their own histogram but count once
+toward the server time, and only `env.step` calls inside a metered call count
+toward the env time, so the split adds up.
+
+The metrics are those of one process. Under `--processes N` every worker logs
+its own summary, and the text endpoint serves the worker that bound the port
+first. Both carry the pid of the process they describe.
+"""
+import os
+import threading
+import time
+from typing import Dict
+
+import composabl_core.utils.logger as logger_util
+
+logger = logger_util.get_logger(__name__)
+
+RPCS = [
+    "Make", "Reset", "Step", "Close", "ObservationSpaceInfo", "ActionSpaceInfo", "ActionSpaceSample",
+    "SetScenario", "GetScenario", "SetRewardFunc", "SetRenderMode", "GetRenderMode", "GetRender",
+]
+
+SUB_BITS = 5  # 16 sub-buckets per power of two, buckets within about 6% of the value
+HALF = 1 << (SUB_BITS - 1)
+BUCKETS = 64 * HALF
+
+
+class Histogram:
+    '''
+    HDR-style log-linear histogram of durations in nanoseconds. Recording is
+    O(1) and the memory is fixed, whatever the number of samples.
+    '''
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        shift = value.bit_length() - SUB_BITS
+        if shift <= 0:
+            return value
+        return min(shift * HALF + (value >> shift), BUCKETS - 1)
+
+    @staticmethod
+    def value(index: int) -> int:
+        '''Lowest value of the bucket `index`.'''
+        if index < 2 * HALF:
+            return index
+        shift = index // HALF - 1
+        return (index - shift * HALF) << shift
+
+    def record(self, value: int):
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.value(i + 1), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    '''Process-wide registry shared by every metered ServerImpl instance.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.started = time.monotonic()
+        self.rpcs: Dict[str, Histogram] = {name: Histogram() for name in RPCS}
+        self.rpc_ns = 0
+        self.env_step_ns = 0
+        self.steps = 0
+        self.sessions = set()
+        self._last = (self.started, 0)
+
+    def open_session(self, key):
+        with self.lock:
+            if not self.sessions and not self.steps:
+                # wall time counts from the first session, not from the import
+                self.started = time.monotonic()
+            self.sessions.add(key)
+
+    def close_session(self, key):
+        with self.lock:
+            self.sessions.discard(key)
+
+    def record(self, name: str, elapsed: int, outermost: bool = True):
+        with self.lock:
+            histogram = self.rpcs.get(name)
+            if histogram is None:
+                histogram = self.rpcs[name] = Histogram()
+            histogram.record(elapsed)
+            if outermost:
+                self.rpc_ns += elapsed
+
+    def record_env_step(self, elapsed: int):
+        with self.lock:
+            self.env_step_ns += elapsed
+            self.steps += 1
+
+    def steps_per_sec(self) -> float:
+        '''Steps/sec since the previous call.'''
+        with self.lock:
+            now = time.monotonic()
+            last_time, last_steps = self._last
+            self._last = (now, self.steps)
+            return (self.steps - last_steps) / max(now - last_time, 1e-9)
+
+    def split(self):
+        '''
+        Fractions of a session's wall time spent inside env.step, elsewhere in
+        the server, and outside it, averaged over the active sessions. Call with
+        the lock held.
+        '''
+        wall = max(time.monotonic() - self.started, 1e-9) * 1e9
+        sessions = max(len(self.sessions), 1)
+        env = self.env_step_ns / sessions / wall
+        server = (self.rpc_ns - self.env_step_ns) / sessions / wall
+        return env, server, max(1 - env - server, 0.0)
+
+    def text(self) -> str:
+        '''Metrics in the Prometheus text format.'''
+        lines = []
+        with self.lock:
+            for name, h in self.rpcs.items():
+                if not h.count:
+                    continue
+                for q in (50, 90, 99, 99.9):
+                    lines.append(f'sim_rpc_latency_seconds{{rpc="{name}",quantile="{q / 100:g}"}} {h.percentile(q) / 1e9:.9f}')
+                lines.append(f'sim_rpc_latency_seconds_max{{rpc="{name}"}} {h.max / 1e9:.9f}')
+                lines.append(f'sim_rpc_latency_seconds_sum{{rpc="{name}"}} {h.total / 1e9:.9f}')
+                lines.append(f'sim_rpc_latency_seconds_count{{rpc="{name}"}} {h.count}')
+            env, server, outside = self.split()
+            lines += [
+                f'sim_process_info{{pid="{self.pid}"}} 1',
+                f"sim_steps_total {self.steps}",
+                f"sim_active_sessions {len(self.sessions)}",
+                f"sim_env_step_seconds_total {self.env_step_ns / 1e9:.6f}",
+                f"sim_rpc_seconds_total {self.rpc_ns / 1e9:.6f}",
+                f'sim_time_fraction{{where="env_step"}} {env:.4f}',
+                f'sim_time_fraction{{where="server"}} {server:.4f}',
+                f'sim_time_fraction{{where="outside"}} {outside:.4f}',
+            ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        rate = self.steps_per_sec()
+        with self.lock:
+            step = self.rpcs["Step"]
+            env, server, outside = self.split()
+            return (
+                f"metrics (pid {self.pid}): {rate:.1f} steps/s, {len(self.sessions)} sessions, "
+                f"Step p50 {step.percentile(50) / 1e3:.1f}µs p99 {step.percentile(99) / 1e3:.1f}µs "
+                f"max {step.max / 1e3:.1f}µs, time in env.step {env:.0%} / server {server:.0%} / outside {outside:.0%}"
+            )
+
+
+METRICS = Metrics()
+
+# metered calls running on this thread, the outermost one counts toward rpc_ns
+_depth = threading.local()
+
+
+def _timed(name: str, call, *args, **kwargs):
+    depth = getattr(_depth, "value", 0)
+    _depth.value = depth + 1
+    start = time.perf_counter_ns()
+    try:
+        return call(*args, **kwargs)
+    finally:
+        _depth.value = depth
+        METRICS.record(name, time.perf_counter_ns() - start, outermost=not depth)
+
+
+def _metered(name: str):
+    def rpc(self, *args, **kwargs):
+        return _timed(name, getattr(super(MetricsMixin, self), name), *args, **kwargs)
+    rpc.__name__ = name
+    return rpc
+
+
+class MetricsMixin:
+    '''Times every call of a ServerImpl and the env.step calls inside them.'''
+
+    def _meter_env(self):
+        env = getattr(self, "env", None)
+        if env is None or getattr(env.step, "metered", False):
+            return
+
+        step = env.step
+
+        def metered_step(*args, **kwargs):
+            if not getattr(_depth, "value", 0):
+                # e.g. a pre-warm thread, which no call waits on
+                return step(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return step(*args, **kwargs)
+            finally:
+                METRICS.record_env_step(time.perf_counter_ns() - start)
+
+        metered_step.metered = True
+        env.step = metered_step
+
+    def _make(self, env_id: str, env_init: dict):
+        try:
+            return super().Make(env_id, env_init)
+        finally:
+            self._meter_env()
+            METRICS.open_session(id(self))
+
+    def _reset(self):
+        try:
+            return super().Reset()
+        finally:
+            # a pre-warmed pool can swap in another env at Reset
+            self._meter_env()
+
+    def Make(self, env_id: str, env_init: dict):
+        return _timed("Make", self._make, env_id, env_init)
+
+    def Reset(self):
+        return _timed("Reset", self._reset)
+
+    def Close(self):
+        METRICS.close_session(id(self))
+        return _timed("Close", super().Close)
+
+
+def with_metrics(server_impl):
+    '''Build a `server_impl` subclass that records METRICS for every call, the capitalized methods.'''
+    names = [
+        name for name in dir(server_impl)
+        if name[:1].isupper() and name not in ("Make", "Reset", "Close") and callable(getattr(server_impl, name))
+    ]
+    return type(f"Metered{server_impl.__name__}", (MetricsMixin, server_impl), {name: _metered(name) for name in names})
+
+
+def _log_periodically(interval: float):
+    while True:
+        time.sleep(interval)
+        logger.log(METRICS.summary())
+
+
+def start_metrics(port: int = 9090, interval: float = 30.0, host: str = "127.0.0.1"):
+    '''Serve METRICS as text on `port` (0 disables it) and log a summary every `interval` seconds.'''
+    if port:
+        # http.server only loads when the endpoint is on, it is slow to import
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = METRICS.text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            logger.log(f"Serving metrics on http://{host}:{port}/metrics")
+        except OSError as e:
+            # under --processes the worker that bound the port first serves its own metrics
+            logger.log(f"Metrics endpoint not started on port {port}: {e}")
+    if interval:
+        threading.Thread(target=_log_periodically, args=(interval,), daemon=True).start()
+
+
+def metered(server_impl, port: int = 0, interval: float = 0):
+    '''`server_impl` with metrics served on `port` and logged every `interval` seconds, unchanged when both are 0.'''
+    if not port and not interval:
+        return server_impl
+    start_metrics(port, interval)
+    return with_metrics(server_impl)
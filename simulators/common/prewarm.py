@@ -0,0 +1,195 @@
+"""
+Pre-warmed env pool with reset-ahead.
+
+`with_prewarm(ServerImpl, depth)` keeps up to `depth` spare envs per scenario
+that a background thread has already reset. `Reset` swaps a ready spare in and
+returns its initial observation, and the env it replaces is reset in the
+background for a later episode. Without a ready spare `Reset` runs
+synchronously as before, so the pool can only make it faster.
+
+The pool wraps the sim's own ServerImpl, below the other wrappers, so a
+swapped in env goes through their `Reset` like a reset one: the render stream
+starts a new frame and packed observations are encoded. The swap exchanges the
+per-episode state of the ServerImpl, the attributes named in `episode_state`,
+`("env",)` unless the ServerImpl sets its own.
+
+A ServerImpl with `thread_safe = False`, such as MuJoCo's whose renderers hold
+GL contexts bound to the thread that made them, builds and resets its spares on
+the thread serving the call instead. Its `Reset` then pays for the next spare,
+so only the thread-safe sims gain from the pool.
+
+A spare is warmed with the scenario of the latest `SetScenario`. Pools are kept
+for the `scenarios` most recently used scenarios. With 1 only the current
+scenario is warm. A curriculum cycling through a few scenarios can raise it so
+each of them finds a ready env. The spares of the least recently used
+scenario are recycled when another one comes in.
+"""
+import pickle
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import composabl_core.utils.logger as logger_util
+
+logger = logger_util.get_logger(__name__)
+
+def scenario_key(scenario):
+    try:
+        return pickle.dumps(scenario)
+    except Exception:
+        return id(scenario)
+
+
+class PrewarmMixin:
+    '''
+    Mixin for a ServerImpl that serves `Reset` from envs reset ahead of time.
+    Classes are built with `with_prewarm`.
+    '''
+    spare_impl = None
+    depth = 2
+    scenarios = 1
+    background = True  # warm spares on a background thread, False warms them on the calling one
+    episode_state = ("env",)
+
+    _ready = None
+
+    def Make(self, env_id: str, env_init: dict):
+        spec = super().Make(env_id, env_init)
+
+        self._stop_prewarm()
+        self._make_args = (env_id, dict(env_init or {}))
+        self._config = {}
+        self._scenario, self._scenario_key = None, scenario_key(None)
+        self._ready = OrderedDict()  # scenario key -> deque of (spare, obs, info), least recently used first
+        self._pending = {}  # scenario key -> warm-ups queued
+        self._idle = []  # spares waiting for a warm-up
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm") if self.background else None
+        return spec
+
+    def SetScenario(self, scenario):
+        result = super().SetScenario(scenario)
+        if self._ready is not None:
+            self._scenario, self._scenario_key = scenario, scenario_key(scenario)
+            self._fill()
+        return result
+
+    def SetRewardFunc(self, reward_func):
+        self._remember("SetRewardFunc", reward_func)
+        return super().SetRewardFunc(reward_func)
+
+    def SetRenderMode(self, render_mode):
+        self._remember("SetRenderMode", render_mode)
+        return super().SetRenderMode(render_mode)
+
+    def Reset(self):
+        if self._ready is None:
+            return super().Reset()
+
+        with self._lock:
+            ready = self._touch(self._scenario_key)
+            entry = ready.popleft() if ready else None
+
+        if entry is None:
+            result = super().Reset()
+        else:
+            spare, obs, info = entry
+            self._configure(spare)
+            self._swap_episode(spare)
+            with self._lock:
+                self._idle.append(spare)
+            result = obs, info
+
+        self._fill()
+        return result
+
+    def Close(self):
+        self._stop_prewarm()
+        return super().Close()
+
+    def _remember(self, call: str, *args):
+        if self._ready is not None:
+            self._config[call] = args
+
+    def _swap_episode(self, spare):
+        '''Take over the episode `spare` was reset for, and hand it the current one to reset.'''
+        for name in self.episode_state:
+            mine, theirs = getattr(self, name), getattr(spare, name)
+            setattr(self, name, theirs)
+            setattr(spare, name, mine)
+
+    def _configure(self, spare):
+        for call, args in list(self._config.items()):
+            getattr(spare, call)(*args)
+
+    def _touch(self, key) -> deque:
+        '''Pool of `key`, marked most recently used. Call with the lock held.'''
+        if key not in self._ready:
+            self._ready[key] = deque()
+        self._ready.move_to_end(key)
+        while len(self._ready) > self.scenarios:
+            _, evicted = self._ready.popitem(last=False)
+            self._idle.extend(spare for spare, _, _ in evicted)
+        return self._ready[key]
+
+    def _fill(self):
+        '''Queue warm-ups until the pool of the current scenario reaches `depth`.'''
+        key, scenario = self._scenario_key, self._scenario
+        with self._lock:
+            missing = self.depth - len(self._touch(key)) - self._pending.get(key, 0)
+            if missing > 0:
+                self._pending[key] = self._pending.get(key, 0) + missing
+        for _ in range(max(missing, 0)):
+            if self._executor is None:
+                self._warm(key, scenario)
+            else:
+                self._executor.submit(self._warm, key, scenario)
+
+    def _warm(self, key, scenario):
+        try:
+            with self._lock:
+                spare = self._idle.pop() if self._idle else None
+            if spare is None:
+                spare = self.spare_impl()
+                spare.Make(*self._make_args)
+            if scenario is not None:
+                spare.SetScenario(scenario)
+            self._configure(spare)
+            obs, info = spare.Reset()
+        except Exception as e:
+            logger.log(f"Pre-warming an env failed, Reset falls back to a synchronous reset: {e}")
+            with self._lock:
+                self._pending[key] -= 1
+            return
+
+        with self._lock:
+            self._pending[key] -= 1
+            if key in self._ready:
+                self._ready[key].append((spare, obs, info))
+            else:
+                self._idle.append(spare)
+
+    def _stop_prewarm(self):
+        if self._ready is None:
+            return
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        spares = list(self._idle) + [spare for ready in self._ready.values() for spare, _, _ in ready]
+        self._ready = None
+        for spare in spares:
+            try:
+                spare.Close()
+            except Exception:
+                pass
+
+
+def with_prewarm(server_impl, depth: int = 2, scenarios: int = 1):
+    '''
+    Build a `server_impl` subclass whose `Reset` is served from a pool of
+    `depth` pre-reset envs per scenario. Wrap the sim's ServerImpl with it
+    before the other wrappers.
+    '''
+    return type(f"Prewarmed{server_impl.__name__}", (PrewarmMixin, server_impl), {
+        "spare_impl": server_impl, "depth": depth, "scenarios": scenarios,
+        "background": getattr(server_impl, "thread_safe", True),
+    })
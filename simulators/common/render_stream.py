@@ -0,0 +1,190 @@
+"""
+Render streaming for live dashboards.
+
+`GetRender` returns the RGB frame of the env as an ndarray, as before.
+`GetRenderFrame` returns it downscaled, rate-limited and encoded, as
+{"frame", "format", "shape", "version", "timestamp", "repeated"}. The stream
+is set at Make with `env_init["render_stream"]`, a dict of the arguments of
+`SetRenderStream`, or later with `SetRenderStream(...)`:
+
+- `format`: "raw", "png", "jpeg" or "webp". PNG is encoded with NumPy and
+  zlib. JPEG and WebP need Pillow in the sim image.
+- `downscale`: integer factor, frames are averaged over `downscale` x
+  `downscale` pixel blocks before encoding.
+- `fps`: at most this many new frames per second. Faster polls get the last
+  frame again.
+- `frame_skip`: a new frame needs at least this many env steps since the last
+  one. Faster polls get the last frame again.
+
+With a stream set, `GetRender` returns the downscaled, rate-limited frame,
+still as an ndarray. `GetRenderFrame` and `SetRenderStream` are not gRPC
+RPCs, they are served in process and over the shared memory transport. A
+gRPC client sets the stream at Make and gets smaller, rarer ndarrays from
+`GetRender`, without the encoding.
+
+The env only renders when a frame is requested and the last one is stale,
+never on every step, and a stream switches envs out of "human" rendering.
+"""
+import io
+import struct
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+FORMATS = ("raw", "png", "jpeg", "webp")
+DEFAULT_STREAM = {"format": "png", "downscale": 1, "fps": None, "frame_skip": 1, "quality": 80}
+
+
+def downscale(frame: np.ndarray, factor: int) -> np.ndarray:
+    '''Average `frame` over factor x factor blocks, the edges that do not fill a block are cropped.'''
+    if factor <= 1:
+        return frame
+    h, w = frame.shape[0] // factor * factor, frame.shape[1] // factor * factor
+    blocks = frame[:h, :w].reshape(h // factor, factor, w // factor, factor, *frame.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(frame.dtype)
+
+
+def encode_png(frame: np.ndarray, level: int = 1) -> bytes:
+    '''8-bit grey, RGB or RGBA PNG, without filtering, compressed with zlib at `level`.'''
+    frame = np.ascontiguousarray(frame, dtype=np.uint8)
+    h, w = frame.shape[:2]
+    channels = 1 if frame.ndim == 2 else frame.shape[2]
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+
+    # every row starts with filter type 0
+    rows = np.zeros((h, w * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(h, w * channels)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, color_type, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+        + chunk(b"IEND", b"")
+    )
+
+
+def encode_pillow(frame: np.ndarray, fmt: str, quality: int) -> bytes:
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError(f"{fmt} frames need Pillow in the sim, run `pip install pillow`") from e
+    buf = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(frame, dtype=np.uint8)).save(buf, format=fmt.upper(), quality=quality)
+    return buf.getvalue()
+
+
+def encode_frame(frame: np.ndarray, fmt: str, quality: int = 80):
+    if fmt == "raw":
+        return np.ascontiguousarray(frame)
+    if fmt == "png":
+        return encode_png(frame)
+    return encode_pillow(frame, fmt, quality)
+
+
+class RenderStreamMixin:
+    '''
+    Mixin for a ServerImpl that serves downscaled, rate-limited frames from
+    `GetRender` and encoded ones from `GetRenderFrame`. Classes are built with
+    `with_render_stream`.
+    '''
+    stream = None
+    version = 0  # bumped by every Reset and Step, so a frame knows when it is stale
+    _frame = None
+
+    def Make(self, env_id: str, env_init: dict):
+        env_init = dict(env_init or {})
+        settings = env_init.pop("render_stream", None)
+        spec = super().Make(env_id, env_init)
+        if settings:
+            self.SetRenderStream(**settings)
+        else:
+            self.SetRenderStream(None)
+        return spec
+
+    def SetRenderStream(self, format: Optional[str] = "png", downscale: int = 1, fps: Optional[float] = None,
+                        frame_skip: int = 1, quality: int = 80) -> Optional[Dict[str, Any]]:
+        '''Configure the stream, `format=None` turns it off and GetRender returns every frame in full again.'''
+        self._frame = None
+        if format is None:
+            self.stream = None
+            return None
+        if format not in FORMATS:
+            raise ValueError(f"Unknown render stream format {format}, supported: {', '.join(FORMATS)}")
+
+        self.stream = {
+            "format": format,
+            "downscale": max(int(downscale), 1),
+            "fps": fps,
+            "frame_skip": max(int(frame_skip), 1),
+            "quality": quality,
+        }
+        if getattr(self.env, "render_mode", None) == "human":
+            # human mode draws a window on every step, frames are only rendered on request
+            self.SetRenderMode("rgb_array")
+        return dict(self.stream)
+
+    def Reset(self):
+        # a new episode never shows a frame of the last one
+        self.version += 1
+        self._frame = None
+        return super().Reset()
+
+    def Step(self, action):
+        self.version += 1
+        return super().Step(action)
+
+    def _latest(self, stream: Dict[str, Any]):
+        '''(frame, repeated): the last frame while a new one is not due, else a new downscaled one.'''
+        now = time.monotonic()
+        last = self._frame
+        if last is not None:
+            too_soon = stream["fps"] and now - last["timestamp"] < 1 / stream["fps"]
+            too_few_steps = self.version - last["version"] < stream["frame_skip"]
+            if too_soon or too_few_steps:
+                return last, True
+
+        image = super().GetRender()
+        if image is None or np.ndim(image) < 2:
+            # sims without images have nothing to downscale or encode
+            return {"image": image, "plain": True}, False
+
+        self._frame = {
+            "image": downscale(np.asarray(image), stream["downscale"]),
+            "encoded": None,
+            "version": self.version,
+            "timestamp": now,
+        }
+        return self._frame, False
+
+    def GetRender(self):
+        if self.stream is None:
+            return super().GetRender()
+        frame, _ = self._latest(self.stream)
+        return frame["image"]
+
+    def GetRenderFrame(self) -> Optional[Dict[str, Any]]:
+        '''The frame of the stream encoded, PNG at full size and rate when no stream is set.'''
+        stream = self.stream or DEFAULT_STREAM
+        frame, repeated = self._latest(stream)
+        if frame.get("plain"):
+            return frame["image"]
+        if frame["encoded"] is None:
+            frame["encoded"] = encode_frame(frame["image"], stream["format"], stream["quality"])
+        return {
+            "frame": frame["encoded"],
+            "format": stream["format"],
+            "shape": frame["image"].shape,
+            "version": frame["version"],
+            "timestamp": frame["timestamp"],
+            "repeated": repeated,
+        }
+
+
+def with_render_stream(server_impl):
+    '''Build a `server_impl` subclass that streams its frames, see RenderStreamMixin.'''
+    return type(f"Streamed{server_impl.__name__}", (RenderStreamMixin, server_impl), {})
@@ -0,0 +1,233 @@
+"""
+Server-side rollouts with an in-process policy.
+
+A client uploads a lightweight policy once with `SetPolicy`, then `Rollout`
+runs whole episodes next to the env and returns one compressed trajectory per
+episode. A 100 episode benchmark of 90 steps becomes 100 calls, or one,
+instead of 9,000 Step round-trips.
+
+Policies are plain dicts, built on the agent side with:
+
+- `mlp_policy(layers, ...)`: a NumPy MLP, e.g. weights exported from a
+  trained network. It runs on the flat float32 observation.
+- `onnx_policy(model_bytes)`: an ONNX model. The sim needs `onnxruntime`.
+- `controller_policy(controller)`: a pickled object with a
+  `compute_action(obs)` method, like a composabl `Controller`. It gets the
+  observation as the env returns it. It is pickled by value when cloudpickle
+  is installed, otherwise its class must be importable in the sim. Unpickling
+  runs code, so the sim refuses controllers unless it was started with
+  `--allow-controller-policies`, for trusted clients only.
+
+`decode_episode` turns a trajectory back into arrays. Agents import these
+helpers from `utils/rollout.py`, which re-exports this module.
+"""
+import asyncio
+import inspect
+import io
+import pickle
+from typing import Any, Dict, List, Optional, Sequence
+
+import gymnasium as gym
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+    "identity": lambda x: x,
+}
+
+
+def mlp_policy(layers: Sequence, activation: str = "tanh", output: str = "identity",
+               obs_mean=None, obs_std=None) -> Dict[str, Any]:
+    '''Policy of an MLP given as [(W, b), ...] with W of shape (inputs, outputs).'''
+    return {
+        "type": "mlp",
+        "layers": [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in layers],
+        "activation": activation,
+        "output": output,
+        "obs_mean": obs_mean,
+        "obs_std": obs_std,
+    }
+
+
+def onnx_policy(model: bytes) -> Dict[str, Any]:
+    return {"type": "onnx", "model": model}
+
+
+def controller_policy(controller) -> Dict[str, Any]:
+    try:
+        import cloudpickle
+        data = cloudpickle.dumps(controller)
+    except ImportError:
+        data = pickle.dumps(controller)
+    return {"type": "controller", "controller": data}
+
+
+class MLP:
+    def __init__(self, spec: Dict[str, Any]):
+        self.layers = spec["layers"]
+        self.activation = ACTIVATIONS[spec.get("activation", "tanh")]
+        self.output = ACTIVATIONS[spec.get("output", "identity")]
+        self.mean = None if spec.get("obs_mean") is None else np.asarray(spec["obs_mean"], dtype=np.float32)
+        self.std = None if spec.get("obs_std") is None else np.asarray(spec["obs_std"], dtype=np.float32)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        if self.mean is not None:
+            x = x - self.mean
+        if self.std is not None:
+            x = x / self.std
+        for i, (w, b) in enumerate(self.layers):
+            x = x @ w + b
+            x = self.activation(x) if i < len(self.layers) - 1 else self.output(x)
+        return x
+
+
+class Onnx:
+    def __init__(self, spec: Dict[str, Any]):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("ONNX policies need onnxruntime in the sim, run `pip install onnxruntime`") from e
+        self.session = onnxruntime.InferenceSession(spec["model"])
+        self.input = self.session.get_inputs()[0].name
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input: x[None, :]})[0][0]
+
+
+class Policy:
+    '''A policy spec bound to the spaces of an env.'''
+
+    def __init__(self, spec: Dict[str, Any], observation_space: gym.Space, action_space: gym.Space,
+                 allow_controllers: bool = False):
+        self.kind = spec["type"]
+        self.action_space = action_space
+        if self.kind == "mlp":
+            self.network = MLP(spec)
+        elif self.kind == "onnx":
+            self.network = Onnx(spec)
+        elif self.kind == "controller":
+            if not allow_controllers:
+                raise PermissionError(
+                    "Controller policies are unpickled, which runs arbitrary code. "
+                    "Start the sim with --allow-controller-policies to accept them from trusted clients"
+                )
+            self.controller = pickle.loads(spec["controller"])
+        else:
+            raise ValueError(f"Unknown policy type {self.kind}, supported: mlp, onnx, controller")
+
+        # only the sim binds policies, agents import this module from utils/ without encoding.py
+        from encoding import PackedEncoding
+        self.encoding = PackedEncoding(observation_space)
+
+    def flat(self, obs) -> np.ndarray:
+        return np.frombuffer(self.encoding.encode(obs), dtype=np.float32)
+
+    def __call__(self, obs):
+        if self.kind == "controller":
+            action = self.controller.compute_action(obs)
+            return asyncio.run(action) if inspect.iscoroutine(action) else action
+        return self.to_action(self.network(self.flat(obs)))
+
+    def to_action(self, output: np.ndarray):
+        space = self.action_space
+        if isinstance(space, gym.spaces.Discrete):
+            return int(np.argmax(output)) + int(space.start)
+        if isinstance(space, gym.spaces.Box):
+            return np.clip(np.asarray(output, dtype=space.dtype).reshape(space.shape), space.low, space.high)
+        if isinstance(space, gym.spaces.MultiBinary):
+            return (np.asarray(output).reshape(space.shape) > 0).astype(space.dtype)
+        raise NotImplementedError(f"Network policies do not support {type(space).__name__} action spaces")
+
+
+def encode_episode(episode: Dict[str, np.ndarray]) -> bytes:
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **episode)
+    return buf.getvalue()
+
+
+def decode_episode(data: bytes) -> Dict[str, np.ndarray]:
+    '''Arrays of one trajectory: observations, actions, rewards, terminated and truncated.'''
+    with np.load(io.BytesIO(data)) as episode:
+        return {key: episode[key] for key in episode.files}
+
+
+class RolloutMixin:
+    '''
+    Mixin for a ServerImpl that adds `SetPolicy` and `Rollout`. It drives the
+    ServerImpl below it, so observations reach the policy as the env returns them.
+    Classes are built with `with_rollout`.
+    '''
+    policy = None
+    max_episode_steps = 1000
+    allow_controllers = False
+
+    def Make(self, env_id: str, env_init: dict):
+        spec = super().Make(env_id, env_init)
+        if isinstance(spec, dict) and spec.get("max_episode_steps"):
+            self.max_episode_steps = spec["max_episode_steps"]
+        self.policy = None
+        return spec
+
+    def SetPolicy(self, policy: Dict[str, Any]) -> str:
+        base = super(RolloutMixin, self)
+        self.policy = Policy(policy, base.ObservationSpaceInfo(), base.ActionSpaceInfo(), self.allow_controllers)
+        return self.policy.kind
+
+    def Rollout(self, episodes: int = 1, max_steps: Optional[int] = None, scenario=None) -> Dict[str, Any]:
+        '''
+        Run `episodes` episodes with the uploaded policy. Returns the compressed
+        trajectory of every episode with their returns and lengths.
+        '''
+        if self.policy is None:
+            raise RuntimeError("Upload a policy with SetPolicy before calling Rollout")
+
+        base = super(RolloutMixin, self)
+        if scenario is not None:
+            base.SetScenario(scenario)
+
+        trajectories: List[bytes] = []
+        returns, lengths = [], []
+        for _ in range(episodes):
+            episode = self._episode(base, max_steps or self.max_episode_steps)
+            trajectories.append(encode_episode(episode))
+            returns.append(float(episode["rewards"].sum()))
+            lengths.append(len(episode["rewards"]))
+
+        return {
+            "episodes": trajectories,
+            "returns": np.asarray(returns),
+            "lengths": np.asarray(lengths),
+        }
+
+    def _episode(self, base, max_steps: int) -> Dict[str, np.ndarray]:
+        policy = self.policy
+        obs, _ = base.Reset()
+        observations, actions, rewards, terminated, truncated = [policy.flat(obs)], [], [], [], []
+
+        for _ in range(max_steps):
+            action = policy(obs)
+            obs, reward, done, cut, _ = base.Step(action)
+            observations.append(policy.flat(obs))
+            actions.append(np.ravel(np.asarray(action, dtype=np.float32)))
+            rewards.append(reward)
+            terminated.append(done)
+            truncated.append(cut)
+            if done or cut:
+                break
+
+        return {
+            "observations": np.stack(observations),
+            "actions": np.stack(actions) if actions else np.zeros((0, 0), dtype=np.float32),
+            "rewards": np.asarray(rewards, dtype=np.float32),
+            "terminated": np.asarray(terminated, dtype=bool),
+            "truncated": np.asarray(truncated, dtype=bool),
+        }
+
+
+def with_rollout(server_impl, allow_controllers: bool = False):
+    '''
+    Build a `server_impl` subclass that runs whole episodes with an uploaded
+    policy. Pickled controller policies are refused unless `allow_controllers`.
+    '''
+    return type(f"Rollout{server_impl.__name__}", (RolloutMixin, server_impl), {"allow_controllers": allow_controllers})
@@ -0,0 +1,126 @@
+"""
+The asyncio server of the sims, run by their `src/main_async.py`. It takes the
+same arguments as `main.py` and serves the sim's ServerImpl through
+`ServerAsync` and `async_server.with_async`.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from contextlib import suppress
+
+from composabl_core.grpc.server import ServerAsync
+from async_server import with_async
+from batching import with_batching
+from encoding import with_packed_obs
+from metrics import metered
+from prewarm import with_prewarm
+from render_stream import with_render_stream
+from rollout import with_rollout
+from startup import measure_startup
+from workers import run_workers, watch_loop, watched
+
+
+def start():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=os.environ.get("HOST") or "[::]")
+    parser.add_argument("--port", default=os.environ.get("PORT") or 1337, type=int)
+    parser.add_argument(
+        "--timeout", default=os.environ.get("TIMEOUT") or None, type=int
+    )
+    parser.add_argument(
+        "--processes", default=os.environ.get("PROCESSES") or 1, type=int,
+        help="number of server worker processes sharing the port"
+    )
+    parser.add_argument(
+        "--executor-workers", default=os.environ.get("EXECUTOR_WORKERS") or 4, type=int,
+        help="threads running env work off the event loop"
+    )
+    parser.add_argument(
+        "--max-concurrency", default=os.environ.get("MAX_CONCURRENCY") or 16, type=int,
+        help="env calls admitted at once, the others wait"
+    )
+    parser.add_argument(
+        "--deadline", default=os.environ.get("DEADLINE") or None, type=float,
+        help="seconds an env call may take, queueing included"
+    )
+    parser.add_argument(
+        "--prewarm", default=os.environ.get("PREWARM") or 0, type=int,
+        help="keep N envs per scenario reset ahead so Reset returns at once, 0 disables it"
+    )
+    parser.add_argument(
+        "--prewarm-scenarios", default=os.environ.get("PREWARM_SCENARIOS") or 1, type=int,
+        help="number of most recently used scenarios that keep a pre-warmed pool"
+    )
+    parser.add_argument(
+        "--allow-controller-policies", action="store_true",
+        default=os.environ.get("ALLOW_CONTROLLER_POLICIES", "").lower() == "true",
+        help="accept pickled controller policies in SetPolicy, which runs client code in the sim"
+    )
+    parser.add_argument(
+        "--metrics-port", default=os.environ.get("METRICS_PORT") or 0, type=int,
+        help="serve RPC latency metrics as text on this local port, 0 disables it"
+    )
+    parser.add_argument(
+        "--metrics-interval", default=os.environ.get("METRICS_INTERVAL") or 0, type=float,
+        help="log a metrics summary every N seconds, 0 disables it"
+    )
+    parser.add_argument(
+        "--measure-startup", action="store_true",
+        help="report the import time of the server and the sim, then exit"
+    )
+    parser.add_argument(
+        "--startup-budget", default=os.environ.get("STARTUP_BUDGET") or None, type=float,
+        help="with --measure-startup, exit non-zero when startup takes longer than N seconds"
+    )
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        sys.exit(measure_startup("main_async", args.startup_budget))
+
+    print(f"Starting with arguments {args}")
+
+    if args.processes > 1:
+        run_workers(serve, args, args.processes)
+    else:
+        serve(args)
+
+
+def build_server_impl(args):
+    # imported here so only the process that serves loads the sim and its dependencies
+    from server_impl import ServerImpl
+
+    # the pool sits right around the sim, so its Reset runs through every wrapper above it
+    server_impl = with_prewarm(ServerImpl, args.prewarm, args.prewarm_scenarios) if args.prewarm else ServerImpl
+    server_impl = with_batching(with_packed_obs(with_render_stream(with_rollout(server_impl, args.allow_controller_policies))))
+    return watched(metered(server_impl, args.metrics_port, args.metrics_interval))
+
+
+def serve(args):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(serve_async(args))
+
+
+async def serve_async(args):
+    # SIGTERM from `docker stop` and Ctrl-C cancel the server, which then stops cleanly
+    task = asyncio.current_task()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(sig, task.cancel)
+
+    server = None
+    try:
+        server_impl = build_server_impl(args)
+        server_impl = with_async(server_impl, args.executor_workers, args.max_concurrency, args.deadline)
+        server = ServerAsync(server_impl, args.host, args.port, args.timeout)
+        asyncio.ensure_future(watch_loop())
+        await server.start()
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("Interrupted, Gracefully stopping the server")
+    except Exception as e:
+        print(f"Unknown error: {e}, Gracefully stopping the server")
+    finally:
+        if server is not None:
+            await server.stop()
@@ -0,0 +1,253 @@
+"""
+Multi-environment session support for the simulator servers.
+
+`with_sessions(ServerImpl)` returns a ServerComposabl that hosts a pool of
+`ServerImpl` instances, each one a slot that owns its own env, keyed by a
+session id. One process can then serve many envs instead of one container per
+env.
+
+The composabl gRPC protocol carries no session id, so the gRPC servers do not
+use it: every gRPC client of a process would end up in the same session. A
+session key in the call metadata would not help either, the composabl client
+sends none and the composabl_core `Server` takes no interceptors to read one.
+Sessions are for callers that name them, in process or over a transport that
+passes keyword arguments.
+
+The session id of a call is resolved in this order:
+    1. the `session_id` keyword argument of the call
+    2. `env_init["session_id"]` for Make
+    3. the `current_session` context variable, set by the transport
+    4. DEFAULT_SESSION
+
+Every session starts with Make, including the default one.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, SupportsFloat, Tuple
+
+import composabl_core.utils.logger as logger_util
+import gymnasium as gym
+from composabl_core.agent.scenario import Scenario
+
+from batching import BatchedServerComposabl
+
+logger = logger_util.get_logger(__name__)
+
+DEFAULT_SESSION = "default"
+
+current_session: contextvars.ContextVar = contextvars.ContextVar("session_id", default=None)
+
+
+@contextmanager
+def use_session(session_id: str):
+    '''Route the calls made inside the block to `session_id`.'''
+    token = current_session.set(session_id)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
+
+
+def resolve(session_id: Optional[str] = None) -> str:
+    return session_id or current_session.get() or DEFAULT_SESSION
+
+
+class Session:
+    def __init__(self, session_id: str, impl):
+        self.session_id = session_id
+        self.impl = impl
+        self.lock = threading.RLock()
+        self.env_id = None
+        self.env_init = None
+        self.last_used = time.monotonic()
+
+    def call(self, name: str, *args):
+        with self.lock:
+            self.last_used = time.monotonic()
+            return getattr(self.impl, name)(*args)
+
+    def peek(self, name: str, *args):
+        '''Read-only calls skip the lock, so they are not stuck behind a running step.'''
+        return getattr(self.impl, name)(*args)
+
+
+class SessionPool:
+    '''
+    Pool of up to `max_sessions` ServerImpl slots keyed by session id.
+
+    Closed sessions give their slot back to a free list, so the next session
+    reuses the already constructed ServerImpl (and its env, reset) instead of
+    building a new one. When the pool is full, sessions idle for longer than
+    `idle_timeout` seconds are evicted to make room.
+    '''
+
+    def __init__(self, factory, max_sessions: int = 32, idle_timeout: Optional[float] = None):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be >= 1")
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+
+        self.sessions: Dict[str, Session] = {}
+        self.free = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def _evict_idle(self):
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if now - session.last_used > self.idle_timeout:
+                logger.log(f"Evicting idle session {session_id}")
+                self.free.append(self.sessions.pop(session_id).impl)
+
+    def acquire(self, session_id: str) -> Session:
+        '''Return the session for `session_id`, allocating or reusing a slot.'''
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session
+
+            if len(self.sessions) >= self.max_sessions:
+                self._evict_idle()
+            if len(self.sessions) >= self.max_sessions:
+                raise RuntimeError(
+                    f"Session pool is full ({self.max_sessions} sessions), close a session first"
+                )
+
+            impl = self.free.pop() if self.free else None
+            session = Session(session_id, impl)
+            self.sessions[session_id] = session
+
+        # build outside the pool lock, env construction can be slow
+        with session.lock:
+            if session.impl is None:
+                session.impl = self.factory()
+            else:
+                # a reused slot still holds the episode of its last session
+                try:
+                    session.impl.Reset()
+                except Exception as e:
+                    logger.log(f"Rebuilding the slot of session {session_id}, its env did not reset: {e}")
+                    session.impl = self.factory()
+        return session
+
+    def get(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown session {session_id}, call Make first")
+        return session
+
+    def release(self, session_id: str):
+        '''Close the session and keep its slot for reuse.'''
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        with session.lock:
+            session.impl.Close()
+            with self.lock:
+                self.free.append(session.impl)
+
+    def close(self):
+        for session_id in list(self.sessions):
+            self.release(session_id)
+
+
+class SessionServerImpl(BatchedServerComposabl):
+    '''
+    ServerComposabl that routes every call to a session of the pool, including
+    the batched StepMany/ResetMany/StepSequence calls of BatchedServerComposabl.
+
+    Subclasses set `server_impl` to the single-env ServerImpl class, see
+    `with_sessions`.
+    '''
+    server_impl = None
+    max_sessions = 32
+    idle_timeout = None
+
+    def __init__(self):
+        self.pool = SessionPool(self.server_impl, self.max_sessions, self.idle_timeout)
+
+    def session(self, session_id: Optional[str] = None) -> Session:
+        # no fallback for the default session either, an env that was never made is not stepped
+        return self.pool.get(resolve(session_id))
+
+    def Make(self, env_id: str, env_init: dict, session_id: Optional[str] = None):
+        env_init = dict(env_init or {})
+        session_id = resolve(session_id or env_init.pop("session_id", None))
+
+        session = self.pool.acquire(session_id)
+        session.env_id, session.env_init = env_id, env_init
+        return session.call("Make", env_id, env_init)
+
+    def ObservationSpaceInfo(self, session_id: Optional[str] = None) -> gym.Space:
+        return self.session(session_id).peek("ObservationSpaceInfo")
+
+    def ActionSpaceInfo(self, session_id: Optional[str] = None) -> gym.Space:
+        return self.session(session_id).peek("ActionSpaceInfo")
+
+    def ActionSpaceSample(self, session_id: Optional[str] = None) -> Any:
+        return self.session(session_id).call("ActionSpaceSample")
+
+    def Reset(self, session_id: Optional[str] = None) -> Tuple[Any, Dict[str, Any]]:
+        return self.session(session_id).call("Reset")
+
+    def Step(self, action, session_id: Optional[str] = None) -> Tuple[Any, SupportsFloat, bool, bool, Dict[str, Any]]:
+        return self.session(session_id).call("Step", action)
+
+    def Close(self, session_id: Optional[str] = None):
+        self.pool.release(resolve(session_id))
+
+    def SetScenario(self, scenario, session_id: Optional[str] = None):
+        return self.session(session_id).call("SetScenario", scenario)
+
+    def GetScenario(self, session_id: Optional[str] = None):
+        scenario = self.session(session_id).peek("GetScenario")
+        return scenario if scenario is not None else Scenario({"dummy": 0})
+
+    def SetRewardFunc(self, reward_func, session_id: Optional[str] = None):
+        return self.session(session_id).call("SetRewardFunc", reward_func)
+
+    def SetRenderMode(self, render_mode, session_id: Optional[str] = None):
+        return self.session(session_id).call("SetRenderMode", render_mode)
+
+    def GetRenderMode(self, session_id: Optional[str] = None):
+        return self.session(session_id).peek("GetRenderMode")
+
+    def ObservationEncoding(self, session_id: Optional[str] = None):
+        return self.session(session_id).peek("ObservationEncoding")
+
+    def GetRender(self, session_id: Optional[str] = None):
+        return self.session(session_id).call("GetRender")
+
+    def GetRenderFrame(self, session_id: Optional[str] = None):
+        return self.session(session_id).call("GetRenderFrame")
+
+    def SetRenderStream(self, format: str = "png", downscale: int = 1, fps: Optional[float] = None,
+                        frame_skip: int = 1, quality: int = 80, session_id: Optional[str] = None):
+        return self.session(session_id).call("SetRenderStream", format, downscale, fps, frame_skip, quality)
+
+    def SetPolicy(self, policy, session_id: Optional[str] = None):
+        return self.session(session_id).call("SetPolicy", policy)
+
+    def Rollout(self, episodes: int = 1, max_steps: Optional[int] = None, scenario=None,
+                session_id: Optional[str] = None) -> Dict[str, Any]:
+        return self.session(session_id).call("Rollout", episodes, max_steps, scenario)
+
+
+def with_sessions(server_impl, max_sessions: int = 32, idle_timeout: Optional[float] = None):
+    '''Build a SessionServerImpl class hosting up to `max_sessions` instances of `server_impl`.'''
+    return type(
+        f"Session{server_impl.__name__}",
+        (SessionServerImpl,),
+        {"server_impl": server_impl, "max_sessions": max_sessions, "idle_timeout": idle_timeout},
+    )
@@ -0,0 +1,337 @@
+"""
+Shared-memory transport for an agent and a simulator on the same host.
+
+A client connects to the server's Unix socket and gets its own shared memory
+block and its own ServerImpl. The block holds two rings of `slots` fixed-size
+slots, one for requests and one for responses. A call writes the pickled
+(method, args, kwargs) into the next request slot and bumps the request
+sequence number. The server answers in the response slot with the same index.
+`Step` calls with a NumPy action skip pickle: the action and the observation
+cross as raw arrays (dtype, shape, bytes), everything else is pickled.
+
+Signalling is futex-style. The waiting side spins on the sequence number for
+`spin` seconds, then sets its waiting flag and sleeps on the Unix socket. The
+other side writes a one byte doorbell only when that flag is set, so a busy
+request/response loop never makes a system call. Sleeps use a short timeout
+and re-check the sequence number, so a doorbell lost to a race costs at most
+one timeout instead of a hang.
+
+The same module is used on both sides: `serve_shm(ServerImpl, path)` in the
+sim, `ShmClient(path)` in the agent.
+"""
+import json
+import os
+import pickle
+import socket
+import struct
+import threading
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+import numpy as np
+
+HEADER_SIZE = 64  # request seq, response seq, server waiting, client waiting
+SLOT = struct.Struct("<IB")  # payload length, kind
+ARRAY = struct.Struct("<cB")  # dtype char, ndim
+STEP = struct.Struct("<d??I")  # reward, terminated, truncated, info length
+
+CALL, STEP_ARRAY, VALUE, ERROR = 0, 1, 2, 3
+
+DEFAULT_PATH = "/tmp/composabl-sim.sock"
+DEFAULT_SLOTS = 4
+DEFAULT_SLOT_SIZE = 256 * 1024
+SPIN = 50e-6  # seconds of busy waiting before sleeping
+SLEEP = 1e-3  # longest sleep before re-checking the sequence number
+
+REQ_SEQ, RESP_SEQ, SERVER_WAITING, CLIENT_WAITING = 0, 8, 16, 20
+
+
+class Channel:
+    '''The shared memory block of one connection, seen from either side.'''
+
+    def __init__(self, shm: shared_memory.SharedMemory, sock: socket.socket, slots: int, slot_size: int):
+        self.shm = shm
+        self.buf = shm.buf
+        self.sock = sock
+        self.slots = slots
+        self.slot_size = slot_size
+        self.requests = HEADER_SIZE
+        self.responses = HEADER_SIZE + slots * slot_size
+
+    @staticmethod
+    def size(slots: int, slot_size: int) -> int:
+        return HEADER_SIZE + 2 * slots * slot_size
+
+    def get(self, offset: int) -> int:
+        return struct.unpack_from("<Q", self.buf, offset)[0]
+
+    def set(self, offset: int, value: int):
+        struct.pack_into("<Q", self.buf, offset, value)
+
+    def set_flag(self, offset: int, value: int):
+        struct.pack_into("<I", self.buf, offset, value)
+
+    def get_flag(self, offset: int) -> int:
+        return struct.unpack_from("<I", self.buf, offset)[0]
+
+    def write(self, ring: int, index: int, kind: int, *parts):
+        length = sum(len(part) for part in parts)
+        if length + SLOT.size > self.slot_size:
+            raise ValueError(
+                f"Message of {length} bytes does not fit a {self.slot_size} byte slot, increase slot_size"
+            )
+        offset = ring + (index % self.slots) * self.slot_size
+        SLOT.pack_into(self.buf, offset, length, kind)
+        offset += SLOT.size
+        for part in parts:
+            self.buf[offset:offset + len(part)] = part
+            offset += len(part)
+
+    def read(self, ring: int, index: int):
+        '''(kind, payload view) of a slot, the view is only valid until the slot is reused.'''
+        offset = ring + (index % self.slots) * self.slot_size
+        length, kind = SLOT.unpack_from(self.buf, offset)
+        return kind, self.buf[offset + SLOT.size:offset + SLOT.size + length]
+
+    def wait(self, seq_offset: int, target: int, flag_offset: int, spin: float = SPIN) -> bool:
+        '''Wait until the sequence number at `seq_offset` reaches `target`. False once the peer hung up.'''
+        if self.get(seq_offset) >= target:
+            return True
+
+        deadline = time.perf_counter() + spin
+        while time.perf_counter() < deadline:
+            if self.get(seq_offset) >= target:
+                return True
+
+        self.set_flag(flag_offset, 1)
+        try:
+            while self.get(seq_offset) < target:
+                try:
+                    if not self.sock.recv(4096):
+                        return False
+                except socket.timeout:
+                    pass
+            return True
+        finally:
+            self.set_flag(flag_offset, 0)
+
+    def notify(self, flag_offset: int):
+        if self.get_flag(flag_offset):
+            self.sock.send(b"\x01")
+
+
+def array_parts(a: np.ndarray):
+    a = np.ascontiguousarray(a)
+    return [ARRAY.pack(a.dtype.char.encode(), a.ndim), struct.pack(f"<{a.ndim}I", *a.shape), a.data.cast("B")]
+
+
+def read_array(view: memoryview, offset: int = 0) -> np.ndarray:
+    '''Copy of the array packed at `offset`, the slot memory is reused by later calls.'''
+    char, ndim = ARRAY.unpack_from(view, offset)
+    offset += ARRAY.size
+    shape = struct.unpack_from(f"<{ndim}I", view, offset)
+    offset += 4 * ndim
+    dtype = np.dtype(char.decode())
+    count = int(np.prod(shape, dtype=int))
+    return np.frombuffer(view, dtype, count, offset).reshape(shape).copy()
+
+
+def packable(a) -> bool:
+    return isinstance(a, np.ndarray) and a.dtype.kind in "biuf"
+
+
+def pickled(value) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def pickled_error(e: Exception) -> bytes:
+    '''`e` pickled, or a RuntimeError with its repr when `e` does not pickle.'''
+    try:
+        return pickled(e)
+    except Exception:
+        return pickled(RuntimeError(repr(e)))
+
+
+class ShmClient:
+    '''
+    Agent side of the transport. Any ServerImpl method is available as a call,
+    e.g. `client.Step(action)`, and up to `slots` calls can be in flight with
+    `submit`/`result`.
+    '''
+
+    def __init__(self, path: str = DEFAULT_PATH, spin: float = SPIN):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        hello = json.loads(self.sock.makefile("r").readline())
+        self.sock.settimeout(SLEEP)
+
+        self.shm = shared_memory.SharedMemory(name=hello["shm"])
+        # the server owns the block, keep the resource tracker of this process from unlinking it
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.channel = Channel(self.shm, self.sock, hello["slots"], hello["slot_size"])
+        self.spin = spin
+        self.submitted = 0
+        self.consumed = 0
+
+    def submit(self, method: str, *args, **kwargs) -> int:
+        '''Queue a call without waiting for it, returns its ticket.'''
+        if self.submitted - self.consumed >= self.channel.slots:
+            raise RuntimeError(f"{self.channel.slots} calls already in flight, collect a result first")
+
+        ticket = self.submitted
+        if method == "Step" and len(args) == 1 and not kwargs and packable(args[0]):
+            self.channel.write(self.channel.requests, ticket, STEP_ARRAY, *array_parts(args[0]))
+        else:
+            self.channel.write(self.channel.requests, ticket, CALL, pickled((method, args, kwargs)))
+        self.submitted += 1
+        self.channel.set(REQ_SEQ, self.submitted)
+        self.channel.notify(SERVER_WAITING)
+        return ticket
+
+    def result(self, ticket: int) -> Any:
+        '''Result of the call `ticket`, results are collected in submission order.'''
+        if ticket != self.consumed:
+            raise RuntimeError(f"Results are collected in order, next is {self.consumed}")
+        if not self.channel.wait(RESP_SEQ, ticket + 1, CLIENT_WAITING, self.spin):
+            raise ConnectionError("Simulator closed the shared memory transport")
+
+        kind, payload = self.channel.read(self.channel.responses, ticket)
+        self.consumed += 1
+
+        try:
+            if kind == STEP_ARRAY:
+                reward, terminated, truncated, info_length = STEP.unpack_from(payload)
+                info = pickle.loads(payload[STEP.size:STEP.size + info_length]) if info_length else {}
+                obs = read_array(payload, STEP.size + info_length)
+                return obs, reward, terminated, truncated, info
+            value = pickle.loads(payload)
+        finally:
+            # tracebacks keep this frame alive, the view must not pin the block
+            payload.release()
+
+        if kind == ERROR:
+            raise value
+        return value
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        return self.result(self.submit(method, *args, **kwargs))
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self.call(method, *args, **kwargs)
+
+    def close(self):
+        self.channel.buf.release()
+        self.shm.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShmServer:
+    '''
+    Sim side of the transport. Every connection gets its own shared memory
+    block, its own `server_impl()` instance and a thread serving its calls.
+    '''
+
+    def __init__(self, server_impl, path: str = DEFAULT_PATH, slots: int = DEFAULT_SLOTS,
+                 slot_size: int = DEFAULT_SLOT_SIZE, spin: float = SPIN):
+        self.server_impl = server_impl
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.spin = spin
+        self.stopping = threading.Event()
+
+    def serve_connection(self, sock: socket.socket):
+        size = Channel.size(self.slots, self.slot_size)
+        shm = shared_memory.SharedMemory(name=f"composabl-{uuid.uuid4().hex[:12]}", create=True, size=size)
+        channel = Channel(shm, sock, self.slots, self.slot_size)
+        impl = self.server_impl()
+
+        try:
+            hello = {"shm": shm.name, "slots": self.slots, "slot_size": self.slot_size}
+            sock.sendall((json.dumps(hello) + "\n").encode())
+            sock.settimeout(SLEEP)
+
+            served = 0
+            while not self.stopping.is_set():
+                if not channel.wait(REQ_SEQ, served + 1, SERVER_WAITING, self.spin):
+                    break
+
+                self.handle(impl, channel, served)
+
+                served += 1
+                channel.set(RESP_SEQ, served)
+                channel.notify(CLIENT_WAITING)
+        finally:
+            try:
+                impl.Close()
+            except Exception:
+                pass
+            channel.buf.release()
+            shm.close()
+            shm.unlink()
+            sock.close()
+
+    def handle(self, impl, channel: Channel, index: int):
+        kind, payload = channel.read(channel.requests, index)
+        try:
+            if kind == STEP_ARRAY:
+                method, result = "Step", impl.Step(read_array(payload))
+            else:
+                method, args, kwargs = pickle.loads(payload)
+                result = getattr(impl, method)(*args, **kwargs)
+
+            if method == "Step" and packable(result[0]):
+                obs, reward, terminated, truncated, info = result
+                info = pickled(info) if info else b""
+                step = STEP.pack(float(reward), bool(terminated), bool(truncated), len(info))
+                channel.write(channel.responses, index, STEP_ARRAY, step, info, *array_parts(obs))
+            else:
+                channel.write(channel.responses, index, VALUE, pickled(result))
+        except Exception as e:
+            channel.write(channel.responses, index, ERROR, pickled_error(e))
+        finally:
+            payload.release()
+
+    def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+        listener.settimeout(0.5)
+        print(f"Serving shared memory transport on {self.path}")
+
+        try:
+            while not self.stopping.is_set():
+                try:
+                    sock, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self.serve_connection, args=(sock,), daemon=True).start()
+        finally:
+            listener.close()
+            os.unlink(self.path)
+
+    def stop(self):
+        self.stopping.set()
+
+
+def serve_shm(server_impl, path: str = DEFAULT_PATH, slots: int = DEFAULT_SLOTS,
+              slot_size: int = DEFAULT_SLOT_SIZE, spin: float = SPIN):
+    server = ShmServer(server_impl, path, slots, slot_size, spin)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        print("KeyboardInterrupt, Gracefully stopping the server")
+        server.stop()
@@ -0,0 +1,73 @@
+"""
+Cold start report for the simulator containers.
+
+`python src/main.py --measure-startup` imports the entry point and the sim in
+a fresh interpreter with `-X importtime`, constructs one ServerImpl and prints
+the slowest imports. With `--startup-budget` it exits non-zero when the total
+is over budget, so a CI job can catch an eager heavy import.
+"""
+import os
+import subprocess
+import sys
+
+PROBE = """
+import time
+start = time.perf_counter()
+import {entry}
+entry = time.perf_counter()
+from server_impl import ServerImpl
+sim = time.perf_counter()
+ServerImpl()
+print(entry - start, sim - entry, time.perf_counter() - sim)
+"""
+
+
+def parse_importtime(stderr: str):
+    '''(module, depth, self µs, cumulative µs) of every line of a `-X importtime` report.'''
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def importtime(code: str):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        # the src folder of the sim, where the entry point and server_impl are
+        cwd=os.path.dirname(os.path.abspath(sys.argv[0])), capture_output=True, text=True,
+    )
+
+
+def measure_startup(entry: str = "main", budget: float = None, top: int = 15) -> int:
+    '''Print the startup report of `entry`, returns the exit code.'''
+    probe = importtime(PROBE.format(entry=entry))
+    if probe.returncode:
+        print(probe.stderr[-2000:])
+        return probe.returncode
+
+    entry_s, sim_s, construct_s = (float(x) for x in probe.stdout.split()[-3:])
+    # leave out what every interpreter imports before running any code
+    interpreter = {name for name, *_ in parse_importtime(importtime("pass").stderr)}
+    modules = [m for m in parse_importtime(probe.stderr) if m[0] not in interpreter]
+
+    print(f"{'slowest imports':<48}{'cumulative ms':>14}")
+    direct = sorted((m for m in modules if m[1] <= 1), key=lambda m: -m[3])
+    for name, _, _, cumulative in direct[:top]:
+        print(f"{name:<48}{cumulative / 1e3:>14.1f}")
+
+    print(f"\n{'slowest modules':<48}{'self ms':>14}")
+    for name, _, self_us, _ in sorted(modules, key=lambda m: -m[2])[:top]:
+        print(f"{name:<48}{self_us / 1e3:>14.1f}")
+
+    total = entry_s + sim_s + construct_s
+    print(f"\nimport {entry} {entry_s * 1e3:.0f} ms, import server_impl {sim_s * 1e3:.0f} ms, "
+          f"ServerImpl() {construct_s * 1e3:.0f} ms, total {total * 1e3:.0f} ms")
+
+    if budget is not None and total > budget:
+        print(f"Startup took {total:.2f}s, over the budget of {budget:.2f}s")
+        return 1
+    return 0
@@ -0,0 +1,254 @@
+"""
+Multi-process simulator server: N worker processes, each with its own
+interpreter and ServerImpl, all listening on the same port.
+
+gRPC binds its listening socket with SO_REUSEPORT on Linux, so the kernel
+spreads incoming connections over the workers. The parent process only
+supervises them: it restarts workers that exit or stop sending heartbeats,
+reports their health, and forwards SIGINT/SIGTERM for a graceful shutdown.
+
+A heartbeat vouches for the serving path, not just the process. main.py wraps
+the ServerImpl of a worker with `watched`, which tracks the calls in flight,
+and serve_async.py also ticks its event loop with `watch_loop`. The heartbeat
+is the time up to which the worker is known to serve: the oldest call still
+running, or the last tick of the loop. A worker whose loop is blocked, or with
+a call stuck for `stale_after` seconds goes stale and is restarted.
+
+A worker is only watched once it is ready, after its first Make has returned.
+Importing the sim and building its first env can take far longer than a step,
+e.g. a cold MuJoCo import, and would otherwise get the worker restarted over
+and over before it served a single env.
+"""
+import json
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+import composabl_core.utils.logger as logger_util
+
+logger = logger_util.get_logger(__name__)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+class Serving:
+    '''The calls in flight and the event loop ticks of a worker process.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.ready = False
+        self.loop_tick = None
+
+    def begin(self) -> object:
+        token = object()
+        with self.lock:
+            self.calls[token] = time.time()
+        return token
+
+    def end(self, token: object):
+        with self.lock:
+            self.calls.pop(token, None)
+
+    def heartbeat(self) -> Optional[float]:
+        '''Time up to which the worker is known to serve, None before its first Make returned.'''
+        if not self.ready:
+            return None
+        with self.lock:
+            beat = min(self.calls.values(), default=time.time())
+        if self.loop_tick is not None:
+            beat = min(beat, self.loop_tick)
+        return beat
+
+
+# set in worker processes only, so outside --processes nothing is watched
+SERVING: Optional[Serving] = None
+
+
+def _watched(name: str):
+    def call(self, *args, **kwargs):
+        token = SERVING.begin()
+        try:
+            return getattr(super(WatchedMixin, self), name)(*args, **kwargs)
+        finally:
+            SERVING.end(token)
+            if name == "Make":
+                SERVING.ready = True
+    call.__name__ = name
+    return call
+
+
+class WatchedMixin:
+    '''Reports every RPC of a ServerImpl to SERVING while it runs.'''
+
+
+def watched(server_impl):
+    '''`server_impl` reporting its calls to the heartbeat of this worker, unchanged outside a worker.'''
+    if SERVING is None:
+        return server_impl
+    # the RPCs, and the in-process calls such as Rollout, are the capitalized methods
+    names = [name for name in dir(server_impl) if name[:1].isupper() and callable(getattr(server_impl, name))]
+    return type(f"Watched{server_impl.__name__}", (WatchedMixin, server_impl), {name: _watched(name) for name in names})
+
+
+async def watch_loop(interval: float = 1.0):
+    '''Tick SERVING from the event loop, so a blocked loop stops the heartbeat.'''
+    if SERVING is None:
+        return
+    import asyncio
+
+    while True:
+        SERVING.loop_tick = time.time()
+        await asyncio.sleep(interval)
+
+
+def _heartbeat(heartbeats, ready, index: int, interval: float):
+    while True:
+        beat = SERVING.heartbeat()
+        if beat is not None:
+            heartbeats[index] = beat
+            ready[index] = 1
+        time.sleep(interval)
+
+
+def _worker(serve, args, index: int, heartbeats, ready, interval: float):
+    global SERVING
+    # SIGTERM from the supervisor takes the KeyboardInterrupt path of serve()
+    signal.signal(signal.SIGTERM, _interrupt)
+    SERVING = Serving()
+    threading.Thread(target=_heartbeat, args=(heartbeats, ready, index, interval), daemon=True).start()
+    serve(args)
+
+
+class Workers:
+    '''
+    Supervisor of `processes` server workers running `serve(args)`.
+
+    A worker is healthy while its process is alive and, once it is ready, its
+    heartbeat is younger than `stale_after` seconds, so a single call after the
+    first Make may run at most that long. Unhealthy workers are restarted, at most
+    `max_restarts` times each. When `health_file` is set the state of every
+    worker is written there as JSON on each health check.
+    '''
+
+    def __init__(self, serve, args, processes: int, interval: float = 2.0, stale_after: float = 30.0,
+                 grace: float = 10.0, max_restarts: int = 5, health_file: str = None):
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
+        self.serve = serve
+        self.args = args
+        self.processes = processes
+        self.interval = interval
+        self.stale_after = stale_after
+        self.grace = grace
+        self.max_restarts = max_restarts
+        self.health_file = health_file
+
+        # spawn, grpc does not support forking once it is initialized
+        self.ctx = mp.get_context("spawn")
+        self.heartbeats = self.ctx.Array("d", processes, lock=False)
+        self.ready = self.ctx.Array("b", processes, lock=False)
+        self.workers = [None] * processes
+        self.restarts = [0] * processes
+        self.stopping = threading.Event()
+
+    def spawn(self, index: int):
+        self.heartbeats[index] = time.time()
+        self.ready[index] = 0
+        process = self.ctx.Process(
+            target=_worker,
+            args=(self.serve, self.args, index, self.heartbeats, self.ready, self.interval),
+            name=f"sim-worker-{index}",
+        )
+        process.start()
+        self.workers[index] = process
+        logger.log(f"Started worker {index} (pid {process.pid})")
+
+    def health(self):
+        now = time.time()
+        return [
+            {
+                "worker": i,
+                "pid": process.pid,
+                "alive": process.is_alive(),
+                "ready": bool(self.ready[i]),
+                "heartbeat_age": round(now - self.heartbeats[i], 3),
+                # a worker still starting up is only checked for being alive
+                "healthy": process.is_alive() and (not self.ready[i] or now - self.heartbeats[i] < self.stale_after),
+                "restarts": self.restarts[i],
+            }
+            for i, process in enumerate(self.workers)
+        ]
+
+    def check(self):
+        health = self.health()
+        for status in health:
+            if status["healthy"] or self.stopping.is_set():
+                continue
+
+            i = status["worker"]
+            if self.restarts[i] >= self.max_restarts:
+                logger.log(f"Worker {i} unhealthy, restart limit reached: {status}")
+                continue
+
+            logger.log(f"Worker {i} unhealthy, restarting: {status}")
+            self.terminate(self.workers[i])
+            self.restarts[i] += 1
+            self.spawn(i)
+
+        if self.health_file:
+            with open(self.health_file, "w") as f:
+                json.dump(health, f)
+        return health
+
+    def terminate(self, process, timeout: float = None):
+        if process.is_alive():
+            process.terminate()
+            process.join(self.grace if timeout is None else timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def stop(self, signum=None, frame=None):
+        self.stopping.set()
+
+    def shutdown(self):
+        logger.log(f"Gracefully stopping {self.processes} workers")
+        for process in self.workers:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.time() + self.grace
+        for process in self.workers:
+            process.join(max(deadline - time.time(), 0))
+            if process.is_alive():
+                logger.log(f"Worker {process.name} did not stop in {self.grace}s, killing it")
+                process.kill()
+                process.join()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for i in range(self.processes):
+            self.spawn(i)
+
+        try:
+            while not self.stopping.wait(self.interval):
+                health = self.check()
+                if not any(status["alive"] for status in health):
+                    logger.log("All workers exited")
+                    break
+        finally:
+            self.shutdown()
+
+
+def run_workers(serve, args, processes: int, **kwargs):
+    '''Serve `serve(args)` from `processes` worker processes sharing one port.'''
+    kwargs.setdefault("health_file", os.environ.get("HEALTH_FILE") or None)
+    Workers(serve, args, processes, **kwargs).run()
@@ -0,0 +1,92 @@
+"""
+Accuracy and throughput benchmark of the CSTRModel integrator backends.
+
+Every backend is run through CSTREnv with the same seeded action sequence for
+the `complete`, `transition`, `ss1` and `ss2` signals and compared against the
+odeint trajectory. A second table measures batched throughput via
+`cstr_model.simulate_batch`.
+
+Usage:
+    python src/benchmark_integrators.py [--episodes 5] [--batch 1024]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from composabl_core.agent.scenario import Scenario
+
+from cstr_sim import cstr_model as cstr
+from sim import CSTREnv
+
+SIGNALS = ["complete", "transition", "ss1", "ss2"]
+BACKENDS = [("rk4", 5), ("rk4", 10), ("implicit_euler", 10), ("implicit_euler", 50)]
+
+
+def run_episode(signal, actions, integrator="odeint", substeps=10):
+    env = CSTREnv()
+    env.scenario = Scenario({"Cref_signal": signal, "noise_percentage": 0})
+    env.integrator = integrator
+    env.substeps = substeps
+    env.reset()
+
+    trajectory = []
+    start = time.perf_counter()
+    for action in actions:
+        obs, reward, done, truncated, info = env.step([action])
+        trajectory.append(obs)
+        if done:
+            break
+    elapsed = time.perf_counter() - start
+
+    return np.array(trajectory), elapsed / len(trajectory)
+
+
+def accuracy(episodes: int):
+    print(f"{'signal':<12}{'backend':<20}{'max |ΔCa|':>12}{'max |ΔT|':>12}{'µs/step':>10}{'speedup':>9}")
+    for signal in SIGNALS:
+        rng = np.random.default_rng(0)
+        action_sets = [rng.uniform(-10, 10, 90) for _ in range(episodes)]
+
+        references = [run_episode(signal, actions) for actions in action_sets]
+        ref_step = np.mean([t for _, t in references])
+        print(f"{signal:<12}{'odeint':<20}{0:>12.2e}{0:>12.2e}{ref_step * 1e6:>10.1f}{1:>9.1f}")
+
+        for integrator, substeps in BACKENDS:
+            err_ca, err_t, step = 0.0, 0.0, []
+            for actions, (ref, _) in zip(action_sets, references):
+                traj, t = run_episode(signal, actions, integrator, substeps)
+                err_ca = max(err_ca, np.abs(traj[:, 2] - ref[:, 2]).max())
+                err_t = max(err_t, np.abs(traj[:, 0] - ref[:, 0]).max())
+                step.append(t)
+            step = np.mean(step)
+            name = f"{integrator}/{substeps}"
+            print(f"{'':<12}{name:<20}{err_ca:>12.2e}{err_t:>12.2e}{step * 1e6:>10.1f}{ref_step / step:>9.1f}")
+
+
+def throughput(batch: int, steps: int = 90):
+    print(f"\n{'backend':<20}{'batch':>8}{'reactor-steps/s':>18}")
+    rng = np.random.default_rng(0)
+    for integrator, substeps in [("odeint", 10)] + BACKENDS:
+        T = np.full(batch, 311.2639)
+        Ca = np.full(batch, 8.5698)
+        Tc = np.full(batch, 292.0)
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            T, Ca = cstr.simulate_batch(T, Ca, Tc, integrator=integrator, substeps=substeps)
+            Tc = np.clip(Tc + rng.uniform(-10, 10, batch), 200, 500)
+        elapsed = time.perf_counter() - start
+
+        name = f"{integrator}/{substeps}" if integrator != "odeint" else integrator
+        print(f"{name:<20}{batch:>8}{batch * steps / elapsed:>18,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", default=5, type=int)
+    parser.add_argument("--batch", default=1024, type=int)
+    args = parser.parse_args()
+
+    accuracy(args.episodes)
+    throughput(args.batch)
@@ -0,0 +1,64 @@
+"""
+Step-latency distribution of the CSTR integrators on the noisy `complete` scenario.
+
+Half of the episodes push the coolant temperature up so the reactor crosses
+into the stiff thermal runaway region (T >= 400 K). Percentiles are reported
+for all steps and separately for the steps taken in the runaway region, where
+the tail latency of the default odeint path comes from.
+
+Usage:
+    python src/benchmark_latency.py [--episodes 20] [--noise 0.05]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from composabl_core.agent.scenario import Scenario
+
+from sim import CSTREnv
+
+INTEGRATORS = ["odeint", "lsoda", "radau", "bdf", "rk4"]
+
+
+def measure(integrator: str, episodes: int, noise: float):
+    env = CSTREnv()
+    env.scenario = Scenario({"Cref_signal": "complete", "noise_percentage": noise})
+    env.integrator = integrator
+    env.rng.seed(0)
+    rng = np.random.default_rng(0)
+
+    latencies, runaway = [], []
+    for episode in range(episodes):
+        bias = 5 if episode % 2 else 0
+        env.reset()
+        done = False
+        while not done:
+            action = rng.uniform(-10, 10) + bias
+            start = time.perf_counter()
+            obs, reward, done, truncated, info = env.step([action])
+            latencies.append(time.perf_counter() - start)
+            runaway.append(obs[0] >= 400)
+
+    return np.array(latencies) * 1e6, np.array(runaway)
+
+
+def report(name, latencies):
+    if len(latencies) == 0:
+        print(f"{name:<22}{'-':>8}")
+        return
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    print(f"{name:<22}{len(latencies):>8}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{latencies.max():>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", default=20, type=int)
+    parser.add_argument("--noise", default=0.05, type=float)
+    args = parser.parse_args()
+
+    print(f"{'integrator (µs)':<22}{'steps':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for integrator in INTEGRATORS:
+        latencies, runaway = measure(integrator, args.episodes, args.noise)
+        report(integrator, latencies)
+        report("  T >= 400", latencies[runaway])
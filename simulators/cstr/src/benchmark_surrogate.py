@@ -0,0 +1,66 @@
+"""
+Accuracy and throughput report of the CSTR surrogate model.
+
+Closed-loop episodes with seeded random actions are run with the surrogate
+and with odeint for every `Cref_signal`, comparing trajectories, per-step
+latency and how often the trust region fell back to the exact integrator.
+A second table measures batched throughput via `cstr_model.simulate_batch`.
+
+Usage:
+    python src/benchmark_surrogate.py [--episodes 10] [--batch 1024]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from cstr_sim import cstr_model as cstr
+from cstr_sim import surrogate
+from benchmark_integrators import SIGNALS, run_episode
+
+
+def accuracy(episodes: int):
+    model = surrogate.default_model()
+    print(f"{'signal':<12}{'max |ΔCa|':>12}{'max |ΔT|':>12}{'odeint µs':>11}{'surr. µs':>10}{'fallback':>10}")
+    for signal in SIGNALS:
+        rng = np.random.default_rng(0)
+        err_ca, err_t, t_ref, t_sur = 0.0, 0.0, [], []
+        model.calls = model.fallbacks = 0
+        for _ in range(episodes):
+            actions = rng.uniform(-10, 10, 90) + rng.uniform(-3, 5)
+            ref, t0 = run_episode(signal, actions)
+            traj, t1 = run_episode(signal, actions, "surrogate")
+            err_ca = max(err_ca, np.abs(traj[:, 2] - ref[:, 2]).max())
+            err_t = max(err_t, np.abs(traj[:, 0] - ref[:, 0]).max())
+            t_ref.append(t0)
+            t_sur.append(t1)
+        fallback = model.fallbacks / max(model.calls, 1)
+        print(f"{signal:<12}{err_ca:>12.2e}{err_t:>12.2e}{np.mean(t_ref) * 1e6:>11.1f}"
+              f"{np.mean(t_sur) * 1e6:>10.1f}{fallback:>10.1%}")
+
+
+def throughput(batch: int, steps: int = 90):
+    print(f"\n{'backend':<12}{'batch':>8}{'reactor-steps/s':>18}")
+    for integrator in ["odeint", "rk4", "surrogate"]:
+        rng = np.random.default_rng(0)
+        T = np.full(batch, 311.2639)
+        Ca = np.full(batch, 8.5698)
+        Tc = np.full(batch, 292.0)
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            T, Ca = cstr.simulate_batch(T, Ca, Tc, integrator=integrator)
+            Tc = np.clip(Tc + rng.uniform(-10, 10, batch), 200, 500)
+        elapsed = time.perf_counter() - start
+
+        print(f"{integrator:<12}{batch:>8}{batch * steps / elapsed:>18,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", default=10, type=int)
+    parser.add_argument("--batch", default=1024, type=int)
+    args = parser.parse_args()
+
+    accuracy(args.episodes)
+    throughput(args.batch)
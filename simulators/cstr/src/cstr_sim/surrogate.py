@@ -0,0 +1,220 @@
+import os
+
+import numpy as np
+
+from . import cstr_model as cstr
+
+PATH_MODEL = os.path.join(os.path.dirname(os.path.realpath(__file__)), "surrogate.npz")
+DT = 0.5  # control interval the surrogate is trained for
+
+
+class SurrogateModel:
+    '''
+    Approximate plant for one control interval: a small tanh MLP mapping
+    (Ca, T, Tc) to (ΔCa, ΔT), evaluated in batch with NumPy in float32.
+
+    The trust region is an occupancy grid over the training inputs. A cell is
+    trusted when it holds enough training samples and the held-out error of the
+    MLP inside it stays below the configured tolerance. Inputs in untrusted
+    cells, or outside the grid, are integrated exactly instead.
+    '''
+
+    def __init__(self, weights, biases, x_mean, x_std, y_mean, y_std, grid_lo, grid_hi, trusted):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.x_mean, self.x_std = np.asarray(x_mean), np.asarray(x_std)
+        self.y_mean, self.y_std = np.asarray(y_mean), np.asarray(y_std)
+        self.grid_lo, self.grid_hi = np.asarray(grid_lo), np.asarray(grid_hi)
+        self.trusted = np.asarray(trusted, dtype=bool)
+
+        self.calls = 0
+        self.fallbacks = 0
+
+    @property
+    def bins(self) -> int:
+        return self.trusted.shape[0]
+
+    def predict(self, Ca, T, Tc):
+        '''MLP prediction of (Ca, T) after one control interval, no fallback.'''
+        x = np.stack(np.broadcast_arrays(Ca, T, Tc), axis=-1)
+        h = ((x - self.x_mean) / self.x_std).astype(np.float32)
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w + b
+            if i < len(self.weights) - 1:
+                h = np.tanh(h)
+        delta = h.astype(float) * self.y_std + self.y_mean
+        return x[..., 0] + delta[..., 0], x[..., 1] + delta[..., 1]
+
+    def cells(self, Ca, T, Tc):
+        x = np.stack(np.broadcast_arrays(Ca, T, Tc), axis=-1)
+        return np.floor((x - self.grid_lo) / (self.grid_hi - self.grid_lo) * self.bins).astype(int)
+
+    def in_trust_region(self, Ca, T, Tc):
+        idx = self.cells(Ca, T, Tc)
+        inside = np.all((idx >= 0) & (idx < self.bins), axis=-1)
+        idx = np.clip(idx, 0, self.bins - 1)
+        return inside & self.trusted[idx[..., 0], idx[..., 1], idx[..., 2]]
+
+    def step(self, Ca, T, Tc, dt: float = DT, fallback: str = "odeint"):
+        '''
+        Advance the reactors by `dt`, using the MLP inside the trust region and
+        the exact `fallback` integrator for every other reactor.
+        '''
+        Ca, T, Tc = (np.asarray(a, dtype=float) for a in np.broadcast_arrays(Ca, T, Tc))
+        self.calls += Ca.size
+
+        if dt != DT:
+            self.fallbacks += Ca.size
+            return cstr.integrate(Ca, T, Tc, dt, fallback)
+
+        ok = self.in_trust_region(Ca, T, Tc)
+        Ca_next, T_next = self.predict(Ca, T, Tc)
+
+        if not ok.all():
+            out = ~ok
+            self.fallbacks += int(out.sum())
+            Ca_next, T_next = np.array(Ca_next), np.array(T_next)
+            Ca_next[out], T_next[out] = cstr.integrate(Ca[out], T[out], Tc[out], dt, fallback)
+
+        return Ca_next, T_next
+
+    def save(self, path: str = PATH_MODEL):
+        np.savez(
+            path,
+            n_layers=len(self.weights),
+            **{f"w{i}": w for i, w in enumerate(self.weights)},
+            **{f"b{i}": b for i, b in enumerate(self.biases)},
+            x_mean=self.x_mean, x_std=self.x_std, y_mean=self.y_mean, y_std=self.y_std,
+            grid_lo=self.grid_lo, grid_hi=self.grid_hi, trusted=self.trusted,
+        )
+
+    @classmethod
+    def load(cls, path: str = PATH_MODEL):
+        data = np.load(path)
+        n = int(data["n_layers"])
+        return cls(
+            [data[f"w{i}"] for i in range(n)], [data[f"b{i}"] for i in range(n)],
+            data["x_mean"], data["x_std"], data["y_mean"], data["y_std"],
+            data["grid_lo"], data["grid_hi"], data["trusted"],
+        )
+
+
+_model = None
+
+
+def default_model() -> SurrogateModel:
+    '''Surrogate shipped next to this module, loaded once per process.'''
+    global _model
+    if _model is None:
+        if not os.path.exists(PATH_MODEL):
+            raise FileNotFoundError(
+                f"No surrogate model at {PATH_MODEL}, generate one with "
+                "src/surrogate_dataset.py and src/surrogate_fit.py"
+            )
+        _model = SurrogateModel.load(PATH_MODEL)
+    return _model
+
+
+def generate_dataset(num_envs: int = 1024, episodes: int = 3, seed: int = 0, chunk: int = 2000):
+    '''
+    Sample (Ca, T, Tc) states visited by random-policy episodes and label them
+    with the exact odeint transition over one control interval.
+
+    Every reactor follows uniform random ΔTc actions around its own bias so the
+    data covers both steady states, the transition and thermal runaway.
+
+    Returns:
+        X (M, 3) inputs (Ca, T, Tc) and Y (M, 2) targets (ΔCa, ΔT)
+    '''
+    rng = np.random.default_rng(seed)
+    Ca = np.zeros(num_envs)
+    T = np.zeros(num_envs)
+    Tc = np.zeros(num_envs)
+
+    states = []
+    for _ in range(episodes):
+        Ca[:], T[:], Tc[:] = 8.5698, 311.2639, 292
+        bias = rng.uniform(-4, 6, num_envs)
+        for _ in range(90):
+            states.append(np.stack([Ca, T, Tc], axis=1))
+            Ca, T = cstr.integrate(Ca, T, Tc, DT, "rk4", 20)
+            Tc = np.clip(Tc + np.clip(rng.uniform(-10, 10, num_envs) + bias, -10, 10), 200, 500)
+
+    X = np.concatenate(states)
+    X = X[rng.permutation(len(X))]
+
+    Y = np.empty((len(X), 2))
+    for i in range(0, len(X), chunk):
+        x = X[i:i + chunk]
+        Ca_next, T_next = cstr.integrate(x[:, 0], x[:, 1], x[:, 2], DT, "odeint")
+        Y[i:i + chunk, 0] = Ca_next - x[:, 0]
+        Y[i:i + chunk, 1] = T_next - x[:, 1]
+
+    return X, Y
+
+
+def fit(X, Y, hidden=(64, 64), epochs: int = 60, batch_size: int = 512, lr: float = 3e-3, seed: int = 0):
+    '''Train the MLP with Adam on standardized inputs/targets, returns (weights, biases, scaling).'''
+    rng = np.random.default_rng(seed)
+    x_mean, x_std = X.mean(0), X.std(0)
+    y_mean, y_std = Y.mean(0), Y.std(0)
+    Z = (X - x_mean) / x_std
+    U = (Y - y_mean) / y_std
+
+    sizes = [X.shape[1], *hidden, Y.shape[1]]
+    weights = [rng.normal(0, np.sqrt(1 / a), (a, b)) for a, b in zip(sizes[:-1], sizes[1:])]
+    biases = [np.zeros(b) for b in sizes[1:]]
+    params = weights + biases
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+
+    step = 0
+    for epoch in range(epochs):
+        # step decay over the last half of training
+        rate = lr if epoch < epochs // 2 else lr / 3 if epoch < 3 * epochs // 4 else lr / 9
+        perm = rng.permutation(len(Z))
+        for i in range(0, len(Z), batch_size):
+            idx = perm[i:i + batch_size]
+            hs = [Z[idx]]
+            for j, (w, b) in enumerate(zip(weights, biases)):
+                h = hs[-1] @ w + b
+                hs.append(np.tanh(h) if j < len(weights) - 1 else h)
+
+            g = 2 * (hs[-1] - U[idx]) / len(idx)
+            grads_w, grads_b = [None] * len(weights), [None] * len(weights)
+            for j in reversed(range(len(weights))):
+                grads_w[j] = hs[j].T @ g
+                grads_b[j] = g.sum(0)
+                if j > 0:
+                    g = (g @ weights[j].T) * (1 - hs[j]**2)
+
+            step += 1
+            for j, (p, grad) in enumerate(zip(params, grads_w + grads_b)):
+                m[j] = 0.9 * m[j] + 0.1 * grad
+                v[j] = 0.999 * v[j] + 0.001 * grad**2
+                p -= rate * (m[j] / (1 - 0.9**step)) / (np.sqrt(v[j] / (1 - 0.999**step)) + 1e-8)
+
+    return weights, biases, (x_mean, x_std, y_mean, y_std)
+
+
+def trust_region(X_train, X_val, err_val, bins: int = 16, min_count: int = 20, tol=(0.05, 0.5)):
+    '''
+    Build the trust-region grid over the training inputs.
+
+    Cells need `min_count` training samples, and their worst held-out error
+    must stay within `tol` = (Ca tolerance, T tolerance).
+    '''
+    lo, hi = X_train.min(0), X_train.max(0)
+    hi = hi + 1e-9 * np.maximum(np.abs(hi), 1)
+
+    def cell(x):
+        return np.clip(np.floor((x - lo) / (hi - lo) * bins).astype(int), 0, bins - 1)
+
+    counts = np.zeros((bins,) * 3, dtype=int)
+    np.add.at(counts, tuple(cell(X_train).T), 1)
+
+    worst = np.zeros((bins,) * 3 + (2,))
+    np.maximum.at(worst, tuple(cell(X_val).T), err_val)
+
+    trusted = (counts >= min_count) & np.all(worst <= np.asarray(tol), axis=-1)
+    return lo, hi, trusted
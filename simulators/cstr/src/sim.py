@@ -1,12 +1,13 @@
-import math
+import copy
 import random
 import numpy as np
-from scipy import interpolate
 
 from composabl_core.agent.scenario import Scenario
 import gymnasium as gym
 
 from cstr_sim import cstr_model as cstr
+from cstr_sim import references
+from cstr_sim.stats import RunningStats, WindowedStats
 
 
 class CSTREnv(gym.Env):
@@ -24,10 +25,25 @@ class CSTREnv(gym.Env):
             2 - ss1 - steady state 1 only
             3 - ss2 - steady state 2 only
             4 - complete
+        Cref_schedule / Tref_schedule:
+            optional user-defined piecewise setpoints "time:value, time:value, ...",
+            overriding Cref_signal (Tref follows Cref when no Tref_schedule is given)
+        integrator:
+            odeint (default), rk4 or implicit_euler with `substeps` fixed steps
+        rms_window:
+            None (default) rewards the RMS error over the whole episode,
+            an int N rewards the RMS error over the last N steps
         '''
         self.Cref_signal = "complete"
+        self.Cref_schedule = None
+        self.Tref_schedule = None
         self.noise_percentage = 0
+        self.integrator = "odeint"
+        self.substeps = 10
+        self.stiff_solvers = {}  # this env's lsoda/radau/bdf solvers, warm across steps
+        self.rms_window = None
         self.scenario: Scenario = None
+        self.rng = random.Random()
 
         self.observation_space = gym.spaces.Box(low=np.array([200, 200, 0, 0, 200]), high=np.array([500, 500, 12, 12, 500]))
 
@@ -68,9 +84,21 @@ class CSTREnv(gym.Env):
             self.Cref = 8.5698
             self.Tref = 311.2612
 
+        # setpoints for every step of the episode
+        self.Cref_table, self.Tref_table = references.reference_tables(
+            self.Cref_signal, self.Cref_schedule, self.Tref_schedule
+        )
+        if self.Cref_schedule is not None:
+            self.Cref = float(self.Cref_table[0])
+            self.Tref = float(self.Tref_table[0])
+
         self.rms = 0
-        self.y_list = []
-        self.error_list = []
+        # running statistics of Ca and of the tracking error, O(1) per step
+        self.y_stats = RunningStats()
+        if self.rms_window:
+            self.error_stats = WindowedStats(int(self.rms_window))
+        else:
+            self.error_stats = RunningStats()
         self.obs = np.array([self.T, self.Tc, self.Ca, self.Cref, self.Tref])
 
         info = {}
@@ -83,32 +111,9 @@ class CSTREnv(gym.Env):
         action = float(action[0])
         if self.cnt >= 90:
             self.cnt = 90
-        if self.Cref_signal == "transition":
-            # update Cref an Tref
-            time = 90
-            p1 = 22
-            p2 = 74
-            k = self.cnt + p1
-            C = interpolate.interp1d([0, p1, p2, time], [8.57, 8.57, 2, 2])
-            self.Cref = float(C(k))
-            T_ = interpolate.interp1d([0, p1, p2, time], [311.2612, 311.2612, 373.1311, 373.1311])
-            self.Tref = float(T_(k))
-        elif self.Cref_signal == "ss1":
-            self.Cref = 2
-            self.Tref = 373.1311
-        elif self.Cref_signal == "ss2":
-            self.Cref = 8.5698
-            self.Tref = 311.2612
-        elif self.Cref_signal == "complete":
-            k = self.cnt
-            time = 90
-            # update Cref an Tref
-            p1 = 22
-            p2 = 74
-            C = interpolate.interp1d([0, p1, p2, time], [8.57, 8.57, 2, 2])
-            self.Cref = float(C(k))
-            T_ = interpolate.interp1d([0, p1, p2, time], [311.2612, 311.2612, 373.1311, 373.1311])
-            self.Tref = float(T_(k))
+        # update Cref and Tref
+        self.Cref = float(self.Cref_table[self.cnt])
+        self.Tref = float(self.Tref_table[self.cnt])
 
         self.ΔTc = action
 
@@ -116,13 +121,15 @@ class CSTREnv(gym.Env):
         σ_max1 = error_var * (8.5698 - 2)
         σ_max2 = error_var * (373.1311 - 311.2612)
 
-        σ_Ca = random.uniform(-σ_max1, σ_max1)
-        σ_T = random.uniform(-σ_max2, σ_max2)
+        σ_Ca = self.rng.uniform(-σ_max1, σ_max1)
+        σ_T = self.rng.uniform(-σ_max2, σ_max2)
 
         self.ΔTc = np.clip(self.ΔTc, -10, 10)
 
         # calling the CSTR python model
-        sim_model = cstr.CSTRModel(T=self.T, Ca=self.Ca, Tc=self.Tc, ΔTc=self.ΔTc)
+        sim_model = cstr.CSTRModel(T=self.T, Ca=self.Ca, Tc=self.Tc, ΔTc=self.ΔTc,
+                                   integrator=self.integrator, substeps=self.substeps,
+                                   solvers=self.stiff_solvers)
 
         # Tc
         self.Tc += self.ΔTc
@@ -133,15 +140,14 @@ class CSTREnv(gym.Env):
 
         # Ca
         self.Ca = sim_model.Ca + σ_Ca
-        self.y_list.append(self.Ca)
+        self.y_stats.push(self.Ca)
 
         # Increase time counter
         self.cnt += 1
 
         # Error and Reward
-        error = (self.Ca - self.Cref)**2
-        self.error_list.append(error)
-        self.rms = math.sqrt(sum(self.error_list) / len(self.error_list))
+        self.error_stats.push(self.Ca - self.Cref)
+        self.rms = self.error_stats.rms
 
         #REWARD
         if self.T >= 400 :  # avoid
@@ -161,5 +167,89 @@ class CSTREnv(gym.Env):
 
         return self.obs, reward, done, False, info
 
+    def get_state(self):
+        '''
+        Snapshot of everything that evolves during an episode:
+        (T, Tc, Ca, ΔTc, cnt, Cref, Tref, Cref_signal, noise_percentage,
+         Cref_table, Tref_table, rng state, error stats, Ca stats)
+
+        The setpoint tables are read-only and shared, so the snapshot is cheap.
+        '''
+        return (
+            self.T, self.Tc, self.Ca, self.ΔTc, self.cnt, self.Cref, self.Tref,
+            self.Cref_signal, self.noise_percentage, self.Cref_table, self.Tref_table,
+            self.rng.getstate(), self.error_stats.get_state(), self.y_stats.get_state(),
+        )
+
+    def set_state(self, state):
+        '''Restore a snapshot taken with get_state, the next step continues from it.'''
+        (self.T, self.Tc, self.Ca, self.ΔTc, self.cnt, self.Cref, self.Tref,
+         self.Cref_signal, self.noise_percentage, self.Cref_table, self.Tref_table,
+         rng_state, error_state, y_state) = state
+
+        self.rng.setstate(rng_state)
+        self.error_stats.set_state(error_state)
+        self.y_stats.set_state(y_state)
+        self.rms = self.error_stats.rms
+        self.obs = np.array([self.T, self.Tc, self.Ca, self.Cref, self.Tref])
+
+    def rollout_from(self, state, action_sequences, noise: bool = False):
+        '''
+        Evaluate K candidate ΔTc sequences of H steps from a snapshot.
+
+        All K continuations are advanced together with one batched integration
+        call per step and the env itself is left untouched. Sensor noise is off
+        by default so candidates are compared on the same plant.
+
+        Args:
+            state: snapshot returned by get_state
+            action_sequences: array of shape (K, H) or (K, H, 1)
+            noise: apply the scenario noise_percentage to the continuations
+
+        Returns:
+            obs (K, H, 5), rewards (K, H), dones (K, H)
+        '''
+        (T, Tc, Ca, _, cnt, _, _, Cref_signal, noise_percentage,
+         Cref_table, Tref_table, _, error_state, _) = state
+
+        actions = np.asarray(action_sequences, dtype=float)
+        k, h = actions.shape[:2]
+        actions = np.clip(actions.reshape(k, h), -10, 10)
+
+        error_stats = copy.copy(self.error_stats)
+        error_stats.set_state(error_state)
+
+        T = np.full(k, T, dtype=float)
+        Tc = np.full(k, Tc, dtype=float)
+        Ca = np.full(k, Ca, dtype=float)
+
+        obs = np.empty((k, h, 5))
+        rng = np.random.default_rng()
+        σ_max1 = noise_percentage * (8.5698 - 2)
+        σ_max2 = noise_percentage * (373.1311 - 311.2612)
+
+        index = np.minimum(cnt + np.arange(h), 90)
+        for i in range(h):
+            Ca, T = cstr.integrate(Ca, T, Tc, 0.5, self.integrator, self.substeps, solvers=self.stiff_solvers)
+            if noise:
+                T = T + rng.uniform(-σ_max2, σ_max2, k)
+                Ca = Ca + rng.uniform(-σ_max1, σ_max1, k)
+            Tc = np.clip(Tc + actions[:, i], 200, 500)
+
+            obs[:, i] = np.stack([
+                T, Tc, Ca,
+                np.full(k, Cref_table[index[i]]), np.full(k, Tref_table[index[i]])
+            ], axis=1)
+
+        rms = error_stats.rms_batch(obs[:, :, 2] - Cref_table[index])
+        with np.errstate(divide="ignore"):
+            rewards = np.where(obs[:, :, 0] >= 400, -10.0, 1 / rms)
+
+        counter = index + 1
+        dones = (counter == 90) | ((Cref_signal == "transition") & (counter == 68))
+        dones = np.broadcast_to(dones, (k, h))
+
+        return obs, rewards, dones
+
     def render(self, mode='human', close=False):
         print("render")
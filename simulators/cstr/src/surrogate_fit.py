@@ -0,0 +1,51 @@
+"""
+Fit the CSTR surrogate model on a dataset from surrogate_dataset.py.
+
+Trains the MLP on 80% of the transitions, measures the error on the rest,
+builds the trust-region grid from both and saves the model next to
+`cstr_sim/surrogate.py`, where CSTREnv(integrator="surrogate") loads it.
+
+Usage:
+    python src/surrogate_fit.py [--data surrogate_dataset.npz] [--epochs 60]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from cstr_sim import surrogate
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="surrogate_dataset.npz")
+    parser.add_argument("--epochs", default=60, type=int)
+    parser.add_argument("--bins", default=16, type=int)
+    parser.add_argument("--tol-ca", default=0.05, type=float)
+    parser.add_argument("--tol-t", default=0.5, type=float)
+    parser.add_argument("--out", default=surrogate.PATH_MODEL)
+    args = parser.parse_args()
+
+    data = np.load(args.data)
+    X, Y = data["X"], data["Y"]
+    n = int(0.8 * len(X))
+
+    start = time.perf_counter()
+    weights, biases, scaling = surrogate.fit(X[:n], Y[:n], epochs=args.epochs)
+    print(f"Trained on {n} transitions in {time.perf_counter() - start:.1f}s")
+
+    model = surrogate.SurrogateModel(weights, biases, *scaling, np.zeros(3), np.ones(3), np.ones((1, 1, 1)))
+    Ca, T = model.predict(X[n:, 0], X[n:, 1], X[n:, 2])
+    err = np.abs(np.stack([Ca - X[n:, 0], T - X[n:, 1]], axis=1) - Y[n:])
+
+    model.grid_lo, model.grid_hi, model.trusted = surrogate.trust_region(
+        X[:n], X[n:], err, bins=args.bins, tol=(args.tol_ca, args.tol_t)
+    )
+    model.save(args.out)
+
+    ok = model.in_trust_region(X[n:, 0], X[n:, 1], X[n:, 2])
+    print(f"{'held-out error':<18}{'mean':>10}{'p99':>10}{'max':>10}")
+    for name, e in [("Ca (kmol/m3)", err[:, 0]), ("T (K)", err[:, 1])]:
+        print(f"{name:<18}{e.mean():>10.4f}{np.percentile(e, 99):>10.4f}{e.max():>10.4f}")
+    print(f"trusted cells {model.trusted.sum()}/{model.trusted.size}, "
+          f"held-out samples inside trust region {ok.mean():.1%}")
+    print(f"Saved model to {args.out}")
@@ -0,0 +1,171 @@
+import numpy as np
+
+from composabl_core.agent.scenario import Scenario
+import gymnasium as gym
+
+from cstr_sim import cstr_model as cstr
+from cstr_sim import references
+
+
+class VectorCSTREnv(gym.Env):
+    def __init__(self, num_envs: int = 8):
+        '''
+        Batched version of CSTREnv that steps `num_envs` reactors at once.
+
+        actions = (num_envs, 1) : dTc (delta coolant temperature) per reactor
+        observations = (num_envs, 5) : T, Tc, Ca, Cref, Tref per reactor
+
+        The reactor states are held in NumPy arrays and all reactors are
+        advanced with a single batched integration call per step. Every
+        reactor samples its own Cref_signal, Cref_schedule, Tref_schedule and
+        noise_percentage from the scenario on reset.
+
+        integrator:
+            odeint (default), rk4 or implicit_euler with `substeps` fixed steps
+        '''
+        self.num_envs = num_envs
+        self.Cref_signal = "complete"
+        self.Cref_schedule = None
+        self.Tref_schedule = None
+        self.noise_percentage = 0
+        self.integrator = "odeint"
+        self.substeps = 10
+        self.stiff_solvers = {}  # this env's lsoda/radau/bdf solvers, warm across steps
+        self.scenario: Scenario = None
+
+        low = np.array([200, 200, 0, 0, 200])
+        high = np.array([500, 500, 12, 12, 500])
+        self.single_observation_space = gym.spaces.Box(low=low, high=high)
+        self.single_action_space = gym.spaces.Box(low=np.array([-10.0]), high=np.array([10.0]))
+
+        self.observation_space = gym.spaces.Box(
+            low=np.tile(low, (num_envs, 1)), high=np.tile(high, (num_envs, 1))
+        )
+        self.action_space = gym.spaces.Box(
+            low=np.full((num_envs, 1), -10.0), high=np.full((num_envs, 1), 10.0)
+        )
+
+        self.T = np.zeros(num_envs)
+        self.Tc = np.zeros(num_envs)
+        self.Ca = np.zeros(num_envs)
+        self.Cref = np.zeros(num_envs)
+        self.Tref = np.zeros(num_envs)
+        self.noise = np.zeros(num_envs)
+        self.signal = np.full(num_envs, self.Cref_signal, dtype=object)
+        self.Cref_table = np.zeros((num_envs, references.HORIZON + 1))
+        self.Tref_table = np.zeros((num_envs, references.HORIZON + 1))
+        self.cnt = np.zeros(num_envs, dtype=int)
+        self.error_sum = np.zeros(num_envs)
+        self.rms = np.zeros(num_envs)
+
+    def set_scenario(self, scenario):
+        self.scenario = scenario
+
+    def _sample_config(self):
+        config = {
+            "Cref_signal": self.Cref_signal,
+            "Cref_schedule": self.Cref_schedule,
+            "Tref_schedule": self.Tref_schedule,
+            "noise_percentage": self.noise_percentage,
+        }
+
+        if isinstance(self.scenario, Scenario):
+            sample = self.scenario.sample()
+            config.update({key: sample[key] for key in config if key in sample})
+
+        return config
+
+    def reset(self, seed=None, indices=None):
+        '''
+        Reset all reactors, or only the reactors listed in `indices`, and
+        return the observations of the whole batch.
+        '''
+        super().reset(seed=seed)
+
+        if indices is None:
+            indices = np.arange(self.num_envs)
+
+        for i in indices:
+            config = self._sample_config()
+            noise = config["noise_percentage"]
+            # validation, if someone sends a noise not in the {0,1} format assume that they sent in pct values
+            if noise > 1:
+                noise = noise / 100
+
+            self.signal[i] = config["Cref_signal"]
+            self.noise[i] = noise
+            self.Cref_table[i], self.Tref_table[i] = references.reference_tables(
+                config["Cref_signal"], config["Cref_schedule"], config["Tref_schedule"]
+            )
+
+            if config["Cref_schedule"] is not None:
+                self.Cref[i] = self.Cref_table[i, 0]
+                self.Tref[i] = self.Tref_table[i, 0]
+            elif config["Cref_signal"] == "ss1":
+                self.Cref[i] = 2
+                self.Tref[i] = 373.1311
+            else:
+                self.Cref[i] = 8.5698
+                self.Tref[i] = 311.2612
+
+        # initial conditions
+        self.T[indices] = 311.2639  # K
+        self.Tc[indices] = 292  # K
+        self.Ca[indices] = 8.5698  # kmol/m3
+        self.cnt[indices] = 0
+        self.error_sum[indices] = 0
+        self.rms[indices] = 0
+
+        info = {}
+        return self._get_obs(), info
+
+    def _get_obs(self):
+        return np.stack([self.T, self.Tc, self.Ca, self.Cref, self.Tref], axis=1)
+
+    def step(self, action):
+        ΔTc = np.clip(np.asarray(action, dtype=float).reshape(self.num_envs), -10, 10)
+        self.cnt = np.minimum(self.cnt, 90)
+
+        # update Cref and Tref
+        rows = np.arange(self.num_envs)
+        self.Cref = self.Cref_table[rows, self.cnt]
+        self.Tref = self.Tref_table[rows, self.cnt]
+
+        σ_max1 = self.noise * (8.5698 - 2)
+        σ_max2 = self.noise * (373.1311 - 311.2612)
+
+        σ_Ca = self.np_random.uniform(-σ_max1, σ_max1)
+        σ_T = self.np_random.uniform(-σ_max2, σ_max2)
+
+        # one integration call for the whole batch
+        T, Ca = cstr.simulate_batch(self.T, self.Ca, self.Tc,
+                                    integrator=self.integrator, substeps=self.substeps,
+                                    solvers=self.stiff_solvers)
+
+        # Tc
+        self.Tc = np.clip(self.Tc + ΔTc, 200, 500)
+
+        # Tr and Ca
+        self.T = T + σ_T
+        self.Ca = Ca + σ_Ca
+
+        # Increase time counter
+        self.cnt += 1
+
+        # Error and Reward
+        self.error_sum += (self.Ca - self.Cref)**2
+        self.rms = np.sqrt(self.error_sum / self.cnt)
+
+        with np.errstate(divide="ignore"):
+            reward = np.where(self.T >= 400, -10.0, 1 / self.rms)
+
+        # Constraints to break the simulation
+        done = (self.cnt == 90) | ((self.signal == "transition") & (self.cnt == 68))
+        truncated = np.zeros(self.num_envs, dtype=bool)
+
+        info = {}
+
+        return self._get_obs(), reward, done, truncated, info
+
+    def render(self, mode='human', close=False):
+        print("render")
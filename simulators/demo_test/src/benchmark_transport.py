@@ -0,0 +1,275 @@
+"""
+Serving overhead of the sim servers, measured on the demo sims, whose steps
+cost next to nothing.
+
+Every case starts the sim's `main.py` in a subprocess, connects `clients`
+client processes with the composabl gRPC client `make(...)` (or `ShmClient`
+with `--transport shm`) and times `--steps` steps per client. It reports
+steps/sec over all clients and the p50/p99 step latency seen by a client:
+
+- every `space_type` of demo_test, one client
+- payload size: demo_test box observations of `--payloads` float32 values
+- client count: demo_discrete and demo_continuous with `--clients` clients.
+  A gRPC server process serves one env, so over gRPC the clients take turns
+  stepping that env. Over shm every client gets an env of its own.
+
+The results are written as a JSON baseline. With `--baseline` the run is
+compared against an earlier one and exits non-zero when a case lost more than
+`--tolerance` of its steps/sec, or its p99 grew by more than that, or when a
+case of the baseline failed or did not run.
+
+Usage:
+    python src/benchmark_transport.py [--steps 2000] [--output transport.json]
+    python src/benchmark_transport.py --baseline transport.json --output current.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SIMULATORS = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.append(os.path.join(SIMULATORS, "common"))  # ShmClient
+SPACE_TYPES = ["discrete", "multi_discrete", "multibinary", "box", "dictionary", "tuple"]
+ACTIONS = 64
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class SimServer:
+    '''The `main.py` of a sim in a subprocess.'''
+
+    def __init__(self, sim: str, transport: str):
+        self.transport = transport
+        args = [sys.executable, "main.py"]
+        if transport == "shm":
+            self.address = f"/tmp/benchmark-{sim}-{os.getpid()}.sock"
+            args += ["--transport", "shm", "--shm-path", self.address]
+        else:
+            port = free_port()
+            self.address = f"localhost:{port}"
+            args += ["--port", str(port)]
+        self.process = subprocess.Popen(
+            args, cwd=os.path.join(SIMULATORS, sim, "src"),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        self.wait()
+
+    def ready(self) -> bool:
+        if self.transport == "shm":
+            return os.path.exists(self.address)
+        try:
+            socket.create_connection(("localhost", int(self.address.rsplit(":", 1)[1])), timeout=1).close()
+            return True
+        except OSError:
+            return False
+
+    def wait(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while not self.ready():
+            if self.process.poll() is not None:
+                raise RuntimeError(f"The sim exited: {self.process.stderr.read().decode()[-2000:]}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The sim did not listen on {self.address} after {timeout:.0f}s")
+            time.sleep(0.1)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        if self.transport == "shm" and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def connect(transport: str, address: str, env_init: dict):
+    '''(reset, step, sample, close) of a client session.'''
+    if transport == "shm":
+        from shm_transport import ShmClient
+
+        sim = ShmClient(address)
+        sim.Make("sim-benchmark", env_init)
+        return sim.Reset, sim.Step, sim.ActionSpaceSample, sim.close
+
+    from composabl_core.grpc.client.client import make
+
+    sim = make("run-benchmark", "sim-benchmark", "", address, env_init)
+    sim.init()
+    return sim.reset, sim.step, sim.action_space_sample, sim.close
+
+
+def client(transport: str, address: str, env_init: dict, steps: int, warmup: int, barrier, results):
+    '''One client process: step latencies in ns, and the wall time of the timed steps.'''
+    try:
+        reset, step, sample, close = connect(transport, address, env_init)
+        actions = [sample() for _ in range(ACTIONS)]
+        reset()
+        for i in range(warmup):
+            step(actions[i % ACTIONS])
+        reset()
+
+        latencies = np.empty(steps, dtype=np.int64)
+        barrier.wait()
+        start = time.perf_counter_ns()
+        for i in range(steps):
+            t = time.perf_counter_ns()
+            _, _, terminated, truncated, _ = step(actions[i % ACTIONS])
+            latencies[i] = time.perf_counter_ns() - t
+            if terminated or truncated:
+                reset()
+        wall = time.perf_counter_ns() - start
+        close()
+        results.put((latencies, start, start + wall, None))
+    except Exception as e:
+        barrier.abort()
+        results.put((None, 0, 0, repr(e)))
+
+
+def run_case(transport: str, address: str, env_init: dict, clients: int, steps: int, warmup: int) -> dict:
+    context = mp.get_context("spawn")
+    barrier = context.Barrier(clients)
+    results = context.Queue()
+    processes = [
+        context.Process(target=client, args=(transport, address, env_init, steps, warmup, barrier, results))
+        for _ in range(clients)
+    ]
+    for p in processes:
+        p.start()
+    outcomes = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+
+    errors = [error for *_, error in outcomes if error]
+    if errors:
+        raise RuntimeError(errors[0])
+
+    latencies = np.concatenate([latency for latency, *_ in outcomes])
+    # from the first client starting to the last one finishing
+    wall = max(end for _, _, end, _ in outcomes) - min(start for _, start, _, _ in outcomes)
+    return {
+        "clients": clients,
+        "steps": int(latencies.size),
+        "steps_per_sec": round(latencies.size / wall * 1e9, 1),
+        "p50_us": round(float(np.percentile(latencies, 50)) / 1e3, 2),
+        "p99_us": round(float(np.percentile(latencies, 99)) / 1e3, 2),
+    }
+
+
+def cases(args):
+    '''(name, sim, env_init, clients) of every case.'''
+    for space_type in args.space_types:
+        yield f"demo_test/{space_type}", "demo_test", {"space_type": space_type}, 1
+    for size in args.payloads:
+        yield f"demo_test/box/obs_size={size}", "demo_test", {"space_type": "box", "obs_size": size}, 1
+    for sim in ("demo_discrete", "demo_continuous"):
+        for clients in args.clients:
+            yield f"{sim}/clients={clients}", sim, {}, clients
+
+
+def compare(results: dict, failed: dict, baseline: dict, tolerance: float) -> list:
+    '''
+    Cases that lost more than `tolerance` of their steps/sec, or whose p99
+    grew by more than that, and the cases of the baseline that failed or did
+    not run.
+    '''
+    regressions = []
+    print(f"\n{'case':<40}{'steps/s':>10}{'p99':>10}")
+    for name in baseline:
+        if name not in results:
+            print(f"{name:<40}{'failed' if name in failed else 'missing':>20}  REGRESSION")
+            regressions.append(name)
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<40}{'new':>20}")
+            continue
+        throughput = result["steps_per_sec"] / before["steps_per_sec"] - 1
+        p99 = result["p99_us"] / before["p99_us"] - 1
+        flag = throughput < -tolerance or p99 > tolerance
+        print(f"{name:<40}{throughput:>+10.1%}{p99:>+10.1%}{'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transport", default="grpc", choices=["grpc", "shm"])
+    parser.add_argument("--steps", default=2000, type=int, help="timed steps per client")
+    parser.add_argument("--warmup", default=200, type=int)
+    parser.add_argument("--space-types", default=SPACE_TYPES, nargs="*")
+    parser.add_argument("--payloads", default=[16, 1024, 65536], type=int, nargs="*",
+                        help="float32 values per demo_test box observation")
+    parser.add_argument("--clients", default=[1, 2, 4, 8], type=int, nargs="*")
+    parser.add_argument("--output", default=None,
+                        help="where to write the results, transport.json by default and required with --baseline")
+    parser.add_argument("--baseline", default=None, help="earlier results to compare against")
+    parser.add_argument("--tolerance", default=0.2, type=float)
+    args = parser.parse_args()
+
+    if args.baseline:
+        if args.output is None:
+            parser.error("--baseline needs an --output, the default would overwrite the baseline")
+        if os.path.abspath(args.output) == os.path.abspath(args.baseline):
+            parser.error("--output and --baseline are the same file")
+    args.output = args.output or "transport.json"
+
+    results, failed = {}, {}
+    print(f"{'case':<40}{'steps/s':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    servers = {}
+    try:
+        for name, sim, env_init, clients in cases(args):
+            if sim not in servers:
+                servers[sim] = SimServer(sim, args.transport)
+            server = servers[sim]
+            try:
+                result = run_case(args.transport, server.address, env_init, clients, args.steps, args.warmup)
+            except RuntimeError as e:
+                print(f"{name:<40}failed: {e}")
+                failed[name] = str(e)
+                continue
+            results[name] = result
+            print(f"{name:<40}{result['steps_per_sec']:>10.0f}{result['p50_us']:>10.1f}{result['p99_us']:>10.1f}")
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "transport": args.transport,
+            "steps": args.steps,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+            "failed": failed,
+        }, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if baseline is not None and compare(results, failed, baseline, args.tolerance):
+        sys.exit(1)
+    if failed:
+        sys.exit(f"{len(failed)} cases failed")
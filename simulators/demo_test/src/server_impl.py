@@ -20,7 +20,7 @@ class ServerImpl(ServerComposabl):
     def Make(self, env_id: str, env_init: dict) -> EnvSpec:
         print("got here ===", env_init)
         logger.log("Creating sim with space_type: ", env_init["space_type"])
-        self.env = SimEnv(env_init["space_type"])
+        self.env = SimEnv(env_init["space_type"], env_init.get("obs_size"))
         return {
             "id": "my_simulator",
             "max_episode_steps": 1000
@@ -5,8 +5,10 @@ from composabl_core.agent.scenario import Scenario
 
 
 class SimEnv(gym.Env):
-    def __init__(self, space_type="discrete"):
+    def __init__(self, space_type="discrete", obs_size=None):
         self.space_type = space_type
+        # a float32 box observation of this size, to benchmark larger payloads
+        self.obs_size = obs_size
         
         # Define the initial values
         self.time_ticks = 0
@@ -22,6 +24,12 @@ class SimEnv(gym.Env):
         elif self.space_type == "multibinary":
             self.observation_space = gym.spaces.MultiBinary(2)
             self.action_space = gym.spaces.MultiBinary(3)
+        elif self.space_type == "box" and self.obs_size:
+            self.observation_space = gym.spaces.Box(
+                low=-1e12, high=1e12, shape=(self.obs_size,), dtype=np.float32)
+            self.action_space = gym.spaces.Box(
+                low=np.array([-1e12]), high=np.array([1e12])
+            )
         elif self.space_type == "box":
             self.observation_space = gym.spaces.Box(
                 low=np.array([-1e12, -1e12]), high=np.array([1e12, 1e12]),
@@ -54,6 +62,10 @@ class SimEnv(gym.Env):
         self.scenario: Scenario = None
 
     def _get_observation_box(self):
+        if self.obs_size:
+            obs = np.zeros(self.obs_size, dtype=np.float32)
+            obs[0], obs[-1] = self.value, self.time_ticks
+            return obs
         obs = {"state1": self.value, "time_counter": self.time_ticks}
         return np.array(list(obs.values()))
 
@@ -2,7 +2,6 @@ from typing import Any, Dict, SupportsFloat, Tuple, Optional
 import math
 import random
 import numpy as np
-import matplotlib.pyplot as plt
 
 import control
 
@@ -12,4 +12,4 @@ TAG=$(date +%Y%m%d%H%M%S) # alternatively: git log -1 --pretty=%H
 
 # 1. Build and Push
 echo "Building the docker container"
-docker buildx build --platform linux/amd64 --progress plain -t "$REPO/$APP_NAME:$TAG" -t "$REPO/$APP_NAME:latest" .
+docker buildx build --platform linux/amd64 --progress plain --build-context common=../common -t "$REPO/$APP_NAME:$TAG" -t "$REPO/$APP_NAME:latest" .
@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, Any, Dict, Optional, SupportsFloat, Tuple
 import composabl_core.utils.logger as logger_util
 import gymnasium as gym
 import numpy as np
-import pygame
 from composabl_core.agent.scenario import Scenario
 from composabl_core.grpc.server.server_composabl import ServerComposabl
 from gymnasium import spaces
@@ -219,7 +218,7 @@ class LunarLander(gym.Env, EzPickle):
         self.wind_idx = np.random.randint(-9999, 9999)
         self.torque_idx = np.random.randint(-9999, 9999)
 
-        self.screen: pygame.Surface = None
+        self.screen: "pygame.Surface" = None
         self.clock = None
         self.isopen = True
         self.world = Box2D.b2World(gravity=(0, gravity))
@@ -420,7 +419,8 @@ class LunarLander(gym.Env, EzPickle):
 
         self.drawlist = [self.lander] + self.legs
 
-        if self.render_mode in ["human", "rgb_array"]:
+        # rgb_array frames are rendered on request by get_render_frame
+        if self.render_mode == "human":
             self.render()
         else:
             self.close()
@@ -729,10 +729,7 @@ class LunarLander(gym.Env, EzPickle):
 
     def get_render_frame(self):
         self.render_mode = "rgb_array"
-        self.render()
-        return np.transpose(
-                np.array(pygame.surfarray.pixels3d(self.surf)), axes=(1, 0, 2)
-            )
+        return self.render()
 
 
 class ServerImpl(ServerComposabl):
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import importlib
+from collections.abc import Mapping
 from typing import Any, Dict, SupportsFloat, Tuple
 
 import composabl_core.utils.logger as logger_util
@@ -6,45 +8,61 @@ import gymnasium as gym
 from composabl_core.agent.scenario import Scenario
 from composabl_core.grpc.server.server_composabl import (EnvSpec,
                                                          ServerComposabl)
-# Support Envs
-from gym_envs.ant import AntEnv
-from gym_envs.half_cheetah import HalfCheetahEnv
-from gym_envs.hopper import HopperEnv
-from gym_envs.humanoid import HumanoidEnv
-from gym_envs.humanoidstandup import HumanoidStandupEnv
-from gym_envs.inverted_double_pendulum import InvertedDoublePendulumEnv
-from gym_envs.inverted_pendulum import InvertedPendulumEnv
-from gym_envs.pusher import PusherEnv
-from gym_envs.reacher import ReacherEnv
-from gym_envs.swimmer import SwimmerEnv
-from gym_envs.walker2d import Walker2dEnv
 
 logger = logger_util.get_logger(__name__)
 
+# Support Envs, as module:class so an env and its dependencies only load when it is made
+ENVS_SUPPORTED = {
+    "ant": "gym_envs.ant:AntEnv",
+    "half_cheetah": "gym_envs.half_cheetah:HalfCheetahEnv",
+    "hopper": "gym_envs.hopper:HopperEnv",
+    "humanoid": "gym_envs.humanoid:HumanoidEnv",
+    "humanoidstandup": "gym_envs.humanoidstandup:HumanoidStandupEnv",
+    "inverted_double_pendulum": "gym_envs.inverted_double_pendulum:InvertedDoublePendulumEnv",
+    "inverted_pendulum": "gym_envs.inverted_pendulum:InvertedPendulumEnv",
+    "pusher": "gym_envs.pusher:PusherEnv",
+    "reacher": "gym_envs.reacher:ReacherEnv",
+    "swimmer": "gym_envs.swimmer:SwimmerEnv",
+    "walker2d": "gym_envs.walker2d:Walker2dEnv",
+}
+
+
+class LazyEnvs(Mapping):
+    '''Registry of env classes that imports a class on its first lookup.'''
+
+    def __init__(self, paths: Dict[str, str]):
+        self.paths = paths
+        self.loaded = {}
+
+    def __getitem__(self, env_id: str):
+        if env_id not in self.loaded:
+            module, name = self.paths[env_id].split(":")
+            self.loaded[env_id] = getattr(importlib.import_module(module), name)
+        return self.loaded[env_id]
+
+    def __contains__(self, env_id) -> bool:
+        return env_id in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+
 # Implements https://mgoulao.github.io/gym-docs/environments/mujoco/walker2d/
 class ServerImpl(ServerComposabl):
+    # the renderers hold GL contexts bound to the thread that made them
+    thread_safe = False
+
     def __init__(self):
         self.env = None
-        self.envs_supported = {
-            "ant": AntEnv,
-            "half_cheetah": HalfCheetahEnv,
-            "hopper": HopperEnv,
-            "humanoid": HumanoidEnv,
-            "humanoidstandup": HumanoidStandupEnv,
-            "inverted_double_pendulum": InvertedDoublePendulumEnv,
-            "inverted_pendulum": InvertedPendulumEnv,
-            "pusher": PusherEnv,
-            "reacher": ReacherEnv,
-            "swimmer": SwimmerEnv,
-            "walker2d": Walker2dEnv,
-        }
+        self.envs_supported = LazyEnvs(ENVS_SUPPORTED)
 
     def Make(self, env_id: str, env_init: dict) -> EnvSpec:
         env_id = env_id.lower()
-        envs_supported_keys = self.envs_supported.keys()
-
-        if env_id not in envs_supported_keys:
-            raise Exception("Env ID not supported, supported envs: {}".format(envs_supported_keys))
+        if env_id not in self.envs_supported:
+            raise Exception("Env ID not supported, supported envs: {}".format(list(self.envs_supported)))
 
         # Check if env_init keys are in the kwargs of the env and then add them
         # to the env_init dict
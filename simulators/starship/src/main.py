@@ -1,9 +1,23 @@
 import argparse
 import os
+import sys
 
 import grpc
 from composabl_core.grpc.server.server import Server
-from server_impl import ServerImpl
+
+# the shared server modules, copied next to this file in the sim image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from batching import with_batching
+from encoding import with_packed_obs
+from metrics import metered
+from prewarm import with_prewarm
+from render_stream import with_render_stream
+from rollout import with_rollout
+from sessions import with_sessions
+from shm_transport import DEFAULT_PATH, serve_shm
+from startup import measure_startup
+from workers import run_workers, watched
 
 
 def start():
@@ -13,12 +27,78 @@ def start():
     parser.add_argument(
         "--timeout", default=os.environ.get("TIMEOUT") or None, type=int
     )
+    parser.add_argument(
+        "--processes", default=os.environ.get("PROCESSES") or 1, type=int,
+        help="number of server worker processes sharing the port"
+    )
+    parser.add_argument(
+        "--transport", default=os.environ.get("TRANSPORT") or "grpc", choices=["grpc", "shm"],
+        help="grpc, or shm to serve an agent on the same host through shared memory"
+    )
+    parser.add_argument("--shm-path", default=os.environ.get("SHM_PATH") or DEFAULT_PATH)
+    parser.add_argument(
+        "--shm-sessions", default=os.environ.get("SHM_SESSIONS") or 0, type=int,
+        help="with --transport shm, host up to N envs per connection keyed by session id, for StepMany/ResetMany"
+    )
+    parser.add_argument(
+        "--prewarm", default=os.environ.get("PREWARM") or 0, type=int,
+        help="keep N envs per scenario reset ahead so Reset returns at once, 0 disables it"
+    )
+    parser.add_argument(
+        "--prewarm-scenarios", default=os.environ.get("PREWARM_SCENARIOS") or 1, type=int,
+        help="number of most recently used scenarios that keep a pre-warmed pool"
+    )
+    parser.add_argument(
+        "--allow-controller-policies", action="store_true",
+        default=os.environ.get("ALLOW_CONTROLLER_POLICIES", "").lower() == "true",
+        help="accept pickled controller policies in SetPolicy, which runs client code in the sim"
+    )
+    parser.add_argument(
+        "--metrics-port", default=os.environ.get("METRICS_PORT") or 0, type=int,
+        help="serve RPC latency metrics as text on this local port, 0 disables it"
+    )
+    parser.add_argument(
+        "--metrics-interval", default=os.environ.get("METRICS_INTERVAL") or 0, type=float,
+        help="log a metrics summary every N seconds, 0 disables it"
+    )
+    parser.add_argument(
+        "--measure-startup", action="store_true",
+        help="report the import time of the server and the sim, then exit"
+    )
+    parser.add_argument(
+        "--startup-budget", default=os.environ.get("STARTUP_BUDGET") or None, type=float,
+        help="with --measure-startup, exit non-zero when startup takes longer than N seconds"
+    )
     args = parser.parse_args()
 
+    if args.measure_startup:
+        sys.exit(measure_startup("main", args.startup_budget))
+
     print(f"Starting with arguments {args}")
 
+    if args.transport == "shm":
+        server_impl = build_server_impl(args)
+        serve_shm(with_sessions(server_impl, args.shm_sessions) if args.shm_sessions else server_impl, args.shm_path)
+    elif args.processes > 1:
+        run_workers(serve, args, args.processes)
+    else:
+        serve(args)
+
+
+def build_server_impl(args):
+    # imported here so only the process that serves loads the sim and its dependencies
+    from server_impl import ServerImpl
+
+    # the pool sits right around the sim, so its Reset runs through every wrapper above it
+    server_impl = with_prewarm(ServerImpl, args.prewarm, args.prewarm_scenarios) if args.prewarm else ServerImpl
+    server_impl = with_batching(with_packed_obs(with_render_stream(with_rollout(server_impl, args.allow_controller_policies))))
+    return watched(metered(server_impl, args.metrics_port, args.metrics_interval))
+
+
+def serve(args):
     try:
-        server = Server(ServerImpl, args.host, args.port, args.timeout)
+        server_impl = build_server_impl(args)
+        server = Server(server_impl, args.host, args.port, args.timeout)
         server.start()
     except KeyboardInterrupt:
         print("KeyboardInterrupt, Gracefully stopping the server")
@@ -0,0 +1,196 @@
+"""
+Parallel benchmark episodes for the CSTR agents.
+
+The `agents/cstr/*/benchmarks.py` scripts used to run their episodes one after
+the other, growing a DataFrame with `pd.concat` on every step, and aggregated
+every time step with list comprehensions. `run_episodes` splits the episodes
+over `workers` processes instead. Each worker builds its own env and policy
+with the given factories and runs its episodes into one array. The results are
+gathered in a preallocated `(episodes, steps, features)` array, NaN after an
+episode ended:
+
+    trajectories, lengths = run_episodes(make_env, make_policy, episodes=100, steps=90)
+    summary = summarize(trajectories, lengths, noise=0.05)
+    plot_benchmark(summary, f"{PATH}/img/benchmark_figure.png")
+    write_summary(summary, f"{PATH}/img/benchmark_summary.json")
+
+`make_env()` returns an env with `reset()` and `step(action)`, already set to
+its scenario, and `make_policy()` returns a function from an observation to an
+action, with a `reset()` called before every episode if it has one. Both are
+called in the worker processes, so they have to be module level functions of
+an importable module or of a script with a `if __name__ == "__main__":` guard.
+
+Every episode gets the seed `seed + episode`, applied to `random`, to NumPy's
+global generator and to the env's `rng` when it has one, like `CSTREnv`. Sims
+behind gRPC are not seeded, they keep their own noise.
+"""
+import json
+import os
+import random
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURES = ['T', 'Tc', 'Ca', 'Cref', 'Tref']
+
+
+def seed_episode(env, seed: int):
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    rng = getattr(env, "rng", None)
+    if isinstance(rng, random.Random):
+        rng.seed(seed)
+
+
+def resolve_workers(workers: Optional[int], episodes: int) -> int:
+    '''One worker per CPU by default, never more than episodes.'''
+    return max(min(workers or os.cpu_count() or 1, episodes), 1)
+
+
+def run_chunk(make_env: Callable, make_policy: Callable, seeds: Sequence[int], steps: int,
+              features: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''Run one episode per seed with one env and policy, in a worker or in this process.'''
+    env, policy = make_env(), make_policy()
+    trajectories = np.full((len(seeds), steps, features), np.nan)
+    lengths = np.zeros(len(seeds), dtype=np.int64)
+    try:
+        for e, seed in enumerate(seeds):
+            seed_episode(env, seed)
+            if hasattr(policy, "reset"):
+                policy.reset()
+            obs, info = env.reset()
+            for i in range(steps):
+                obs, reward, done, truncated, info = env.step(policy(obs))
+                trajectories[e, i] = np.asarray(obs, dtype=np.float64).ravel()[:features]
+                lengths[e] = i + 1
+                if done:
+                    break
+    finally:
+        if hasattr(env, "close"):
+            env.close()
+    return trajectories, lengths
+
+
+def run_episodes(make_env: Callable, make_policy: Callable, episodes: int = 100, steps: int = 90,
+                 seed: int = 0, workers: Optional[int] = None,
+                 features: int = len(FEATURES)) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Trajectories of `episodes` episodes of up to `steps` steps, shape
+    (episodes, steps, features), and the number of steps of each episode.
+    `workers` defaults to one per CPU, 1 runs everything in this process.
+    '''
+    workers = resolve_workers(workers, episodes)
+    trajectories = np.full((episodes, steps, features), np.nan)
+    lengths = np.zeros(episodes, dtype=np.int64)
+    chunks = np.array_split(np.arange(episodes), workers)
+
+    if workers == 1:
+        trajectories[:], lengths[:] = run_chunk(make_env, make_policy, [seed + e for e in range(episodes)], steps, features)
+        return trajectories, lengths
+
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        futures = [
+            (chunk, pool.submit(run_chunk, make_env, make_policy, [seed + int(e) for e in chunk], steps, features))
+            for chunk in chunks
+        ]
+        for chunk, future in futures:
+            trajectories[chunk], lengths[chunk] = future.result()
+    return trajectories, lengths
+
+
+def rms(values: np.ndarray, reference: np.ndarray) -> float:
+    return float(np.sqrt(np.nanmean((values - reference) ** 2)))
+
+
+def summarize(trajectories: np.ndarray, lengths: np.ndarray, features: Sequence[str] = FEATURES,
+              **info: Any) -> Dict[str, Any]:
+    '''RMS errors and the min, max and mean of T and Ca over the episodes at every time step.'''
+    column = {name: trajectories[:, :, i] for i, name in enumerate(features)}
+    per_step = {}
+    with warnings.catch_warnings():
+        # time steps no episode reached are NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for name in ("T", "Ca"):
+            per_step[name] = {
+                "min": np.nanmin(column[name], axis=0),
+                "max": np.nanmax(column[name], axis=0),
+                "mean": np.nanmean(column[name], axis=0),
+            }
+    # the setpoints of the first episode, every episode follows the same schedule
+    per_step["Tref"] = column["Tref"][0]
+    per_step["Cref"] = column["Cref"][0]
+
+    return {
+        **info,
+        "episodes": int(trajectories.shape[0]),
+        "steps": int(trajectories.shape[1]),
+        "episode_steps": lengths,
+        "rms_T": rms(column["T"], column["Tref"]),
+        "rms_Ca": rms(column["Ca"], column["Cref"]),
+        "per_step": per_step,
+    }
+
+
+def plot_benchmark(summary: Dict[str, Any], path: str):
+    '''The benchmark figure: T and Ca over the episodes against their setpoints.'''
+    import matplotlib.pyplot as plt
+
+    per_step, steps = summary["per_step"], np.arange(summary["steps"])
+    rmsT, rmsCa = round(summary["rms_T"], 2), round(summary["rms_Ca"], 2)
+
+    plt.figure()
+    plt.subplot(2,1,1)
+    plt.fill_between(steps, per_step["T"]["min"], per_step["T"]["max"], alpha = 0.2)
+    plt.plot(steps, per_step["Tref"],'k--',lw=2,label=r'$T_{sp}$')
+    plt.plot(steps, per_step["T"]["mean"],'b.-',lw=1,label=r'$T_{sp}$')
+    plt.plot(steps, np.full(len(steps), 400),'r--',lw=1)
+    plt.ylabel('Temperature')
+    plt.title(f'Benchmarks Noise: {summary.get("noise")}' + f" (RMS T: {rmsT} , RMS Ca: {rmsCa})")
+
+    plt.subplot(2,1,2)
+    plt.fill_between(steps, per_step["Ca"]["min"], per_step["Ca"]["max"], alpha = 0.2)
+    plt.plot(steps, per_step["Cref"],'k--',lw=2,label=r'$C_{sp}$')
+    plt.plot(steps, per_step["Ca"]["mean"],'b.-',lw=1,label=r'$C_{sp}$')
+    plt.ylabel('Concentration')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    plt.savefig(path)
+    plt.close()
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {key: _jsonable(v) for key, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return [None if isinstance(v, float) and np.isnan(v) else v for v in value.tolist()]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_summary(summary: Dict[str, Any], path: str):
+    '''The summary as JSON, arrays as lists with null for the steps no episode reached.'''
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(_jsonable(summary), f, indent=2)
+
+
+def benchmark(make_env: Callable, make_policy: Callable, figure_path: str, summary_path: str,
+              episodes: int = 100, steps: int = 90, seed: int = 0, workers: Optional[int] = None,
+              **info: Any) -> Dict[str, Any]:
+    '''Run the episodes, print the RMS errors and write the figure and the JSON summary.'''
+    workers = resolve_workers(workers, episodes)
+    start = time.perf_counter()
+    trajectories, lengths = run_episodes(make_env, make_policy, episodes, steps, seed, workers)
+    summary = summarize(trajectories, lengths, seed=seed, workers=workers,
+                        seconds=round(time.perf_counter() - start, 2), **info)
+    print('RMS T: ', round(summary["rms_T"], 2))
+    print('RMS Ca: ', round(summary["rms_Ca"], 2))
+    print(f"{episodes} episodes in {summary['seconds']} s")
+    plot_benchmark(summary, figure_path)
+    write_summary(summary, summary_path)
+    return summary
@@ -0,0 +1,116 @@
+"""
+Per-step cost of the teachers' rewards as the history grows.
+
+Times the reward bodies of the CSTR and boiler teachers at `--steps` steps
+into a run: the way they rescanned their whole history on every step, and the
+streaming statistics of `utils/stats.py` they use now. The rescans get slower
+the longer the run, the streaming rewards cost the same at every length.
+
+Usage:
+    python utils/benchmark_stats.py [--steps 1000 5000 10000 20000] [--window 200]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.stats import RunningMean
+
+BOILER_SENSORS = ["y1", "y2", "y3", "y1ref", "y2ref", "y3ref", "u1", "u2", "u3", "rms",
+                  "eff_nox_red", "nox_emissions", "total_nox_emissions"]
+
+
+class CSTRRescan:
+    '''`CSTRTeacher` before: the mean of every squared error so far.'''
+
+    def __init__(self, observations):
+        self.error_history = [(o["Cref"] - o["Ca"]) ** 2 for o in observations]
+
+    def reward(self, obs):
+        error = (float(obs["Cref"]) - float(obs["Ca"])) ** 2
+        self.error_history.append(error)
+        rms = math.sqrt(np.mean(self.error_history))
+        return 1 / math.sqrt(error + 1e-11), rms
+
+
+class CSTRStreaming:
+    def __init__(self, observations):
+        self.error_mean = RunningMean()
+        for o in observations:
+            self.error_mean.update((o["Cref"] - o["Ca"]) ** 2)
+
+    def reward(self, obs):
+        error = (float(obs["Cref"]) - float(obs["Ca"])) ** 2
+        rms = math.sqrt(self.error_mean.update(error))
+        return 1 / math.sqrt(error + 1e-11), rms
+
+
+class BoilerRescan:
+    '''`LevelTeacher` before: the history converted to an array twice to take two column means.'''
+
+    def __init__(self, observations):
+        self.obs_history = [list(o.values()) for o in observations]
+
+    def reward(self, obs):
+        self.obs_history.append(list(obs.values()))
+        error = abs(np.mean(np.array(self.obs_history)[:, 0]) - np.mean(np.array(self.obs_history)[:, 3]))
+        return 1 / error if error != 0 else 1e12
+
+
+class BoilerStreaming:
+    def __init__(self, observations):
+        self.value_mean = RunningMean()
+        self.setpoint_mean = RunningMean()
+        for o in observations:
+            self.value_mean.update(o["y1"])
+            self.setpoint_mean.update(o["y1ref"])
+
+    def reward(self, obs):
+        value = self.value_mean.update(obs["y1"])
+        setpoint = self.setpoint_mean.update(obs["y1ref"])
+        error = abs(value - setpoint)
+        return 1 / error if error != 0 else 1e12
+
+
+def observations(kind: str, n: int, rng: np.random.Generator):
+    if kind == "cstr":
+        values = rng.normal([8.5, 8.57], 0.1, size=(n, 2))
+        return [{"Ca": ca, "Cref": cref} for ca, cref in values]
+    values = rng.normal(1.0, 0.1, size=(n, len(BOILER_SENSORS)))
+    return [dict(zip(BOILER_SENSORS, row)) for row in values]
+
+
+def per_step(reward_cls, kind: str, steps: int, window: int, rng: np.random.Generator) -> float:
+    '''Mean seconds per reward over `window` steps, after `steps` steps of history.'''
+    obs = observations(kind, steps + window, rng)
+    teacher = reward_cls(obs[:steps])
+    start = time.perf_counter()
+    for o in obs[steps:]:
+        teacher.reward(o)
+    return (time.perf_counter() - start) / window
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", default=[1000, 5000, 10000, 20000], type=int, nargs="*",
+                        help="history lengths to time the reward at")
+    parser.add_argument("--window", default=200, type=int, help="timed steps per history length")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cases = [
+        ("cstr rescan", CSTRRescan, "cstr"),
+        ("cstr streaming", CSTRStreaming, "cstr"),
+        ("boiler rescan", BoilerRescan, "boiler"),
+        ("boiler streaming", BoilerStreaming, "boiler"),
+    ]
+    print(f"{'reward':<20}" + "".join(f"{f'{n} steps':>14}" for n in args.steps) + f"{'growth':>10}")
+    for name, reward_cls, kind in cases:
+        times = [per_step(reward_cls, kind, n, args.window, rng) for n in args.steps]
+        cells = "".join(f"{t * 1e6:>11.1f} µs" for t in times)
+        print(f"{name:<20}{cells}{times[-1] / times[0]:>9.1f}x")
@@ -3,14 +3,16 @@ Utils for cleaning up folder structures while running agents.
 """
 
 import os
+from typing import Tuple, Union
 
-def cleanup_folder(path: str, extension: str = '.pkl') -> None:
+def cleanup_folder(path: str, extension: Union[str, Tuple[str, ...]] = ('.pkl', '.npz')) -> None:
     """
     Delete old history files.
 
     Args:
         path (str): Path to the folder containing the history files.
-        extension (str): Extension of the files to be deleted. Default is '.pkl'.
+        extension (str | tuple): Extension(s) of the files to be deleted. Default
+            is '.pkl' and '.npz', the parts written by `utils.history`.
     """
     try:
         files = os.listdir(path)
@@ -2,7 +2,7 @@
 Utils for generating config parameters for the agents.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 
 def generate_config(
@@ -10,8 +10,9 @@ def generate_config(
     target: str,
     image: str,
     env_name: str,
-    workers: int,
+    workers: Union[int, str],
     num_gpus: int = 0,
+    cores: Optional[int] = None,
     **env_kwargs,
 ) -> Dict[str, Any]:
     """
@@ -24,7 +25,12 @@ def generate_config(
         image (str): Docker image to be used.
         local_address (str): Local address.
         env_name (str): Name of the environment.
-        workers (int): Number of workers.
+        workers (int | str): Number of workers, or 'auto' to size the
+            runtime to the sim with `utils.planner`: a short calibration
+            (cached per image tag) sets `runtime.workers`. A local sim
+            always gets 1 worker and is not calibrated.
+        cores (int): Cores available to the runtime with workers='auto',
+            all the cores of this machine by default.
         **kwargs: Additional parameters.
 
     Returns:
@@ -45,6 +51,9 @@ def generate_config(
         }
     }
 
+    if workers == "auto" and target != "local":
+        config["runtime"]["workers"] = plan_workers(target, image, cores)
+
     if target == "docker":
         config["target"] = {
             "docker": {
@@ -77,3 +86,17 @@ def generate_config(
         }
 
     return config
+
+
+def plan_workers(target: str, image: str, cores: Optional[int]) -> int:
+    """Runtime workers recommended by `utils.planner` for the sim image of `target`."""
+    from utils.planner import calibrate, describe, plan
+
+    if target == "kubernetes":
+        # the cluster schedules the sims, calibrate the image on this machine
+        target = "docker"
+    calibration = calibrate(target, image=image)
+    recommendation = plan(calibration, cores=cores)
+    print(f"|-- Planned runtime for {describe(calibration, recommendation)}")
+
+    return recommendation["workers"]
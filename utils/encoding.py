@@ -0,0 +1,12 @@
+"""
+Agent side of the packed observation encoding, `PackedEncoding(space)` to
+decode the observations of a sim made with `env_init["obs_encoding"] =
+"packed"`. The module is shared with the sims and lives in
+`simulators/common/encoding.py`, this one re-exports it.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulators", "common"))
+
+from encoding import *  # noqa: E402,F401,F403
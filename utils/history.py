@@ -0,0 +1,222 @@
+"""
+Buffered, columnar training history for the teachers.
+
+A teacher used to append one row per step by concatenating a one-row
+DataFrame onto its whole history and pickling all of it again, so every step
+cost O(history) in CPU and disk I/O. `HistoryRecorder` writes each row into
+preallocated column arrays instead. Every `chunk` rows a background thread
+writes the full buffer as one `.npz` part next to the others, and it also
+writes a partial buffer that is older than `interval` seconds. Appending a
+row is O(1) and the disk only sees whole chunks.
+
+A dataset is a path without extension, e.g. `history/db`. Its parts are
+`history/db-<run>-<n>.npz`, where `<run>` is the process ID and start time, so
+several worker processes can record into the same dataset. `read_history(path)` loads the parts as one DataFrame, and
+`recorder.column(name)` returns everything recorded so far, including the
+rows not written yet, for the plotting helpers.
+
+A recorder only keeps the rows that are not on disk yet in memory, at most a
+few chunks, so its memory stays flat however long the run is. `column` and
+`since` read the written parts back from disk. `since(start)` only loads the
+parts that hold rows from `start` on, which is what the live plots call.
+"""
+import atexit
+import glob
+import os
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+CHUNK = 1024
+INTERVAL = 30.0  # seconds before a partial chunk is written anyway
+
+_recorders: Dict[str, "HistoryRecorder"] = {}
+_recorders_lock = threading.Lock()
+
+
+def parts(path: str) -> List[str]:
+    '''The written parts of the dataset `path`, oldest first.'''
+    files = glob.glob(f"{glob.escape(path)}-*.npz")
+    return sorted(files, key=lambda f: (os.path.getmtime(f), f))
+
+
+def load_parts(files: Sequence[str], columns: Sequence[str] = None) -> Dict[str, np.ndarray]:
+    '''The columns of `files` concatenated, by default all of them. Parts without a column are skipped for it.'''
+    loaded: Dict[str, List[np.ndarray]] = {}
+    for part in files:
+        with np.load(part) as data:
+            for name in columns or data.files:
+                if name in data.files:
+                    loaded.setdefault(name, []).append(data[name])
+    return {name: np.concatenate(arrays) for name, arrays in loaded.items()}
+
+
+def load_columns(path: str, columns: Sequence[str] = None) -> Dict[str, np.ndarray]:
+    '''Columns of every part of the dataset `path`, concatenated.'''
+    return load_parts(parts(path), columns)
+
+
+def read_history(path: str):
+    '''The dataset `path` as a DataFrame, an empty one when nothing was recorded yet.'''
+    import pandas as pd
+
+    return pd.DataFrame(load_columns(path))
+
+
+class HistoryRecorder:
+    '''
+    Records rows of float `columns` into the dataset `path`. Instances are
+    shared per path within a process, get them with `history_recorder`.
+    '''
+
+    def __init__(self, path: str, columns: Sequence[str], chunk: int = CHUNK, interval: float = INTERVAL):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk = chunk
+        self.interval = interval
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.previous_parts = parts(path)  # recorded by earlier runs
+        self._written: List[Tuple[str, int]] = []  # (file, rows) of the parts of this recorder on disk
+        self._run = f"{os.getpid()}-{int(time.time())}"
+        self._part = 0
+        self._buffer = self._new_buffer()
+        self._size = 0
+        self._started = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, np.ndarray]] = []
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._writer = None  # started by the first row, a recorder that never records costs no thread
+
+    def _new_buffer(self) -> Dict[str, np.ndarray]:
+        return {name: np.empty(self.chunk, dtype=np.float64) for name in self.columns}
+
+    def append(self, **row):
+        '''Record one row, every column must be given.'''
+        with self._lock:
+            i = self._size
+            if i == 0:
+                self._started = time.monotonic()
+                if self._writer is None:
+                    self._start_writer()
+            for name, column in self._buffer.items():
+                column[i] = float(row[name])
+            self._size = i + 1
+            if self._size == self.chunk:
+                self._swap()
+
+    def _start_writer(self):
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _swap(self):
+        '''Queue the rows of the buffer for writing. Call with the lock held.'''
+        if not self._size:
+            return
+        rows = {name: column[:self._size] for name, column in self._buffer.items()}
+        self._pending.append(rows)
+        self._buffer = self._new_buffer()
+        self._size = 0
+        self._wake.notify()
+
+    def flush(self):
+        '''Queue the rows recorded so far and wait until they are on disk.'''
+        with self._lock:
+            self._swap()
+            while self._pending and self._writer is not None and self._writer.is_alive():
+                self._wake.wait(0.1)
+
+    def close(self):
+        if self._closed or self._writer is None:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._writer.join(5)
+
+    def _write_loop(self):
+        with self._lock:
+            while True:
+                while not self._pending and not self._closed:
+                    self._wake.wait(self.interval)
+                    if self._size and time.monotonic() - self._started >= self.interval:
+                        self._swap()
+                if not self._pending:
+                    return
+                rows = self._pending[0]
+                self._lock.release()
+                try:
+                    name = self._write(rows)
+                finally:
+                    self._lock.acquire()
+                # the rows move from memory to disk at once for the readers
+                self._written.append((name, len(rows[self.columns[0]])))
+                self._pending.pop(0)
+                self._wake.notify_all()
+
+    def _write(self, rows: Dict[str, np.ndarray]) -> str:
+        name = f"{self.path}-{self._run}-{self._part:05d}.npz"
+        self._part += 1
+        # readers never see a part half written
+        with open(f"{name}.tmp", "wb") as f:
+            np.savez(f, **rows)
+        os.replace(f"{name}.tmp", name)
+        return name
+
+    def _segments(self) -> List[Tuple[int, object]]:
+        '''(rows, part file or columns) of everything this recorder recorded, oldest first. Call with the lock held.'''
+        unwritten = self._pending + [{name: column[:self._size].copy() for name, column in self._buffer.items()}]
+        return [(n, name) for name, n in self._written] + [(len(rows[self.columns[0]]), rows) for rows in unwritten]
+
+    def column(self, name: str) -> np.ndarray:
+        '''
+        Every value of `name` recorded in the dataset so far, by earlier runs
+        too. The written parts are read back from disk, so a call costs
+        O(history); prefer `since` for repeated reads.
+        '''
+        with self._lock:
+            segments = self._segments()
+        files = self.previous_parts + [segment for _, segment in segments if isinstance(segment, str)]
+        chunks = [load_parts(files, [name]).get(name, np.empty(0))]
+        chunks += [segment[name] for _, segment in segments if not isinstance(segment, str)]
+        return np.concatenate(chunks)
+
+    def since(self, start: int) -> Dict[str, np.ndarray]:
+        '''Columns of the rows this process recorded from row `start` on, only the parts holding them are read.'''
+        with self._lock:
+            segments = self._segments()
+        chunks, offset = [], 0
+        for n, segment in segments:
+            if offset + n > start:
+                rows = load_parts([segment]) if isinstance(segment, str) else segment
+                chunks.append({name: rows[name][max(start - offset, 0):] for name in self.columns})
+            offset += n
+        return {name: np.concatenate([c[name] for c in chunks]) if chunks else np.empty(0) for name in self.columns}
+
+    def frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({name: self.column(name) for name in self.columns})
+
+    def __len__(self) -> int:
+        with self._lock:
+            pending = sum(len(rows[self.columns[0]]) for rows in self._pending)
+            return sum(n for _, n in self._written) + pending + self._size
+
+
+def history_recorder(path: str, columns: Sequence[str], chunk: int = CHUNK, interval: float = INTERVAL) -> HistoryRecorder:
+    '''The recorder of the dataset `path` in this process, created on the first call.'''
+    key = os.path.abspath(path)
+    with _recorders_lock:
+        if key not in _recorders:
+            _recorders[key] = HistoryRecorder(path, columns, chunk, interval)
+        recorder = _recorders[key]
+    if recorder.columns != list(columns):
+        raise ValueError(f"The dataset {path} records the columns {recorder.columns} in this process, not {list(columns)}")
+    return recorder
@@ -0,0 +1,215 @@
+"""
+Live plots of a teacher, drawn in a separate process.
+
+With `metrics='standard'` the teachers used to call `plot_obs()` and
+`plot_metrics()` from `compute_success_criteria`, so every step paid for a
+matplotlib redraw and a `plt.pause`. Now they call
+
+    plot_live(self, "plot_obs", "plot_metrics")
+
+which costs a clock read on most steps. At most `fps` times per second it
+sends the rows added since the last refresh to a plotting process: new
+observations of the `ObsHistory` attributes, new rows of the
+`HistoryRecorder` ones and new items of the lists. The plotting process keeps
+a mirror of those attributes and calls the teacher's plot methods on the
+mirror, so `self.obs_history.column("Ca")` or `self.reward_history` in a plot
+method reads the mirrored data.
+
+Nothing waits on the plotting process. When it falls behind, its queue fills
+up and the rows stay with the teacher until the next refresh, and it draws the
+latest data once instead of every frame it missed.
+"""
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from numbers import Number
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from utils.history import HistoryRecorder, load_parts
+from utils.obs_history import ObsHistory
+
+FPS = 2.0
+QUEUE_SIZE = 4  # refreshes waiting for the plotting process before the teacher holds on to its rows
+
+
+class Columns:
+    '''The mirror of a `HistoryRecorder`, `column(name)` like the recorder.'''
+
+    def __init__(self, previous: Dict[str, np.ndarray]):
+        self._chunks: Dict[str, List[np.ndarray]] = {name: [values] for name, values in previous.items()}
+
+    def extend(self, rows: Dict[str, np.ndarray]):
+        for name, values in rows.items():
+            chunks = self._chunks.setdefault(name, [])
+            chunks.append(values)
+            if len(chunks) > 1:
+                # one array per column, so plots read it without copying
+                chunks[:] = [np.concatenate(chunks)]
+
+    def column(self, name: str) -> np.ndarray:
+        chunks = self._chunks.get(name)
+        return chunks[0] if chunks else np.empty(0)
+
+
+class LivePlot:
+    '''
+    Streams the plotted attributes of an object to a plotting process that
+    calls the plot methods `draw` of its class on a mirror of them.
+    '''
+
+    def __init__(self, cls: type, draw: Sequence[str], fps: float = FPS):
+        self.draw = [getattr(cls, name) for name in draw]
+        self.period = 1 / fps
+        self.held = 0  # refreshes the plotting process had no room for
+        self._next = 0.0
+        self._process = None
+        self._queue = None
+        self._sent: Dict[str, tuple] = {}
+        self._failed = False
+
+    def _start(self):
+        context = mp.get_context("spawn")
+        self._queue = context.Queue(QUEUE_SIZE)
+        self._process = context.Process(
+            target=_plot_process, args=(self._queue, self.draw, self.period), name="live-plot", daemon=True,
+        )
+        self._process.start()
+
+    def update(self, obj):
+        '''Send what changed in `obj` when a refresh is due, never blocks.'''
+        now = time.monotonic()
+        if now < self._next or self._failed:
+            return
+        self._next = now + self.period
+
+        if self._process is None:
+            try:
+                self._start()
+            except Exception as e:
+                # e.g. a daemonic worker process, which cannot start one
+                print(f"Live plots are off, the plotting process did not start: {e}")
+                self._failed = True
+                return
+        elif not self._process.is_alive():
+            self._failed = True
+            return
+
+        changes, sent = self._changes(obj)
+        if not changes:
+            return
+        try:
+            self._queue.put_nowait(changes)
+        except queue.Full:
+            self.held += 1
+            return
+        self._sent.update(sent)
+
+    def _changes(self, obj):
+        '''The changes since the last refresh, and the new positions in each attribute.'''
+        changes, sent = [], {}
+        for name, value in vars(obj).items():
+            last = self._sent.get(name)
+            if isinstance(value, ObsHistory):
+                if value.total == 0:
+                    continue
+                if last is None or last[0] != id(value) or value.total - last[1] > value.capacity:
+                    changes.append((name, "obs", (value.capacity, value.keys, value.array().copy(), True)))
+                elif value.total > last[1]:
+                    changes.append((name, "obs", (value.capacity, value.keys, value.last(value.total - last[1]).copy(), False)))
+                sent[name] = (id(value), value.total)
+            elif isinstance(value, HistoryRecorder):
+                start = 0 if last is None else last[1]
+                end = len(value)
+                if last is None or end > start:
+                    changes.append((name, "history", (value.previous_parts if last is None else None, value.since(start))))
+                sent[name] = (id(value), end)
+            elif isinstance(value, list):
+                if last is None or last[0] != id(value) or len(value) < last[1]:
+                    changes.append((name, "list", (list(value), True)))
+                elif len(value) > last[1]:
+                    changes.append((name, "list", (value[last[1]:], False)))
+                sent[name] = (id(value), len(value))
+            elif isinstance(value, (Number, str, bool, type(None))) and (last is None or last[1] != value):
+                changes.append((name, "value", value))
+                sent[name] = (None, value)
+        return changes, sent
+
+    def __getstate__(self):
+        # an object that is copied to another process starts its own plotting process there
+        return {**self.__dict__, "_process": None, "_queue": None, "_sent": {}, "_next": 0.0}
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+
+
+def plot_live(obj, *draw: str, fps: float = FPS):
+    '''
+    Draw `obj`'s plot methods `draw` (names) live in a separate process, at
+    most `fps` times per second. Call it on every step, it returns at once.
+    '''
+    live_plot = getattr(obj, "_live_plot", None)
+    if live_plot is None:
+        live_plot = obj._live_plot = LivePlot(type(obj), draw, fps)
+    live_plot.update(obj)
+
+
+def _apply(state: SimpleNamespace, changes):
+    for name, kind, change in changes:
+        if kind == "obs":
+            capacity, keys, rows, replace = change
+            if replace or not isinstance(getattr(state, name, None), ObsHistory):
+                setattr(state, name, ObsHistory(capacity))
+            if len(rows):
+                getattr(state, name).extend(rows, keys)
+        elif kind == "history":
+            previous_parts, rows = change
+            if previous_parts is not None:
+                setattr(state, name, Columns(load_parts(previous_parts)))
+            getattr(state, name).extend(rows)
+        elif kind == "list":
+            items, replace = change
+            if replace:
+                setattr(state, name, items)
+            else:
+                getattr(state, name).extend(items)
+        else:
+            setattr(state, name, change)
+
+
+def _plot_process(changes_queue, draw: Sequence[Callable], period: float):
+    import matplotlib.pyplot as plt
+
+    plt.ion()
+    state = SimpleNamespace()
+    changed = False
+    next_frame = time.monotonic()
+    while True:
+        try:
+            # take everything queued, so a frame always shows the latest rows
+            changes = changes_queue.get(timeout=max(next_frame - time.monotonic(), 0.01))
+            while True:
+                _apply(state, changes)
+                changed = True
+                changes = changes_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        if now < next_frame:
+            continue
+        if changed:
+            for method in draw:
+                try:
+                    method(state)
+                except Exception:
+                    traceback.print_exc()
+            changed = False
+        # frames missed while drawing are dropped, not drawn late
+        next_frame = max(next_frame + period, time.monotonic())
+        if plt.get_fignums():
+            plt.pause(0.001)
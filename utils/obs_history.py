@@ -0,0 +1,148 @@
+"""
+Bounded observation history for the teachers.
+
+The teachers used to append every `transformed_obs` dict to a list that grew
+for the whole training run, across episodes. `ObsHistory` keeps the last
+`capacity` observations in a NumPy array instead, one float64 column per
+sensor, so memory stays flat however long the run is:
+
+    self.obs_history = ObsHistory(self.obs_retention, transformed_obs)
+    self.obs_history.append(transformed_obs)
+
+    self.obs_history.column("Ca")      # every kept value of a sensor, oldest first
+    self.obs_history.last(10)          # the last 10 observations, shape (10, sensors)
+    self.obs_history[-1]["Ca"]         # one observation as a dict
+    len(self.obs_history)              # observations kept, at most `capacity`
+
+Every row is written twice, at `i` and `i + capacity`, so the kept rows are
+always one contiguous slice. `column`, `last`, `window` and `array` return
+views without copying, which are only valid until the next `append`.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+DEFAULT_RETENTION = 1000
+
+
+class ObsHistory:
+    '''
+    Ring buffer of the last `capacity` observations, dicts keyed by sensor
+    name or flat arrays. The columns are fixed by the first observation.
+    '''
+
+    def __init__(self, capacity: int = DEFAULT_RETENTION, first=None):
+        if capacity < 1:
+            raise ValueError(f"ObsHistory needs a capacity of at least 1, got {capacity}")
+        self.capacity = capacity
+        self.keys: Optional[List[str]] = None  # sensor names, None for array observations
+        self.total = 0  # observations appended, including the ones dropped since
+        self._index: Dict[Any, int] = {}
+        self._data = None  # (2 * capacity, sensors), allocated by the first observation
+        self._next = 0
+        self._size = 0
+        if first is not None:
+            self.append(first)
+
+    def _allocate(self, obs):
+        if isinstance(obs, dict):
+            self.keys = list(obs)
+            self._index = {key: i for i, key in enumerate(self.keys)}
+            width = len(self.keys)
+        else:
+            width = np.size(obs)
+        self._data = np.zeros((2 * self.capacity, width), dtype=np.float64)
+
+    def append(self, obs):
+        if self._data is None:
+            self._allocate(obs)
+        i = self._next
+        row = self._data[i]
+        if self.keys is None:
+            row[:] = np.ravel(obs)
+        else:
+            try:
+                row[:] = [obs[key] for key in self.keys]
+            except (TypeError, ValueError):
+                # sensors that arrive as one element arrays
+                row[:] = [np.ravel(obs[key])[0] for key in self.keys]
+        self._data[i + self.capacity] = row
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, rows: np.ndarray, keys: Optional[List[str]] = None):
+        '''Append the rows of a (n, sensors) array, named by `keys` when the history is still empty.'''
+        rows = np.asarray(rows, dtype=np.float64).reshape(len(rows), -1)
+        if self._data is None:
+            self._allocate(dict.fromkeys(keys) if keys is not None else rows[0] if len(rows) else np.empty(0))
+        for row in rows[-self.capacity:]:
+            i = self._next
+            self._data[i] = self._data[i + self.capacity] = row
+            self._next = (i + 1) % self.capacity
+        self._size = min(self._size + len(rows), self.capacity)
+        self.total += len(rows)
+
+    def array(self) -> np.ndarray:
+        '''Every kept observation, oldest first, shape (len, sensors).'''
+        if self._data is None:
+            return np.empty((0, 0))
+        end = self._next + self.capacity
+        return self._data[end - self._size:end]
+
+    def last(self, k: int) -> np.ndarray:
+        '''The last `k` observations (fewer when fewer are kept), oldest first.'''
+        return self.array()[max(self._size - k, 0):]
+
+    def window(self, start: int, stop: Optional[int] = None) -> np.ndarray:
+        '''Observations `start` to `stop` of the kept ones, indexed like a list.'''
+        return self.array()[start:stop]
+
+    def column(self, key: Union[str, int], k: Optional[int] = None) -> np.ndarray:
+        '''Values of the sensor `key`, a name or a position, of the last `k` (default all kept) observations.'''
+        position = self._index[key] if self.keys is not None and not isinstance(key, int) else key
+        rows = self.array() if k is None else self.last(k)
+        return rows[:, position] if rows.size else np.empty(0)
+
+    def clear(self):
+        self._next = self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return self.array()[i]
+        row = self.array()[i]
+        return dict(zip(self.keys, row)) if self.keys is not None else row
+
+    def __iter__(self) -> Iterator:
+        for i in range(self._size):
+            yield self[i]
+
+
+class BoundedList(list):
+    '''
+    List of per-step values, such as a teacher's `reward_history`, that keeps
+    the last `capacity` of them. Older items are dropped in batches once the
+    list holds `2 * capacity`, so `append` stays O(1) amortized and the list
+    still plots and mirrors like any other.
+    '''
+
+    def __init__(self, capacity: int = DEFAULT_RETENTION, items=()):
+        if capacity < 1:
+            raise ValueError(f"BoundedList needs a capacity of at least 1, got {capacity}")
+        super().__init__(items)
+        self.capacity = capacity
+        self._trim()
+
+    def _trim(self):
+        if len(self) >= 2 * self.capacity:
+            del self[:-self.capacity]
+
+    def append(self, item):
+        super().append(item)
+        self._trim()
+
+    def __reduce__(self):
+        return type(self), (self.capacity, list(self))
@@ -0,0 +1,295 @@
+"""
+Throughput-aware sizing of the runtime for a simulator.
+
+`calibrate` runs a short session against the sim: a Docker image it starts
+itself, or a sim already listening on a local address. It measures the step
+and reset latency seen by the agent, and the CPU time the sim spends per step.
+`plan` turns a calibration into `runtime.workers` for the cores of this
+machine, and `generate_config(workers="auto")` uses it. Calibrations are cached per image tag (per address for local sims) in
+`~/.cache/composabl/calibrations.json`, delete an entry or pass
+`refresh=True` to measure again.
+
+The model is deliberately simple. A step takes `step_p50` of wall time (plus
+its share of the resets), `cpu_per_step` of sim CPU and `agent_cpu_per_step`
+of agent CPU for the policy. Every worker steps one env, the only layout the
+runtime config sets. Workers whose steps mostly wait on the network or on the
+sim use a fraction of a core, so workers are added until the CPU they and
+their sims use fills the machine.
+"""
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "composabl", "calibrations.json")
+SIM_PORT = 1337
+
+MAX_WORKERS_PER_CORE = 8
+AGENT_CPU_PER_STEP = 0.5e-3  # policy inference and client overhead per step
+
+
+@dataclass
+class Calibration:
+    key: str
+    step_p50: float  # seconds of wall time per step, seen by the agent
+    step_p99: float
+    reset_mean: float  # seconds of wall time per reset
+    cpu_per_step: Optional[float]  # seconds of sim CPU per step, None when it could not be read
+    episode_steps: float  # mean steps per episode during the calibration
+    measured_at: float
+
+    @property
+    def sim_cpu(self) -> float:
+        '''Sim CPU per step, the wall time when the sim's CPU could not be read.'''
+        return self.step_p50 if self.cpu_per_step is None else self.cpu_per_step
+
+
+def load_cached(key: str, path: str = CACHE_PATH) -> Optional[Calibration]:
+    try:
+        with open(path) as f:
+            entry = json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+    return Calibration(**entry) if entry else None
+
+
+def save_cached(calibration: Calibration, path: str = CACHE_PATH):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[calibration.key] = asdict(calibration)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # write a temporary file and rename it, so a concurrent reader never sees half a cache
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".calibrations-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def cache_key(target: str, image: str = None, address: str = None) -> str:
+    '''The image tag, pinned to the image ID when Docker knows it, so a re-pulled `latest` is measured again.'''
+    if target != "docker":
+        return f"local:{address}"
+    try:
+        image_id = subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return image
+    return f"{image}@{image_id}"
+
+
+class Container:
+    '''A sim container on a free local port, stopped on exit.'''
+
+    def __init__(self, image: str, cpus: float = 1.0):
+        self.id = subprocess.run(
+            ["docker", "run", "-d", "--rm", f"--cpus={cpus}", "-p", f"127.0.0.1::{SIM_PORT}", image],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        port = subprocess.run(
+            ["docker", "port", self.id, str(SIM_PORT)], capture_output=True, text=True, check=True,
+        ).stdout.split(":")[-1].strip()
+        self.address = f"localhost:{port}"
+
+    def cpu_seconds(self) -> Optional[float]:
+        '''CPU time used by the container so far, from its cgroup (v2, then v1).'''
+        for command, scale in (
+            ("grep usage_usec /sys/fs/cgroup/cpu.stat | cut -d' ' -f2", 1e-6),
+            ("cat /sys/fs/cgroup/cpuacct/cpuacct.usage", 1e-9),
+        ):
+            out = subprocess.run(["docker", "exec", self.id, "sh", "-c", command], capture_output=True, text=True)
+            if out.returncode == 0 and out.stdout.strip():
+                return int(out.stdout.strip()) * scale
+        return None
+
+    def stop(self):
+        subprocess.run(["docker", "stop", "-t", "1", self.id], capture_output=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    '''utime + stime of a local process, from /proc.'''
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def wait_for(address: str, timeout: float = 60.0):
+    host, port = address.rsplit(":", 1)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, int(port)), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No sim listening on {address} after {timeout:.0f}s")
+            time.sleep(0.5)
+
+
+def grpc_session(address: str, env_init: dict):
+    '''(reset, step, sample, close) of a composabl gRPC client.'''
+    from composabl_core.grpc.client.client import make
+
+    sim = make("run-calibration", "sim-calibration", "", address, env_init)
+    sim.init()
+    return sim.reset, sim.step, sim.action_space_sample, sim.close
+
+
+def shm_session(path: str, env_init: dict):
+    '''(reset, step, sample, close) of a sim served over the shared memory transport.'''
+    from utils.shm_transport import ShmClient
+
+    sim = ShmClient(path)
+    sim.Make("sim-calibration", env_init)
+    return sim.Reset, sim.Step, sim.ActionSpaceSample, sim.close
+
+
+def measure(session, steps: int = 300, warmup: int = 20, cpu: Callable[[], Optional[float]] = lambda: None,
+            key: str = "") -> Calibration:
+    '''Time `steps` steps with random actions, after `warmup` untimed ones.'''
+    reset, step, sample, close = session
+    try:
+        # sampled up front, so the timed window only holds steps and resets
+        actions = [sample() for _ in range(32)]
+        reset()
+        for i in range(warmup):
+            _, _, terminated, truncated, _ = step(actions[i % len(actions)])
+            if terminated or truncated:
+                reset()
+
+        step_times, reset_times, episodes = [], [], 1
+        cpu_start = cpu()
+        for i in range(steps):
+            action = actions[i % len(actions)]
+            start = time.perf_counter()
+            _, _, terminated, truncated, _ = step(action)
+            step_times.append(time.perf_counter() - start)
+            if terminated or truncated:
+                start = time.perf_counter()
+                reset()
+                reset_times.append(time.perf_counter() - start)
+                episodes += 1
+        cpu_end = cpu()
+
+        if not reset_times:
+            # the episodes outlast the calibration, time a few resets on their own
+            for _ in range(3):
+                start = time.perf_counter()
+                reset()
+                reset_times.append(time.perf_counter() - start)
+    finally:
+        close()
+
+    cpu_per_step = None
+    if cpu_start is not None and cpu_end is not None:
+        # the resets ran inside the same window, charge their CPU to the steps
+        cpu_per_step = (cpu_end - cpu_start) / steps
+
+    return Calibration(
+        key=key,
+        step_p50=float(np.percentile(step_times, 50)),
+        step_p99=float(np.percentile(step_times, 99)),
+        reset_mean=float(np.mean(reset_times)),
+        cpu_per_step=cpu_per_step,
+        episode_steps=steps / episodes,
+        measured_at=time.time(),
+    )
+
+
+def calibrate(target: str, image: str = None, address: str = "localhost:1337", transport: str = "grpc",
+              shm_path: str = None, sim_pid: int = None, env_init: dict = None, steps: int = 300,
+              refresh: bool = False, cache_path: str = CACHE_PATH) -> Calibration:
+    '''
+    Calibration of the sim behind `target`, from the cache unless `refresh`.
+
+    'docker' starts `image` limited to one CPU and reads the CPU time from the
+    container's cgroup. 'local' connects to `address` (or `shm_path` with the
+    shm transport), pass the `sim_pid` of the sim process to measure its CPU.
+    '''
+    if target not in ("docker", "local"):
+        raise ValueError(f"Calibration runs against a 'docker' or 'local' sim, not {target}")
+
+    key = cache_key(target, image, shm_path if transport == "shm" else address)
+    cached = None if refresh else load_cached(key, cache_path)
+    if cached is not None:
+        return cached
+
+    env_init = env_init or {}
+    if target == "docker":
+        with Container(image) as container:
+            wait_for(container.address)
+            session = grpc_session(container.address, env_init)
+            calibration = measure(session, steps, cpu=container.cpu_seconds, key=key)
+    else:
+        session = shm_session(shm_path, env_init) if transport == "shm" else grpc_session(address, env_init)
+        cpu = (lambda: process_cpu_seconds(sim_pid)) if sim_pid else (lambda: None)
+        calibration = measure(session, steps, cpu=cpu, key=key)
+
+    save_cached(calibration, cache_path)
+    return calibration
+
+
+def plan(calibration: Calibration, cores: int = None, reserved_cores: float = 1.0,
+         agent_cpu_per_step: float = AGENT_CPU_PER_STEP, max_workers: int = None) -> Dict[str, Any]:
+    '''
+    Workers of one env each for `cores` (all of this machine by default),
+    keeping `reserved_cores` for the trainer.
+    '''
+    cores = cores or os.cpu_count() or 1
+    usable = max(cores - reserved_cores, 1.0)
+
+    # wall time of a step including its share of the resets
+    step_time = calibration.step_p50 + calibration.reset_mean / max(calibration.episode_steps, 1.0)
+    sim_cpu = min(calibration.sim_cpu, step_time)
+    agent_cpu = max(agent_cpu_per_step, 1e-6)
+
+    cycle = step_time + agent_cpu
+
+    # the CPU of a worker and its sim, a worker waiting on its step leaves its core to the others
+    cores_per_worker = (agent_cpu + sim_cpu) / cycle
+    workers = int(np.clip(usable // cores_per_worker, 1, max(int(usable), 1) * MAX_WORKERS_PER_CORE))
+    if max_workers:
+        workers = min(workers, max_workers)
+
+    steps_per_sec = workers / cycle
+
+    return {
+        "workers": workers,
+        "expected_steps_per_sec": round(steps_per_sec, 1),
+        "cores": cores,
+        "sim_cpu_fraction": round(sim_cpu / step_time, 3),
+    }
+
+
+def describe(calibration: Calibration, recommendation: Dict[str, Any]) -> str:
+    cpu = "unknown" if calibration.cpu_per_step is None else f"{calibration.cpu_per_step * 1e3:.2f} ms"
+    return (
+        f"{calibration.key}: step p50 {calibration.step_p50 * 1e3:.2f} ms p99 {calibration.step_p99 * 1e3:.2f} ms, "
+        f"reset {calibration.reset_mean * 1e3:.2f} ms, sim CPU/step {cpu} -> "
+        f"{recommendation['workers']} workers, ~{recommendation['expected_steps_per_sec']} steps/s "
+        f"on {recommendation['cores']} cores"
+    )
@@ -0,0 +1,11 @@
+"""
+Agent side of the server-side rollouts: `mlp_policy`, `onnx_policy`,
+`controller_policy` and `decode_episode`. The module is shared with the sims
+and lives in `simulators/common/rollout.py`, this one re-exports it.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulators", "common"))
+
+from rollout import *  # noqa: E402,F401,F403
@@ -0,0 +1,11 @@
+"""
+Agent side of the shared memory transport, `ShmClient(path)`. The module is
+shared with the sims and lives in `simulators/common/shm_transport.py`, this
+one re-exports it.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulators", "common"))
+
+from shm_transport import *  # noqa: E402,F401,F403
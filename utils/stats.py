@@ -0,0 +1,227 @@
+"""
+Streaming statistics for the teachers' rewards and metrics.
+
+A teacher that takes the mean of its whole error history on every step does
+O(steps) work per step, and O(steps^2) over a run. These accumulators update
+in O(1) per value and keep O(1) state, or O(size) for the windowed ones:
+
+    self.error_rms = RunningRMS()
+    rms = self.error_rms.update(Cref - Ca)    # the RMS of every deviation so far
+
+    self.level = WindowedMean(1000)
+    level = self.level.update(obs["y1"])      # the mean of the last 1000 levels
+
+`update(x)` returns the statistic including `x`, `value` returns it without
+updating and `reset()` starts over, e.g. at the start of an episode.
+"""
+import math
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class RunningMean:
+    '''Mean of every value so far.'''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        # incremental, so the mean does not lose precision like a growing sum
+        self.mean += (float(x) - self.mean) / self.count
+        return self.mean
+
+    @property
+    def value(self) -> float:
+        return self.mean
+
+
+class RunningVariance:
+    '''Mean, variance and standard deviation of every value so far, with Welford's algorithm.'''
+
+    def __init__(self, ddof: int = 0):
+        self.ddof = ddof
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        return self.variance
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - self.ddof) if self.count > self.ddof else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def value(self) -> float:
+        return self.variance
+
+
+class RunningRMS:
+    '''Root mean square of every value so far.'''
+
+    def __init__(self):
+        self._squares = RunningMean()
+
+    def reset(self):
+        self._squares.reset()
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        return math.sqrt(self._squares.update(x * x))
+
+    @property
+    def count(self) -> int:
+        return self._squares.count
+
+    @property
+    def value(self) -> float:
+        return math.sqrt(self._squares.mean)
+
+
+class EWMA:
+    '''
+    Exponentially weighted moving average, `alpha` is the weight of the newest
+    value. Give `span` instead for alpha = 2 / (span + 1), like pandas.
+    '''
+
+    def __init__(self, alpha: Optional[float] = None, span: Optional[float] = None):
+        if (alpha is None) == (span is None):
+            raise ValueError("EWMA needs one of alpha or span")
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        if not 0 < self.alpha <= 1:
+            raise ValueError(f"EWMA needs 0 < alpha <= 1, got {self.alpha}")
+        self.reset()
+
+    def reset(self):
+        self.mean = None
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        # the first value starts the average instead of pulling it from 0
+        self.mean = x if self.mean is None else self.mean + self.alpha * (x - self.mean)
+        return self.mean
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.mean
+
+
+class RunningMinMax:
+    '''Min and max of every value so far.'''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x: float) -> Tuple[float, float]:
+        x = float(x)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        return self.min, self.max
+
+    @property
+    def value(self) -> Tuple[float, float]:
+        return self.min, self.max
+
+
+class WindowedMean:
+    '''Mean of the last `size` values, fewer until `size` were seen.'''
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError(f"WindowedMean needs a size of at least 1, got {size}")
+        self.size = size
+        self._values = np.zeros(size, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._updates = 0
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        i = self._next
+        if self._count == self.size:
+            self._sum -= self._values[i]
+        else:
+            self._count += 1
+        self._values[i] = x
+        self._sum += x
+        self._next = (i + 1) % self.size
+        self._updates += 1
+        if self._updates % self.size == 0:
+            # adding and subtracting drifts, sum the window again once per `size` updates
+            self._sum = float(self._values[:self._count].sum())
+        return self._sum / self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def value(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+
+class WindowedMinMax:
+    '''Min and max of the last `size` values, with monotonic queues, O(1) amortized per value.'''
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError(f"WindowedMinMax needs a size of at least 1, got {size}")
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self._i = 0
+        # (index, value) with increasing values in _mins and decreasing ones in _maxs
+        self._mins = deque()
+        self._maxs = deque()
+
+    def update(self, x: float) -> Tuple[float, float]:
+        x = float(x)
+        i = self._i
+        self._i += 1
+        while self._mins and self._mins[-1][1] >= x:
+            self._mins.pop()
+        while self._maxs and self._maxs[-1][1] <= x:
+            self._maxs.pop()
+        self._mins.append((i, x))
+        self._maxs.append((i, x))
+        oldest = i - self.size + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+        return self._mins[0][1], self._maxs[0][1]
+
+    @property
+    def value(self) -> Tuple[float, float]:
+        if not self._mins:
+            return math.inf, -math.inf
+        return self._mins[0][1], self._maxs[0][1]